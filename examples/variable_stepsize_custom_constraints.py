@@ -15,6 +15,7 @@ import sympy
 import cvxpy as cvx
 
 import toppra as ta
+from toppra.symbolic import create_symbolic_path_constraint
 
 import cdd
 
@@ -29,38 +30,6 @@ INTERPOLATED = False  # Set of False to use collocation
 N = 100
 
 
-def evaluate_constraint(expressions, ss):
-    """Evaluate the canonical constraints `expressions` over the
-    discretized interval `ss`.
-
-    Parameters
-    ----------
-    
-    Returns
-    -------
-
-    """
-    m = len(expressions)
-    N = len(ss) - 1
-    a = np.zeros((N + 1, m))
-    b = np.zeros((N + 1, m))
-    c = np.zeros((N + 1, m))
-    for index, e in enumerate(expressions):
-        if e.rel_op == "<=":
-            canon_form = e.lhs - e.rhs
-        elif e.rel_op == ">=":
-            canon_form = e.rhs - e.lhs
-        else:
-            raise ValueError("Relation Operation need to be `<=` or `>=`.")
-
-        f = sympy.lambdify(sympy.symbols('u, x, s'), canon_form)
-        for i in xrange(N + 1):
-            a[i, index] = f(1, 0, ss[i]) - f(0, 0, ss[i])
-            b[i, index] = f(0, 1, ss[i]) - f(0, 0, ss[i])
-            c[i, index] = f(0, 0, ss[i])
-    return a, b, c
-
-
 # Define symbolic expression and evaluation
 ss = np.linspace(0, 0.495, N / 4)
 ss = np.hstack((ss, np.linspace(0.496, 0.51, N / 2)))
@@ -74,9 +43,8 @@ expressions = [
     - 0.2 * (0.5 - s) * u + 3 * x - 1 <= 0,
     x >= 0,
     u <= 1, u >= -1]
-a, b, c = evaluate_constraint(expressions, ss)
-
-path_constraint = ta.PathConstraint(a=a, b=b, c=c, ss=ss)
+path_constraint = create_symbolic_path_constraint(expressions, ss, u=u, x=x,
+                                                  s=s)
 if INTERPOLATED:
     path_constraint = ta.interpolate_constraint(path_constraint)
 
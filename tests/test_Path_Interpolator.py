@@ -1,7 +1,19 @@
 import numpy as np
 import numpy.testing as npt
+import pytest
 
-from toppra import PolynomialInterpolator, SplineInterpolator
+import toppra as ta
+from toppra import (PolynomialInterpolator, SplineInterpolator,
+                    UnivariateSplineInterpolator, path_to_ppoly)
+
+
+def assert_eval_all(pi, ss):
+    out = pi.eval_all(ss)
+    assert out.shape == (3, ) + pi.eval(ss).shape
+    npt.assert_allclose(out[0], pi.eval(ss), atol=1e-10)
+    npt.assert_allclose(out[1], pi.evald(ss), atol=1e-10)
+    npt.assert_allclose(out[2], pi.evaldd(ss), atol=1e-10)
+    npt.assert_allclose(pi.eval_all(ss, order=1), out[:2])
 
 
 class Test_PolynomialInterpolator(object):
@@ -26,6 +38,45 @@ class Test_PolynomialInterpolator(object):
             pi.evald([0, 0.5, 1]), [[2, 3], [5, 10.75], [8, 26]])
         npt.assert_allclose(pi.evaldd([0, 0.5, 1]), [[6, 8], [6, 23], [6, 38]])
 
+    def test_eval_all(self):
+        ss = np.linspace(-0.5, 1.5, 11)
+        assert_eval_all(PolynomialInterpolator([1, 2, 3]), ss)
+        assert_eval_all(PolynomialInterpolator([[1, 2, 3], [-2, 3, 4, 5]]),
+                        ss)
+
+    def test_vectorized(self):
+        """ Compare with numpy polynomials, with output buffers.
+        """
+        np.random.seed(0)
+        coeff = np.random.randn(20, 6)
+        pi = PolynomialInterpolator(coeff)
+        assert pi.coeff.shape == (20, 6)
+        ss = np.linspace(0, 1, 15)
+        buf = np.zeros((15, 20))
+        for eval_, k in [(pi.eval, 0), (pi.evald, 1), (pi.evaldd, 2)]:
+            expected = np.array([np.polynomial.Polynomial(c).deriv(k)(ss)
+                                 for c in coeff]).T
+            npt.assert_allclose(eval_(ss), expected)
+            res = eval_(ss, out=buf)
+            assert np.shares_memory(res, buf)
+            npt.assert_allclose(buf, expected)
+        npt.assert_allclose(pi.eval(0.5), pi.eval([0.5])[0])
+
+    def test_scalar_buffer(self):
+        pi = PolynomialInterpolator([1, 2, 3])
+        ss = np.linspace(0, 1, 7)
+        for buf in [np.zeros(7), np.zeros((7, 1)), np.zeros((7, 2))[:, 1]]:
+            res = pi.evald(ss, out=buf)
+            assert res.shape == (7, ) and np.shares_memory(res, buf)
+            npt.assert_allclose(np.reshape(buf, -1), 2 + 6 * ss)
+        with pytest.raises(ValueError):
+            pi.eval(ss, out=np.zeros(6))
+
+    def test_constant(self):
+        pi = PolynomialInterpolator([[2], [3, 1]])
+        npt.assert_allclose(pi.eval([0, 1]), [[2, 3], [2, 4]])
+        npt.assert_allclose(pi.evaldd([0, 1]), np.zeros((2, 2)))
+
 
 class Test_SplineInterpolator(object):
     """ Test suite for Spline Interpolator
@@ -52,3 +103,143 @@ class Test_SplineInterpolator(object):
         assert pi.eval(ss).shape == (10, 5)
         assert pi.evald(ss).shape == (10, 5)
         assert pi.evaldd(ss).shape == (10, 5)
+
+    def test_eval_all(self):
+        np.random.seed(0)
+        ss = np.r_[-0.1, np.linspace(0, 1, 37), 0.5, 1.1]  # With knots
+        assert_eval_all(SplineInterpolator(np.linspace(0, 1, 5),
+                                           np.random.randn(5, 3)), ss)
+        assert_eval_all(SplineInterpolator(np.linspace(0, 1, 5),
+                                           np.random.randn(5)), ss)
+
+
+class Test_UnivariateSplineInterpolator(object):
+    """ Test suite for UnivariateSpline Interpolator
+    """
+
+    def test_eval_all(self):
+        np.random.seed(0)
+        pi = UnivariateSplineInterpolator(np.linspace(0, 1, 20),
+                                          np.random.randn(20, 3))
+        assert_eval_all(pi, np.linspace(0, 1, 31))
+
+    def test_joint_smoothing(self):
+        """ All DOFs share the knots, and the total squared residual is
+        within the smoothing factor.
+        """
+        np.random.seed(1)
+        ss = np.linspace(0, 1, 200)
+        qs = np.array([np.sin(2 * np.pi * ss * (i + 1)) for i in range(6)]).T
+        qs_noisy = qs + np.random.randn(*qs.shape) * 0.05
+        s = 200 * 6 * 0.05 ** 2
+        pi = UnivariateSplineInterpolator(ss, qs_noisy, s=s)
+        assert pi.bspl.c.shape[1:] == (6, )
+        assert np.sum((pi.eval(ss) - qs_noisy) ** 2) <= s
+        assert np.sqrt(np.mean((pi.eval(ss) - qs) ** 2)) < 0.05
+
+        # Without smoothing, the spline interpolates
+        pi = UnivariateSplineInterpolator(ss[::10], qs[::10], s=0)
+        npt.assert_allclose(pi.eval(ss[::10]), qs[::10], atol=1e-8)
+
+    def test_rough_data(self):
+        """ The residual reaches the smoothing factor, even when it is
+        too small for a least-squares fit with fewer knots than data.
+        """
+        np.random.seed(0)
+        ss = np.linspace(0, 1, 20)
+        qs = np.cumsum(5 * np.random.randn(20, 3), axis=0)
+        pi = UnivariateSplineInterpolator(ss, qs)
+        residual = np.sum((pi.eval(ss) - qs) ** 2)
+        assert 0.99 * qs.size <= residual <= qs.size
+        pi_interp = UnivariateSplineInterpolator(ss, qs, s=0)
+        assert (np.abs(pi.evaldd(ss)).max() <
+                np.abs(pi_interp.evaldd(ss)).max())
+
+    def test_ppoly(self):
+        np.random.seed(2)
+        ss = np.linspace(0, 1, 30)
+        pi = UnivariateSplineInterpolator(ss, np.random.randn(30, 4))
+        path_pp = path_to_ppoly(pi, ss)
+        ss_sam = np.linspace(0, 1, 101)
+        npt.assert_allclose(path_pp(ss_sam), pi.eval(ss_sam))
+        npt.assert_allclose(path_pp.derivative(2)(ss_sam), pi.evaldd(ss_sam))
+
+
+class Test_MemoizedEvaluation(object):
+    """ Test suite for the memo cache of the interpolators
+    """
+
+    def create_counted_path(self):
+        pi = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 3))
+        evaluate = pi._eval_all
+
+        def counted(ss, order):
+            counted.calls += 1
+            return evaluate(ss, order)
+        counted.calls = 0
+        pi._eval_all = counted
+        return pi, counted
+
+    def test_memo(self):
+        np.random.seed(3)
+        pi, counted = self.create_counted_path()
+        ss = np.linspace(0, 1, 101)
+        out = pi.eval_all(ss)
+        assert not out.flags.writeable
+        npt.assert_allclose(pi.eval_all(ss.copy()), out)
+        npt.assert_allclose(pi.eval_all(ss, order=1), out[:2])
+        assert counted.calls == 1
+
+        # Same array object, other contents
+        ss[50] = 0.55
+        npt.assert_allclose(pi.eval_all(ss)[0], pi.eval(ss))
+        assert counted.calls == 2
+
+        # Bounded size, least recently used first
+        pi.cache_size = 2
+        grids = [np.linspace(0, 1, n) for n in (11, 12, 13)]
+        for ss in grids + grids[2:] + grids[:1]:
+            pi.eval_all(ss)
+        assert counted.calls == 2 + 4
+
+        # Disabled after use
+        pi.cache_size = 0
+        pi.eval_all(grids[0])
+        assert len(pi._memo) == 0
+        assert counted.calls == 2 + 5
+
+    def test_memo_bytes(self):
+        np.random.seed(5)
+        pi, counted = self.create_counted_path()
+        grids = [np.linspace(0, 1, n) for n in (100, 101, 102)]
+        for ss in grids:
+            pi.eval_all(ss)
+        assert len(pi._memo) == 3
+
+        # Only the last evaluation fits, and the larger ones are not kept
+        pi.cache_bytes = pi.eval_all(grids[2]).nbytes
+        pi.eval_all(grids[1])
+        assert len(pi._memo) == 1
+        assert pi._memo.nbytes <= pi.cache_bytes
+        pi.eval_all(np.linspace(0, 1, 200))
+        assert len(pi._memo) == 1
+        calls = counted.calls
+        pi.eval_all(grids[1])
+        assert counted.calls == calls
+
+    def test_shared_evaluation(self):
+        np.random.seed(4)
+        pi, counted = self.create_counted_path()
+        pi.cache_size = 0
+        ss = np.linspace(0, 1, 101)
+        with pi.shared_evaluation(ss) as out:
+            vlim = np.array([[-1., 1.]] * 3)
+            alim = np.array([[-2., 2.]] * 3)
+            ta.create_velocity_path_constraint(pi, ss, vlim)
+            ta.create_acceleration_path_constraint(pi, ss, alim)
+            ta.compute_trajectory_gridpoints(pi, ss, np.zeros(100),
+                                             np.ones(101))
+        assert counted.calls == 1
+        npt.assert_allclose(out[2], pi.evaldd(ss))
+        pi.eval_all(ss)
+        assert counted.calls == 2
@@ -0,0 +1,93 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from toppra import (SplineInterpolator, PolynomialInterpolator,
+                    compute_trajectory_points)
+from toppra.archive import ArchiveWriter, Archive
+
+
+@pytest.fixture(name='param_data')
+def create_parametrization_fixtures():
+    np.random.seed(5)
+    N = 30
+    path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 3))
+    ss = np.linspace(0, 1, N + 1)
+    us = np.random.rand(N)
+    xs = np.ones(N + 1)
+    for i in range(N):
+        xs[i + 1] = xs[i] + 2 * (ss[i + 1] - ss[i]) * us[i]
+    K = np.vstack((xs * 0.5, xs * 2)).T
+    return path, ss, us, xs, K
+
+
+def test_round_trip(param_data, tmpdir):
+    path, ss, us, xs, K = param_data
+    filename = str(tmpdir.join("archive.tpa"))
+    samples = compute_trajectory_points(path, ss, us, xs, dt=1e-2)
+    with ArchiveWriter(filename) as writer:
+        writer.add("full", ss, us, xs, K=K, path=path, samples=samples)
+        writer.add("bare", ss, us, xs)
+
+    archive = Archive(filename)
+    assert len(archive) == 2
+    assert archive.names == ["full", "bare"]
+    entry = archive["full"]
+    for field, expected in [("ss", ss), ("us", us), ("xs", xs), ("K", K),
+                            ("t", samples[0]), ("q", samples[1]),
+                            ("qd", samples[2]), ("qdd", samples[3])]:
+        assert isinstance(entry[field], np.memmap)
+        npt.assert_allclose(entry[field], expected)
+    npt.assert_allclose(entry["q"][5:10, 1], samples[1][5:10, 1])
+    npt.assert_allclose(entry.path()(ss), path.eval(ss))
+    assert "K" not in archive[1]
+    assert archive[1].fields == ["ss", "us", "xs"]
+
+
+def test_append(param_data, tmpdir):
+    path, ss, us, xs, K = param_data
+    filename = str(tmpdir.join("archive.tpa"))
+    with ArchiveWriter(filename) as writer:
+        writer.add("first", ss, us, xs)
+    with ArchiveWriter(filename, append=True) as writer:
+        writer.add("second", ss, us, xs * 2,
+                   path=PolynomialInterpolator([1, 2, 3]))
+    archive = Archive(filename)
+    assert archive.names == ["first", "second"]
+    npt.assert_allclose(archive["first"]["xs"], xs)
+    npt.assert_allclose(archive[-1]["xs"], xs * 2)
+    npt.assert_allclose(archive[-1].path()([0, 0.5, 1]), [1, 2.75, 6])
+
+
+def test_append_interrupted(param_data, tmpdir):
+    """ Former entries stay readable until the writer is closed, and
+    entries added before an exception are kept.
+    """
+    path, ss, us, xs, K = param_data
+    filename = str(tmpdir.join("archive.tpa"))
+    with ArchiveWriter(filename) as writer:
+        writer.add("first", ss, us, xs)
+
+    writer = ArchiveWriter(filename, append=True)
+    writer.add("second", ss, us, xs * 2, K=K)
+    writer._file.flush()
+    assert Archive(filename).names == ["first"]
+    writer._file.close()  # Killed before close()
+    assert Archive(filename).names == ["first"]
+
+    with pytest.raises(RuntimeError):
+        with ArchiveWriter(filename, append=True) as writer:
+            writer.add("second", ss, us, xs * 2, K=K)
+            raise RuntimeError
+    archive = Archive(filename)
+    assert archive.names == ["first", "second"]
+    npt.assert_allclose(archive["first"]["xs"], xs)
+    npt.assert_allclose(archive["second"]["K"], K)
+
+
+def test_invalid_file(tmpdir):
+    filename = str(tmpdir.join("garbage"))
+    with open(filename, 'wb') as f:
+        f.write(b'\x00' * 128)
+    with pytest.raises(ValueError):
+        Archive(filename)
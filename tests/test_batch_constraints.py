@@ -0,0 +1,61 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import toppra as ta
+from toppra import SplineInterpolator
+from toppra._CythonUtils import _create_velocity_constraint
+
+
+@pytest.fixture(name='paths_data')
+def create_paths_fixtures():
+    np.random.seed(11)
+    P, dof = 5, 3
+    paths = [SplineInterpolator(np.linspace(0, 1, 6), np.random.randn(6, dof))
+             for _ in range(P)]
+    ss = np.linspace(0, 1, 51)
+    lims = np.random.rand(P, dof, 2) * 5 + 1
+    lims[:, :, 0] *= -1
+    return paths, ss, lims
+
+
+def test_velocity_coefficients(paths_data):
+    """ Same coefficients as the single path builder.
+    """
+    paths, ss, vlim = paths_data
+    qs = np.array([path.evald(ss) for path in paths])
+    qs[0, 10] = 0  # Joints at rest
+    a, b, c = ta.compute_velocity_coefficients(qs, vlim)
+    assert c.shape == (len(paths), len(ss), 2)
+    for k, path in enumerate(paths):
+        _, _, c_single = _create_velocity_constraint(qs[k], vlim[k])
+        pc = ta.create_velocity_path_constraint(path, ss, vlim[k])
+        npt.assert_allclose(a[k], pc.a)
+        npt.assert_allclose(b[k], pc.b)
+        npt.assert_allclose(c[k], c_single, rtol=1e-12)
+
+    # One constraint per path and limit
+    _, _, c_all = ta.compute_velocity_coefficients(qs[:, None], vlim)
+    assert c_all.shape == (len(paths), len(paths), len(ss), 2)
+    npt.assert_allclose(c_all[1, 3], ta.compute_velocity_coefficients(
+        qs[1], vlim[3])[2])
+
+
+def test_acceleration_coefficients(paths_data):
+    """ Same coefficients as the single path builder.
+    """
+    paths, ss, alim = paths_data
+    qs = np.array([path.evald(ss) for path in paths])
+    qss = np.array([path.evaldd(ss) for path in paths])
+    a, b, c = ta.compute_acceleration_coefficients(qs, qss, alim)
+    assert c.shape == (len(paths), len(ss), 6)
+    for k, path in enumerate(paths):
+        pc = ta.create_acceleration_path_constraint(path, ss, alim[k])
+        npt.assert_allclose(a[k], pc.a)
+        npt.assert_allclose(b[k], pc.b)
+        npt.assert_allclose(c[k], pc.c)
+
+    # Shared limits
+    _, _, c_shared = ta.compute_acceleration_coefficients(qs, qss, alim[0])
+    assert c_shared.shape == (len(paths), len(ss), 6)
+    npt.assert_allclose(c_shared[3], c[0])
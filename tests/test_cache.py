@@ -0,0 +1,185 @@
+import os
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import toppra as ta
+from toppra import SerialChain, SplineInterpolator, PathConstraintStage
+from toppra.cache import ConstraintCache
+
+
+@pytest.fixture(name='path_data')
+def create_path_fixtures():
+    np.random.seed(7)
+    path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 2))
+    ss = np.linspace(0, 1, 41)
+    chain = SerialChain([[1, 0, 0, 0], [1, 0, 0, 0]], masses=[1, 1],
+                        coms=np.zeros((2, 3)), inertias=np.zeros((2, 3, 3)),
+                        gravity=[0, -9.81, 0], torque_limits=[50., 20.])
+    return path, ss, chain
+
+
+def counting(builder):
+    def counted(*args, **kwargs):
+        counted.calls += 1
+        return builder(*args, **kwargs)
+    counted.calls = 0
+    counted.__name__ = builder.__name__
+    return counted
+
+
+def assert_same_constraint(pc, expected):
+    assert pc.name == expected.name
+    npt.assert_allclose(pc.ss, expected.ss)
+    for field in PathConstraintStage._fields:
+        npt.assert_allclose(getattr(pc, field), getattr(expected, field))
+
+
+def test_warm_run(path_data, tmpdir):
+    """ A warm run loads the constraint without calling the builder.
+    """
+    path, ss, chain = path_data
+    cache = ConstraintCache(str(tmpdir))
+    builder = counting(ta.create_torque_path_constraint)
+    create_torque = cache.wrap(builder, fingerprint="arm-v1")
+    pc = create_torque(path, ss, chain)
+    pc_warm = create_torque(path, ss, chain)
+    assert builder.calls == 1
+    assert not pc_warm.a.flags.writeable  # Read-only memory map
+    assert_same_constraint(pc_warm, pc)
+
+    # Other limits, grid, path or model
+    create_torque(path, ss, chain, torque_bnd=[10., 10.])
+    create_torque(path, ss[::2], chain)
+    create_torque(SplineInterpolator(np.linspace(0, 1, 5),
+                                     np.random.randn(5, 2)), ss, chain)
+    cache.wrap(builder, fingerprint="arm-v2")(path, ss, chain)
+    assert builder.calls == 5
+    create_torque(path, ss, chain, torque_bnd=[10., 10.])
+    assert builder.calls == 5
+
+
+def test_stage_invariant_coefficients(path_data, tmpdir):
+    """ Invariant coefficients are stored once and stay invariant.
+    """
+    path, ss, _ = path_data
+    cache = ConstraintCache(str(tmpdir))
+    alim = np.array([[-1., 1.], [-2., 2.]])
+    pc = ta.create_acceleration_path_constraint(path, ss, alim)
+    key = cache.key("acceleration", path, ss, (alim, ))
+    assert cache.load(key) is None
+    cache.store(key, pc)
+    assert key in cache
+    pc_warm = cache.load(key)
+    assert_same_constraint(pc_warm, pc)
+    assert sorted(pc_warm.invariants) == sorted(pc.invariants)
+    assert "c" in pc_warm.invariants
+
+
+def test_corrupt_entry(path_data, tmpdir):
+    """ Entries with missing or corrupt files are cache misses, and are
+    rebuilt.
+    """
+    path, ss, chain = path_data
+    cache = ConstraintCache(str(tmpdir))
+    builder = counting(ta.create_torque_path_constraint)
+    create_torque = cache.wrap(builder, fingerprint="arm-v1")
+    pc = create_torque(path, ss, chain)
+    key = cache.key(builder.__name__, path, ss, (chain, ), {}, "arm-v1")
+    entry = os.path.join(str(tmpdir), key)
+
+    os.remove(os.path.join(entry, "a.npy"))
+    assert cache.load(key) is None
+    assert key not in cache
+    assert_same_constraint(create_torque(path, ss, chain), pc)
+    assert builder.calls == 2
+    assert_same_constraint(create_torque(path, ss, chain), pc)
+    assert builder.calls == 2
+
+    with open(os.path.join(entry, "meta.json"), 'w') as f:
+        f.write("{")
+    assert_same_constraint(create_torque(path, ss, chain), pc)
+    assert builder.calls == 3
+    assert key in cache
+
+
+def test_not_path_constraint(path_data, tmpdir):
+    """ Results which are not path constraints bypass the cache.
+    """
+    path, ss, chain = path_data
+    cache = ConstraintCache(str(tmpdir))
+    builder = counting(ta.create_payload_torque_path_constraint)
+    create_payload = cache.wrap(builder)
+    payload_pc = create_payload(path, ss, chain)
+    assert isinstance(payload_pc, ta.PayloadTorquePathConstraint)
+    create_payload(path, ss, chain)
+    assert builder.calls == 2
+    assert cache.size == 0
+
+
+def test_eviction(path_data, tmpdir):
+    """ The least recently used entries are evicted first.
+    """
+    path, ss, chain = path_data
+    cache = ConstraintCache(str(tmpdir))
+    pc = ta.create_torque_path_constraint(path, ss, chain)
+    keys = ["entry{:d}".format(i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.store(key, pc)
+        os.utime(os.path.join(str(tmpdir), key, "meta.json"), (i, i))
+    entry_size = cache.size / 3
+    cache.load(keys[0])  # Most recently used
+
+    cache.max_size = 2 * entry_size
+    cache.store("entry3", pc)
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert keys[2] not in cache
+    assert "entry3" in cache
+    assert cache.size <= cache.max_size
+
+    cache.clear()
+    assert cache.size == 0
+
+
+class Contact(object):
+    def __init__(self, pose, wrench_face):
+        self.pose = pose
+        self.wrench_face = wrench_face
+
+
+class Stance(object):
+    def __init__(self, contacts):
+        self.contacts = contacts
+        self.robot = lambda: None  # Opaque attributes are ignored
+
+
+def test_key_content(path_data, tmpdir):
+    """ Keys differ with the content of the arguments, and opaque
+    arguments require a fingerprint.
+    """
+    path, ss, chain = path_data
+    cache = ConstraintCache(str(tmpdir))
+    F = np.random.randn(16, 6)
+    stance = Stance([Contact(np.r_[1., 0, 0, 0, 0, 0, 0], F)])
+    stance_moved = Stance([Contact(np.r_[1., 0, 0, 0, 0.1, 0, 0], F)])
+    key = cache.key("contact", path, ss, ("r1", stance), fingerprint="r")
+    assert key != cache.key("contact", path, ss, ("r1", stance_moved),
+                            fingerprint="r")
+    assert key == cache.key("contact", path, ss, ("r1", Stance(
+        [Contact(np.r_[1., 0, 0, 0, 0, 0, 0], F.copy())])), fingerprint="r")
+
+    # Serial chains are hashed by content, without a fingerprint
+    chain_heavy = SerialChain(chain.dh, chain.masses * 2, chain.coms,
+                              chain.inertias, chain.gravity,
+                              torque_limits=chain.torque_limits)
+    assert (cache.key("torque", path, ss, (chain, )) !=
+            cache.key("torque", path, ss, (chain_heavy, )))
+
+    # Callables are opaque
+    with pytest.raises(ValueError):
+        cache.key("re_torque", path, ss, (chain, lambda q: q))
+    with pytest.raises(ValueError):
+        cache.wrap(ta.create_rave_re_torque_path_constraint)(
+            path, ss, chain, lambda q: q)
+    cache.key("re_torque", path, ss, (chain, lambda q: q), fingerprint="J")
@@ -0,0 +1,107 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import toppra as ta
+from toppra import SerialChain, SplineInterpolator
+
+
+@pytest.fixture(name='cartesian_data')
+def create_cartesian_data():
+    np.random.seed(5)
+    chain = SerialChain([[1., 0, 0, 0], [0.8, 0, 0, 0]], [1., 1.],
+                        np.zeros((2, 3)), np.zeros((2, 3, 3)))
+    path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 2))
+    ss = np.linspace(0, 1, 51)
+    return chain, path, ss
+
+
+def planar_jacobian(q):
+    t1, t12 = q[:, 0], q[:, 0] + q[:, 1]
+    J = np.zeros((len(q), 2, 2))
+    J[:, 0, 0] = - np.sin(t1) - 0.8 * np.sin(t12)
+    J[:, 0, 1] = - 0.8 * np.sin(t12)
+    J[:, 1, 0] = np.cos(t1) + 0.8 * np.cos(t12)
+    J[:, 1, 1] = 0.8 * np.cos(t12)
+    return J
+
+
+def planar_hessian(q):
+    t1, t12 = q[:, 0], q[:, 0] + q[:, 1]
+    H = np.zeros((len(q), 2, 2, 2))
+    H[:, 0] = - 0.8 * np.cos(t12)[:, None, None]
+    H[:, 0, 0, 0] -= np.cos(t1)
+    H[:, 1] = - 0.8 * np.sin(t12)[:, None, None]
+    H[:, 1, 0, 0] -= np.sin(t1)
+    return H
+
+
+def test_velocity(cartesian_data):
+    chain, path, ss = cartesian_data
+    vlim = np.array([[-1., 2.], [-0.5, 0.5], [-1, 1]])
+    pc = ta.create_cartesian_velocity_path_constraint(
+        path, ss, chain.compute_path_point_derivatives, vlim)
+    assert pc.nm == 1 and pc.a.strides[0] == 0
+    npt.assert_allclose(pc.b, 1)
+
+    ps, _ = chain.compute_path_point_derivatives(
+        path.eval(ss), path.evald(ss), path.evaldd(ss))
+    v = ps * np.sqrt(- pc.c)  # Velocity at the highest sd
+    assert np.all(v <= vlim[:, 1] + 1e-9) and np.all(v >= vlim[:, 0] - 1e-9)
+    # One limit is active at each gridpoint
+    npt.assert_allclose(
+        np.max(np.maximum(v / vlim[:, 1], v / vlim[:, 0]), axis=1), 1)
+
+
+def test_acceleration(cartesian_data):
+    chain, path, ss = cartesian_data
+    alim = np.array([[-3., 2.], [-1., 4.]])
+    pc = ta.create_cartesian_acceleration_path_constraint(
+        path, ss, (planar_jacobian, planar_hessian), alim)
+    assert pc.nm == 4
+    np.random.seed(1)
+    u, x = np.random.randn(2, len(ss))
+    q, qs, qss = path.eval(ss), path.evald(ss), path.evaldd(ss)
+    acc = chain.point_kinematics(q, qs * np.sqrt(np.abs(x))[:, None],
+                                 qs * u[:, None] +
+                                 qss * np.abs(x)[:, None])[2][:, :2]
+    lhs = pc.a * u[:, None] + pc.b * np.abs(x)[:, None] + pc.c
+    npt.assert_allclose(lhs, np.hstack((acc - alim[:, 1], alim[:, 0] - acc)),
+                        atol=1e-9)
+
+
+def test_polyhedral_velocity(cartesian_data):
+    chain, path, ss = cartesian_data
+    F = np.array([[1., 1., 0.], [-1., 0., 0.]])
+    g = np.array([1., 2.])
+    pc = ta.create_cartesian_velocity_path_constraint(
+        path, ss, chain.compute_path_point_derivatives, F=F, g=g)
+    ps, _ = chain.compute_path_point_derivatives(
+        path.eval(ss), path.evald(ss), path.evaldd(ss))
+    Fv = np.dot(ps * np.sqrt(- pc.c), F.T)
+    assert np.all(Fv <= g + 1e-9)
+    # Unbounded where the point moves away from all facets
+    bounded = np.any(np.dot(ps, F.T) > 0, axis=1)
+    assert not np.all(bounded)
+    npt.assert_allclose(np.max(Fv[bounded] / g, axis=1), 1)
+    npt.assert_allclose(pc.c[~bounded], - ta.INFTY ** 2)
+
+
+def test_invalid_limits(cartesian_data):
+    chain, path, ss = cartesian_data
+    kinematics = chain.compute_path_point_derivatives
+    with pytest.raises(ValueError):  # Excludes the zero velocity
+        ta.create_cartesian_velocity_path_constraint(
+            path, ss, kinematics, [[0.5, 2.], [-1, 1], [-1, 1]])
+    with pytest.raises(ValueError):
+        ta.create_cartesian_velocity_path_constraint(
+            path, ss, kinematics, F=np.eye(3), g=[1., -1., 1.])
+    with pytest.raises(ValueError):  # Lower limit above the upper one
+        ta.create_cartesian_acceleration_path_constraint(
+            path, ss, kinematics, [[1., -1.], [-1, 1], [-1, 1]])
+    with pytest.raises(ValueError):
+        ta.create_cartesian_acceleration_path_constraint(
+            path, ss, kinematics, [-1., 1.])
+    with pytest.raises(ValueError):
+        ta.create_cartesian_acceleration_path_constraint(
+            path, ss, kinematics, F=np.eye(3), g=[1., 1.])
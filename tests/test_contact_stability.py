@@ -0,0 +1,55 @@
+import numpy as np
+import numpy.testing as npt
+
+import toppra as ta
+from toppra import SerialChain, SplineInterpolator
+
+
+class ContactSet(object):
+    """ A contact set with a fixed wrench face.
+    """
+
+    def __init__(self, F):
+        self.F = F
+
+    def compute_wrench_face(self, point):
+        return self.F
+
+
+def test_contact_stability_reference_evaluator():
+    """ The canonical constraint evaluates to the projection of the
+    gravito-inertial wrench on the wrench face.
+    """
+    np.random.seed(12)
+    dof = 3
+    dh = np.random.randn(dof, 4)
+    inertias = np.array([np.dot(A, A.T) for A in np.random.randn(dof, 3, 3)])
+    chain = SerialChain(dh, np.random.rand(dof) + 0.5, np.random.randn(dof, 3),
+                        inertias)
+    path = SplineInterpolator(np.linspace(0, 1, 4), np.random.randn(4, dof))
+    ss = np.linspace(0, 1, 21)
+    g = np.array([0, 0, -9.81])
+    F = np.random.randn(16, 6)
+    pc = ta.create_pymanoid_contact_stability_path_constraint(
+        path, ss, chain, ContactSet(F), g)
+    assert pc.nm == 16
+
+    u, x = np.random.randn(), np.random.rand()
+    q = path.eval(ss)
+    qd = path.evald(ss) * np.sqrt(x)
+    qdd = path.evald(ss) * u + path.evaldd(ss) * x
+    Pd, Ld = chain.momentum_rates(q, qd, qdd)
+    com = chain.compute_com_derivatives(q)[0]
+    m = chain.mass
+    w_gi = np.hstack((Pd - m * g, Ld - m * np.cross(com, g)))
+    npt.assert_allclose(pc.a * u + pc.b * x + pc.c, np.dot(w_gi, F.T),
+                        atol=1e-8)
+
+    # Same coefficients with workers, in one or several rounds
+    for coarse_rtol in [None, 1e-12]:
+        pc_parallel = ta.create_pymanoid_contact_stability_path_constraint(
+            path, ss, chain, ContactSet(F), g, robot_factory=lambda: chain,
+            n_workers=2, coarse_rtol=coarse_rtol)
+        for field in ['a', 'b', 'c']:
+            npt.assert_allclose(getattr(pc_parallel, field),
+                                getattr(pc, field), atol=1e-8)
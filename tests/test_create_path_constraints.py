@@ -505,6 +505,22 @@ class TestFunc_create_rave_re_torque_path_constraint(object):
                 _ = np.dot(J_lc(qi), Nmat[:, i])
                 npt.assert_allclose(np.linalg.norm(_), 0, atol=TINY)
 
+    def test_vectorized_jacobian(self, rave_re_torque_data):
+        """ A vectorized loop closure Jacobian gives the same constraint.
+        """
+        data, pc = rave_re_torque_data
+        pi, ss, robot, J_lc = data
+
+        def J_lc_vec(q):
+            return np.array([J_lc(qi) for qi in q])
+
+        pc_vec = fa.create_rave_re_torque_path_constraint(
+            pi, ss, robot, J_lc_vec, vectorized=True)
+        npt.assert_allclose(pc_vec.D, pc.D)
+        npt.assert_allclose(pc_vec.abar, pc.abar)
+        npt.assert_allclose(pc_vec.bbar, pc.bbar)
+        npt.assert_allclose(pc_vec.cbar, pc.cbar)
+
 
 @pytest.fixture(scope="class")
 def pymanoid_fixture():
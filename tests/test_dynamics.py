@@ -0,0 +1,241 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+import toppra as ta
+from toppra import SerialChain, SplineInterpolator
+
+L1, L2, LC1, LC2 = 1.0, 0.8, 0.4, 0.3
+M1, M2, I1, I2 = 2.0, 1.5, 0.1, 0.05
+G = 9.81
+
+
+@pytest.fixture(name='planar_arm')
+def create_planar_arm():
+    """ A planar two-link arm moving in the (x, y) plane.
+    """
+    coms = np.array([[LC1 - L1, 0, 0], [LC2 - L2, 0, 0]])
+    inertias = np.zeros((2, 3, 3))
+    inertias[0, 2, 2] = I1
+    inertias[1, 2, 2] = I2
+    return SerialChain([[L1, 0, 0, 0], [L2, 0, 0, 0]], [M1, M2], coms,
+                       inertias, gravity=[0, -G, 0],
+                       torque_limits=[50., 20.])
+
+
+def planar_arm_dynamics(q, qd, qdd):
+    """ Closed-form dynamics of the planar two-link arm.
+    """
+    c2 = np.cos(q[:, 1])
+    h = - M2 * L1 * LC2 * np.sin(q[:, 1])
+    M11 = M1 * LC1 ** 2 + M2 * (L1 ** 2 + LC2 ** 2 + 2 * L1 * LC2 * c2) + I1 + I2
+    M12 = M2 * (LC2 ** 2 + L1 * LC2 * c2) + I2
+    M22 = M2 * LC2 ** 2 + I2
+    g1 = ((M1 * LC1 + M2 * L1) * G * np.cos(q[:, 0]) +
+          M2 * LC2 * G * np.cos(q[:, 0] + q[:, 1]))
+    g2 = M2 * LC2 * G * np.cos(q[:, 0] + q[:, 1])
+    tau1 = (M11 * qdd[:, 0] + M12 * qdd[:, 1] + h * qd[:, 1] ** 2 +
+            2 * h * qd[:, 0] * qd[:, 1] + g1)
+    tau2 = M12 * qdd[:, 0] + M22 * qdd[:, 1] - h * qd[:, 0] ** 2 + g2
+    return np.vstack((tau1, tau2)).T
+
+
+def test_inverse_dynamics(planar_arm):
+    np.random.seed(0)
+    q, qd, qdd = np.random.randn(3, 20, 2)
+    npt.assert_allclose(planar_arm.inverse_dynamics(q, qd, qdd),
+                        planar_arm_dynamics(q, qd, qdd), atol=1e-10)
+
+
+def test_prismatic_joint():
+    """ A vertical prismatic joint carrying a mass only feels gravity
+    and its own acceleration.
+    """
+    chain = SerialChain([[0, 0, 0, 0]], [3.], np.zeros((1, 3)),
+                        np.zeros((1, 3, 3)), prismatic=[True])
+    q, qd, qdd = np.random.randn(3, 10, 1)
+    npt.assert_allclose(chain.inverse_dynamics(q, qd, qdd),
+                        3. * (qdd + 9.81))
+
+
+def test_create_torque_path_constraint(planar_arm):
+    """ The canonical constraint evaluates to the joint torques minus
+    the bounds.
+    """
+    np.random.seed(1)
+    path = SplineInterpolator(np.linspace(0, 1, 4), np.random.randn(4, 2))
+    ss = np.linspace(0, 1, 51)
+    pc = ta.create_torque_path_constraint(path, ss, planar_arm)
+    assert pc.nm == 4
+    u, x = np.random.randn(2)
+    x = abs(x)
+    q = path.eval(ss)
+    qd = path.evald(ss) * np.sqrt(x)
+    qdd = path.evald(ss) * u + path.evaldd(ss) * x
+    tau = planar_arm_dynamics(q, qd, qdd)
+    npt.assert_allclose(pc.a * u + pc.b * x + pc.c,
+                        np.hstack((tau - [50., 20.], - tau - [50., 20.])),
+                        atol=1e-8)
+
+
+def test_spatial_chain_energy():
+    """ For a spatial chain, the mass matrix is symmetric positive
+    definite and the power of the non-gravitational torques equals the
+    rate of change of the kinetic energy.
+    """
+    np.random.seed(2)
+    dof = 4
+    dh = np.random.randn(dof, 4)
+    inertias = np.array([np.dot(A, A.T) for A in np.random.randn(dof, 3, 3)])
+    chain = SerialChain(dh, np.random.rand(dof) + 0.5, np.random.randn(dof, 3),
+                        inertias, prismatic=[False, True, False, False])
+    q0, qd0, qdd0 = np.random.randn(3, dof)
+
+    def mass_matrix(q):
+        qs = np.tile(q, (dof, 1))
+        return chain.inverse_dynamics(qs, np.zeros((dof, dof)), np.eye(dof),
+                                      gravity=False).T
+
+    M = mass_matrix(q0)
+    npt.assert_allclose(M, M.T, atol=1e-10)
+    assert np.all(np.linalg.eigvalsh(M) > 0)
+
+    def kinetic_energy(t):
+        q = q0 + qd0 * t + qdd0 * t ** 2 / 2
+        qd = qd0 + qdd0 * t
+        return 0.5 * np.dot(qd, np.dot(mass_matrix(q), qd))
+
+    eps = 1e-6
+    dKE = (kinetic_energy(eps) - kinetic_energy(-eps)) / 2 / eps
+    tau = chain.inverse_dynamics(q0, qd0, qdd0, gravity=False)[0]
+    npt.assert_allclose(np.dot(qd0, tau), dKE, rtol=1e-6)
+
+
+def test_point_kinematics(planar_arm):
+    """ Compare with the closed-form kinematics of the tool point.
+    """
+    np.random.seed(2)
+    q, qd, qdd = np.random.randn(3, 20, 2)
+    point = [0.1, 0.2, 0.]
+    p, pd, pdd = planar_arm.point_kinematics(q, qd, qdd, point)
+
+    def position(q):
+        t1, t12 = q[:, 0], q[:, 0] + q[:, 1]
+        return np.vstack((
+            L1 * np.cos(t1) + (L2 + point[0]) * np.cos(t12) -
+            point[1] * np.sin(t12),
+            L1 * np.sin(t1) + (L2 + point[0]) * np.sin(t12) +
+            point[1] * np.cos(t12), np.zeros(len(q)))).T
+    npt.assert_allclose(p, position(q), atol=1e-10)
+    eps = 1e-5
+    pd_expected = (position(q + eps * qd) - position(q - eps * qd)) / 2 / eps
+    npt.assert_allclose(pd, pd_expected, atol=1e-7)
+    # Second derivative along t -> q + t qd + t^2 / 2 qdd
+    pdd_expected = (position(q + eps * qd + eps ** 2 / 2 * qdd) +
+                    position(q - eps * qd + eps ** 2 / 2 * qdd) -
+                    2 * position(q)) / eps ** 2
+    npt.assert_allclose(pdd, pdd_expected, atol=1e-4)
+
+
+def test_point_kinematics_prismatic():
+    """ A prismatic joint on a rotating base.
+    """
+    chain = SerialChain([[0, np.pi / 2, 0, 0], [0, 0, 0, 0]], [1., 1.],
+                        np.zeros((2, 3)), np.zeros((2, 3, 3)),
+                        prismatic=[False, True])
+    np.random.seed(3)
+    q, qd, qdd = np.random.randn(3, 10, 2)
+    p, pd, pdd = chain.point_kinematics(q, qd, qdd)
+    # The slider moves along (sin q0, -cos q0, 0) at distance q1
+    t, r = q[:, 0], q[:, 1]
+    td, rd, tdd, rdd = qd[:, 0], qd[:, 1], qdd[:, 0], qdd[:, 1]
+    e_r = np.vstack((np.sin(t), -np.cos(t), 0 * t)).T
+    e_t = np.vstack((np.cos(t), np.sin(t), 0 * t)).T
+    npt.assert_allclose(p, r[:, None] * e_r, atol=1e-12)
+    npt.assert_allclose(pd, (rd * e_r.T + r * td * e_t.T).T, atol=1e-12)
+    npt.assert_allclose(pdd, ((rdd - r * td ** 2) * e_r.T +
+                              (r * tdd + 2 * rd * td) * e_t.T).T, atol=1e-12)
+
+
+def test_payload_torque_path_constraint():
+    """ The constraint with a payload equals the constraint of the chain
+    whose last link carries the payload.
+    """
+    np.random.seed(3)
+    dof = 4
+    dh = np.random.randn(dof, 4)
+    masses = np.random.rand(dof) + 0.5
+    coms = np.random.randn(dof, 3)
+    inertias = np.array([np.dot(A, A.T) for A in np.random.randn(dof, 3, 3)])
+    prismatic = [False, True, False, False]
+    torque_limits = np.ones(dof) * 10
+    chain = SerialChain(dh, masses, coms, inertias, prismatic=prismatic,
+                        torque_limits=torque_limits)
+    path = SplineInterpolator(np.linspace(0, 1, 4), np.random.randn(4, dof))
+    ss = np.linspace(0, 1, 21)
+    payload_pc = ta.create_payload_torque_path_constraint(path, ss, chain)
+
+    mass = 2.
+    com = np.random.randn(3)
+    A = np.random.randn(3, 3)
+    inertia = np.dot(A, A.T)
+    pc = payload_pc.with_payload(mass, com, inertia)
+
+    # Combine the last link and the payload into a single rigid body
+    com_total = (masses[-1] * coms[-1] + mass * com) / (masses[-1] + mass)
+
+    def shifted(I, m, c):
+        d = c - com_total
+        return I + m * (np.dot(d, d) * np.eye(3) - np.outer(d, d))
+
+    masses_total = masses.copy()
+    masses_total[-1] += mass
+    coms_total = coms.copy()
+    coms_total[-1] = com_total
+    inertias_total = inertias.copy()
+    inertias_total[-1] = (shifted(inertias[-1], masses[-1], coms[-1]) +
+                          shifted(inertia, mass, com))
+    chain_total = SerialChain(dh, masses_total, coms_total, inertias_total,
+                              prismatic=prismatic,
+                              torque_limits=torque_limits)
+    pc_total = ta.create_torque_path_constraint(path, ss, chain_total)
+    npt.assert_allclose(pc.a, pc_total.a, atol=1e-8)
+    npt.assert_allclose(pc.b, pc_total.b, atol=1e-8)
+    npt.assert_allclose(pc.c, pc_total.c, atol=1e-8)
+
+    # Without payload
+    pc_zero = payload_pc.with_payload(0., np.zeros(3), np.zeros((3, 3)))
+    pc_chain = ta.create_torque_path_constraint(path, ss, chain)
+    npt.assert_allclose(pc_zero.c, pc_chain.c, atol=1e-10)
+
+
+def test_com_derivatives():
+    """ Compare with finite differences of the center of mass, and the
+    rate of the angular momentum about the base with the torque of the
+    first joint.
+    """
+    np.random.seed(4)
+    dof = 3
+    dh = np.random.randn(dof, 4)
+    inertias = np.array([np.dot(A, A.T) for A in np.random.randn(dof, 3, 3)])
+    chain = SerialChain(dh, np.random.rand(dof) + 0.5, np.random.randn(dof, 3),
+                        inertias, prismatic=[False, True, False])
+    q0, qd0, qdd0 = np.random.randn(3, dof)
+
+    def com_at(t):
+        q = q0 + qd0 * t + qdd0 * t ** 2 / 2
+        return chain.compute_com_derivatives([q])[0][0]
+
+    com, J_COM, H_COM, J_L, H_L = chain.compute_com_derivatives([q0])
+    npt.assert_allclose(com[0], com_at(0.))
+    eps = 1e-4
+    npt.assert_allclose(np.dot(J_COM[0], qd0),
+                        (com_at(eps) - com_at(-eps)) / 2 / eps, rtol=1e-6)
+    npt.assert_allclose(
+        np.dot(J_COM[0], qdd0) + np.dot(qd0, np.dot(H_COM[0], qd0)),
+        (com_at(eps) - 2 * com_at(0.) + com_at(-eps)) / eps ** 2,
+        rtol=1e-4, atol=1e-6)
+
+    Ld = np.dot(J_L[0], qdd0) + np.dot(qd0, np.dot(H_L[0], qd0))
+    tau = chain.inverse_dynamics(q0, qd0, qdd0, gravity=False)[0]
+    npt.assert_allclose(Ld[2], tau[0], rtol=1e-8)
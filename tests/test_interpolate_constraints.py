@@ -118,3 +118,51 @@ class TestFunc_interpolate_constraint(object):
 
             assert np.allclose(lGi_new, pc_intp.lG[i])
             assert np.allclose(hGi_new, pc_intp.hG[i])
+
+    def test_view(self, intp_fixture):
+        """ Stages are assembled from the original constraint, the
+        last stage repeats the stage N.
+        """
+        pc, pc_intp = intp_fixture
+        assert pc_intp.lazy and pc_intp.original is pc
+        for i in [0, pc.N - 1]:
+            stage = pc_intp.stage(i)
+            assert np.allclose(stage.G, block_diag(pc.G[i], pc.G[i + 1]))
+        stage = pc_intp.stage(pc.N)
+        assert np.allclose(stage.a, np.r_[pc.a[pc.N], pc.a[pc.N]])
+        assert np.allclose(stage.abar, np.r_[pc.abar[pc.N], pc.abar[pc.N]])
+        assert np.allclose(stage.D, block_diag(pc.D[pc.N], pc.D[pc.N]))
+        assert np.allclose(stage.G, block_diag(pc.G[pc.N], pc.G[pc.N]))
+
+
+def test_stage_invariant_coefficients():
+    """ Coefficients given without the stage axis are broadcast, and
+    stay invariant after interpolation.
+    """
+    N = 10
+    ss = np.linspace(0, 1, N + 1) ** 2
+    D = np.random.randn(N + 1, 2, 3)
+    l, h = - np.ones(3), np.ones(3)
+    G = np.random.randn(1, 3)
+    pc = PathConstraint(abar=np.random.randn(N + 1, 2),
+                        bbar=np.random.randn(2),
+                        cbar=np.random.randn(N + 1, 2), D=D, l=l, h=h,
+                        G=G, lG=[-1.], hG=[1.], ss=ss)
+    assert pc.l.shape == (N + 1, 3) and pc.l.strides[0] == 0
+    assert sorted(k for k, v in pc.invariants.items() if v.size > 0) == [
+        'G', 'bbar', 'h', 'hG', 'l', 'lG']
+
+    pc_intp = interpolate_constraint(pc)
+    invariants = pc_intp.invariants
+    assert 'abar' not in invariants and 'D' not in invariants
+    assert np.allclose(invariants['l'], np.r_[l, l])
+    assert np.allclose(invariants['G'], block_diag(G, G))
+    assert pc_intp.stage(3).G is pc_intp.stage(7).G
+    assert pc_intp.G.strides[0] == 0
+    for i in range(N):
+        ds = ss[i + 1] - ss[i]
+        stage = pc_intp.stage(i)
+        assert np.allclose(stage.abar, np.r_[pc.abar[i], pc.abar[i + 1] +
+                                             2 * ds * pc.bbar[i + 1]])
+        assert np.allclose(stage.bbar, np.r_[pc.bbar[i], pc.bbar[i + 1]])
+        assert np.allclose(stage.D, block_diag(D[i], D[i + 1]))
@@ -0,0 +1,58 @@
+import numpy as np
+import numpy.testing as npt
+
+from toppra import SerialChain, SplineInterpolator
+from toppra.utils import interpolate_gridpoints
+
+
+def test_smooth_functions():
+    ss = np.linspace(0, 1, 1001)
+    evaluated = []
+
+    def evaluate(idx):
+        evaluated.extend(idx)
+        s = ss[idx]
+        return np.sin(3 * s), np.vstack((np.exp(s), s ** 2)).T.reshape(-1, 1, 2)
+    (f, g), error = interpolate_gridpoints(evaluate, ss, rtol=1e-6)
+    assert f.shape == (1001, ) and g.shape == (1001, 1, 2)
+    assert len(evaluated) == len(set(evaluated)) < 300
+    assert np.all(error[evaluated] == 0)
+    npt.assert_allclose(f, np.sin(3 * ss), atol=1e-5)
+    npt.assert_allclose(g[:, 0, 0], np.exp(ss), atol=1e-5)
+
+
+def test_densify_at_kink():
+    """ Samples concentrate around a discontinuous derivative.
+    """
+    ss = np.linspace(0, 1, 501)
+    evaluated = []
+
+    def evaluate(idx):
+        evaluated.extend(idx)
+        return [np.abs(ss[idx] - 0.5013)]
+    (f, ), error = interpolate_gridpoints(evaluate, ss, rtol=1e-4,
+                                          n_samples=6)
+    assert np.max(np.abs(f - np.abs(ss - 0.5013))) < 1e-4 + 1e-8
+    assert len(evaluated) < 150
+    near_kink = np.abs(ss[evaluated] - 0.5) < 0.05
+    # Samples per unit length
+    assert np.sum(near_kink) / 0.1 > 3 * np.sum(~near_kink) / 0.9
+
+
+def test_torque_coefficients():
+    np.random.seed(0)
+    dof = 3
+    inertias = np.array([np.dot(A, A.T) for A in np.random.randn(dof, 3, 3)])
+    chain = SerialChain(np.random.randn(dof, 4), np.random.rand(dof) + 0.5,
+                        np.random.randn(dof, 3), inertias)
+    path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, dof))
+    ss = np.linspace(0, 1, 2001)
+    q, qs, qss = path.eval(ss), path.evald(ss), path.evaldd(ss)
+    expected = chain.compute_path_torque_coefficients(q, qs, qss)
+
+    def evaluate(idx):
+        return chain.compute_path_torque_coefficients(q[idx], qs[idx],
+                                                      qss[idx])
+    outputs, error = interpolate_gridpoints(evaluate, ss, rtol=1e-5)
+    for output, exp in zip(outputs, expected):
+        assert np.max(np.abs(output - exp)) < 1e-5 * np.abs(exp).max() * 10
@@ -0,0 +1,77 @@
+import os
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from toppra import SerialChain
+from toppra.parallel import WorkerPool, evaluate_gridpoints
+
+
+@pytest.fixture(name='chain_data')
+def create_chain_data():
+    np.random.seed(0)
+    dof = 3
+    inertias = np.array([np.dot(A, A.T) for A in np.random.randn(dof, 3, 3)])
+    chain = SerialChain(np.random.randn(dof, 4), np.random.rand(dof) + 0.5,
+                        np.random.randn(dof, 3), inertias)
+    q, qs, qss = np.random.randn(3, 101, dof)
+    return chain, q, qs, qss
+
+
+@pytest.mark.parametrize("n_workers", [1, 3])
+def test_evaluate_gridpoints(chain_data, n_workers):
+    """ Results agree with a single serial evaluation.
+    """
+    chain, q, qs, qss = chain_data
+    pids = []
+
+    def factory():
+        pids.append(os.getpid())  # Only seen by the calling process
+        return chain.compute_path_torque_coefficients
+    res = evaluate_gridpoints(factory, [q, qs, qss], [(3, )] * 3,
+                              n_workers=n_workers, chunk_size=7)
+    expected = chain.compute_path_torque_coefficients(q, qs, qss)
+    for r, e in zip(res, expected):
+        npt.assert_allclose(r, e)
+    assert len(pids) == (1 if n_workers == 1 else 0)
+
+
+def test_worker_failure(chain_data):
+    chain, q, qs, qss = chain_data
+
+    def factory():
+        def evaluator(q, qs, qss):
+            raise ValueError("Robot model not loaded")
+        return evaluator
+    with pytest.raises(RuntimeError) as err:
+        evaluate_gridpoints(factory, [q, qs, qss], [(3, )] * 3, n_workers=2)
+    assert "Robot model not loaded" in str(err.value)
+
+
+@pytest.mark.parametrize("n_workers", [1, 3])
+def test_worker_pool_reuse(chain_data, n_workers):
+    """ Workers build their evaluator once, serve all evaluations and
+    write into the shared outputs.
+    """
+    chain, q, qs, qss = chain_data
+    calls = []
+
+    def factory():
+        calls.append(None)  # Each worker has its own copy
+
+        def evaluator(q_):
+            n = len(q_)
+            return [np.full(n, os.getpid()), np.full(n, len(calls)),
+                    chain.compute_com_derivatives(q_)[0]]
+        return {'com': evaluator}
+    with WorkerPool(factory, [q], {'com': [(), (), (3, )]},
+                    n_workers=n_workers) as pool:
+        idx = np.arange(0, len(q), 2)
+        pids_1, calls_1, com_half = pool.evaluate(idx, chunk_size=5,
+                                                  evaluator='com')
+        pids_2, calls_2, com = pool.evaluate(evaluator='com')
+        assert com is pool.outputs['com'][2]  # No copy
+    npt.assert_allclose(com, chain.compute_com_derivatives(q)[0])
+    npt.assert_allclose(com_half, com[idx])
+    assert set(calls_1) == set(calls_2) == {1}
+    assert len(set(pids_1) | set(pids_2)) <= n_workers
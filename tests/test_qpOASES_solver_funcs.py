@@ -323,5 +323,14 @@ class Test_QpoasesPPsolver_main_funcs(object):
                     assert np.all(
                         c.a[i] * us[i] + c.b[i] * xs[i] + c.c[i] <= TINY)
 
+    def test_duration_lower_bound(self, pp_fixture):
+        """The lower bound obtained from the controllable sets does not
+        exceed the duration of the time-optimal profile.
 
-
+        """
+        pcs, solver = pp_fixture
+        solver.set_start_interval(0)
+        solver.set_goal_interval(0.1)
+        duration_lb = solver.compute_duration_lower_bound()
+        us, xs = solver.solve_topp(reg=0)
+        assert duration_lb <= fa.compute_duration(solver.ss, xs) + TINY
@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 from scipy.linalg import block_diag
-from toppra import (PathConstraint,
+from toppra import (PathConstraint, LazyPathConstraint,
                     qpOASESPPSolver,
                     INFTY)
 
@@ -204,3 +204,65 @@ class TestClass_qpOASES_solver_matrices(object):
             assert np.allclose(pp.h[i, 2:], h_expected)
 
 
+def test_lazy_stage_matrices(qpOASES_mat_fixtures):
+    """ A solver with lazy constraints assembles the same matrices.
+    """
+    pcs, pp = qpOASES_mat_fixtures
+    calls = []
+
+    def lazy_copy(pc):
+        def evaluate_stage(i):
+            calls.append(i)
+            return pc.stage(i)._asdict()
+        return LazyPathConstraint(evaluate_stage, pc.ss, cache_size=2)
+    pcs_lazy = [lazy_copy(pc) for pc in pcs]
+    pp_lazy = qpOASESPPSolver(pcs_lazy)
+    assert pp_lazy.lazy
+    assert pp_lazy.A.shape == (pp.N + 1, pp.nop, pp.nV)
+
+    pp.A[:, 0, 1] = 1.
+    pp_lazy.A[:, 0, 1] = 1.
+    pp.lA[:, 0] = 0.5
+    pp_lazy.lA[:, 0] = 0.5
+    for i in range(pp.N, -1, -1):
+        for expected, actual in zip(pp.stage_matrices(i),
+                                    pp_lazy.stage_matrices(i)):
+            np.testing.assert_allclose(actual, expected)
+    # Each stage is evaluated once per constraint
+    assert len(calls) == len(pcs) * (pp.N + 2)
+
+
+def test_invariant_stage_matrices():
+    """ Stage-invariant coefficients are not expanded to all stages.
+    """
+    N, neq, nv, niq = 50, 3, 5, 4
+    ss = np.linspace(0, 1, N + 1)
+    coeffs = dict(abar=np.random.randn(N + 1, neq),
+                  bbar=np.random.randn(N + 1, neq),
+                  cbar=np.random.randn(N + 1, neq),
+                  D=np.random.randn(neq, nv), l=np.random.randn(nv),
+                  h=np.random.randn(nv), G=np.random.randn(niq, nv),
+                  lG=np.random.randn(niq), hG=np.random.randn(niq))
+    pc = PathConstraint(ss=ss, **coeffs)
+    assert sorted(pc.invariants) == ['D', 'G', 'h', 'hG', 'l', 'lG']
+    pc_expanded = PathConstraint(ss=ss, **dict(
+        (field, np.array(getattr(pc, field))) for field in coeffs))
+    pp = qpOASESPPSolver([pc])
+    pp_expanded = qpOASESPPSolver([pc_expanded])
+    assert pp.lazy and not pp_expanded.lazy
+    assert pp.A.shape == (N + 1, pp.nop, pp.nV)
+    assert pp.A.nbytes * pp.nC == pp_expanded.A.nbytes * pp.nop
+
+    for i in range(N + 1):
+        for expected, actual in zip(pp_expanded.stage_matrices(i),
+                                    pp.stage_matrices(i)):
+            np.testing.assert_allclose(actual, expected)
+
+    # Invariant rows are copied from the template, not filled per stage
+    assert pp._varying == [{'a', 'b', 'c', 'abar', 'bbar', 'cbar'}]
+    rows = slice(pp.nop + neq, pp.nC)
+    pp._template[0][rows] = 7.
+    pp._stages.clear()
+    A, l, h, lA, hA = pp.stage_matrices(N // 2)
+    assert np.all(A[rows] == 7.)
+    np.testing.assert_allclose(A[pp.nop: pp.nop + neq, 0], pc.abar[N // 2])
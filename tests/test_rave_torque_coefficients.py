@@ -0,0 +1,111 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from toppra.utils import inv_dyn, compute_rave_torque_coefficients
+
+
+class MockRobot(object):
+    """ Two-link stand-in for an OpenRAVE robot.
+
+    Setting velocities above the velocity limits raises, as OpenRAVE
+    does when checking limits.
+    """
+    def __init__(self):
+        self.vlim = np.array([1., 2.])
+        self.alim = np.array([3., 4.])
+        self.q = np.zeros(2)
+        self.qd = np.zeros(2)
+        self.fail = False
+
+    def GetDOF(self):
+        return 2
+
+    def GetDOFVelocityLimits(self):
+        return self.vlim.copy()
+
+    def GetDOFAccelerationLimits(self):
+        return self.alim.copy()
+
+    def SetDOFVelocityLimits(self, vlim):
+        self.vlim = np.array(vlim, dtype=float)
+
+    def SetDOFAccelerationLimits(self, alim):
+        self.alim = np.array(alim, dtype=float)
+
+    def __enter__(self):
+        self._saved = (self.q.copy(), self.qd.copy())
+        return self
+
+    def __exit__(self, *args):
+        self.q, self.qd = self._saved
+
+    def SetDOFValues(self, q):
+        self.q = np.array(q, dtype=float)
+
+    def SetDOFVelocities(self, qd):
+        if np.any(np.abs(qd) > self.vlim):
+            raise ValueError("Velocity limits exceeded.")
+        self.qd = np.array(qd, dtype=float)
+
+    def ComputeInverseDynamics(self, qdd, forceslist=None,
+                               returncomponents=True):
+        if self.fail:
+            raise RuntimeError("Inverse dynamics failed.")
+        q, qd = self.q, self.qd
+        M = np.array([[2 + np.cos(q[1]), 0.5 + 0.5 * np.cos(q[1])],
+                      [0.5 + 0.5 * np.cos(q[1]), 1.]])
+        h = np.sin(q[1])
+        coriolis = np.array([-h * (2 * qd[0] * qd[1] + qd[1] ** 2),
+                             h * qd[0] ** 2])
+        gravity = 9.8 * np.array([np.cos(q[0]), np.cos(q[0] + q[1])])
+        res = [M.dot(qdd), coriolis, gravity]
+        if returncomponents:
+            return res
+        return sum(res)
+
+
+@pytest.fixture(name='path_data')
+def create_path_data():
+    np.random.seed(2)
+    N = 10
+    q = np.random.randn(N, 2)
+    qs = 3 * np.random.randn(N, 2)
+    qss = np.random.randn(N, 2)
+    return q, qs, qss
+
+
+def test_match_inv_dyn(path_data):
+    """ The coefficients match per-point inverse dynamics, and the
+    limits are restored afterwards.
+    """
+    q, qs, qss = path_data
+    robot = MockRobot()
+    a, b, c = compute_rave_torque_coefficients(robot, q, qs, qss)
+    npt.assert_allclose(robot.vlim, [1., 2.])
+    npt.assert_allclose(robot.alim, [3., 4.])
+
+    for i in range(q.shape[0]):
+        a_i = inv_dyn(robot, q[i], np.zeros(2), qs[i])[0]
+        t1, t2, t3 = inv_dyn(robot, q[i], qs[i], qss[i])
+        npt.assert_allclose(a[i], a_i)
+        npt.assert_allclose(b[i], t1 + t2)
+        npt.assert_allclose(c[i], t3)
+    npt.assert_allclose(robot.vlim, [1., 2.])
+    npt.assert_allclose(robot.alim, [3., 4.])
+
+
+def test_restore_limits_on_error(path_data):
+    """ The limits are restored when the inverse dynamics raise.
+    """
+    q, qs, qss = path_data
+    robot = MockRobot()
+    robot.fail = True
+    with pytest.raises(RuntimeError):
+        compute_rave_torque_coefficients(robot, q, qs, qss)
+    npt.assert_allclose(robot.vlim, [1., 2.])
+    npt.assert_allclose(robot.alim, [3., 4.])
+    with pytest.raises(RuntimeError):
+        inv_dyn(robot, q[0], qs[0], qss[0])
+    npt.assert_allclose(robot.vlim, [1., 2.])
+    npt.assert_allclose(robot.alim, [3., 4.])
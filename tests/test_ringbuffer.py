@@ -0,0 +1,76 @@
+import multiprocessing
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from toppra import SplineInterpolator, compute_trajectory_chunks
+from toppra.ringbuffer import RingBufferWriter, RingBufferReader
+
+
+def consume(filename, queue):
+    """ Read the whole stream, then send it back for checking.
+    """
+    reader = RingBufferReader(filename)
+    chunks = [np.array(records) for records in reader.iter_records()]
+    queue.put(np.concatenate(chunks))
+
+
+@pytest.fixture(name='traj_data')
+def create_trajectory_fixtures():
+    np.random.seed(3)
+    N = 40
+    path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 4))
+    ss = np.linspace(0, 1, N + 1)
+    us = np.zeros(N)
+    xs = np.ones(N + 1)
+    return path, ss, us, xs
+
+
+def test_two_processes(traj_data, tmpdir):
+    """ A consumer process receives every sample, in order.
+
+    The capacity is much smaller than the number of samples so the
+    stream wraps around many times.
+    """
+    path, ss, us, xs = traj_data
+    filename = str(tmpdir.join("traj_buffer"))
+    writer = RingBufferWriter(filename, path.dof, capacity=37)
+    queue = multiprocessing.Queue()
+    consumer = multiprocessing.Process(target=consume,
+                                       args=(filename, queue))
+    consumer.start()
+    writer.push_trajectory(path, ss, us, xs, dt=1e-3, chunk_size=50)
+    writer.close()
+    records = queue.get(timeout=30)
+    consumer.join()
+
+    chunks = list(compute_trajectory_chunks(path, ss, us, xs, dt=1e-3))
+    npt.assert_allclose(records['t'], np.hstack([c[0] for c in chunks]))
+    npt.assert_allclose(records['q'], np.vstack([c[1] for c in chunks]))
+    npt.assert_allclose(records['qd'], np.vstack([c[2] for c in chunks]))
+    npt.assert_allclose(records['qdd'], np.vstack([c[3] for c in chunks]))
+
+
+def test_non_blocking_push(tmpdir):
+    filename = str(tmpdir.join("traj_buffer"))
+    writer = RingBufferWriter(filename, 2, capacity=5)
+    reader = RingBufferReader(filename)
+    ts = np.arange(8.)
+    q = np.random.randn(8, 2)
+    assert writer.push(ts, q, q, q, block=False) == 5
+    records = reader.peek(3)
+    npt.assert_allclose(records['q'], q[:3])
+    reader.advance(3)
+    assert writer.push(ts[5:], q[5:], q[5:], q[5:], block=False) == 3
+    # Wraps around: only the contiguous part is returned
+    npt.assert_allclose(reader.peek()['t'], [3., 4.])
+    reader.advance(2)
+    npt.assert_allclose(reader.peek()['t'], [5., 6., 7.])
+
+
+def test_invalid_file(tmpdir):
+    filename = str(tmpdir.join("garbage"))
+    with open(filename, 'wb') as f:
+        f.write(b'\x00' * 128)
+    with pytest.raises(ValueError):
+        RingBufferReader(filename)
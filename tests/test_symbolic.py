@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from toppra import SplineInterpolator
+
+sympy = pytest.importorskip("sympy")
+from toppra.symbolic import (U, X, S, compile_canonical_constraint,
+                             create_symbolic_path_constraint)
+
+
+def test_canonical_coefficients():
+    ss = np.linspace(0, 1, 11)
+    expressions = [- 0.2 * (0.5 - S) * U + 3 * X - 1 <= 0,
+                   X >= 0, U <= 1, U >= -1, S * X <= U * sympy.cos(S)]
+    pc = create_symbolic_path_constraint(expressions, ss, name="Sym")
+    assert pc.name == "Sym" and pc.nm == 5
+    np.testing.assert_allclose(pc.a[:, 0], - 0.2 * (0.5 - ss))
+    np.testing.assert_allclose(pc.b[:, 0], 3)
+    np.testing.assert_allclose(pc.c[:, 0], -1)
+    np.testing.assert_allclose(pc.b[:, 1], -1)
+    np.testing.assert_allclose(pc.a[:, 2:4], [[1, -1]] * 11)
+    np.testing.assert_allclose(pc.c[:, 2:4], [[-1, -1]] * 11)
+    np.testing.assert_allclose(pc.a[:, 4], - np.cos(ss))
+    np.testing.assert_allclose(pc.b[:, 4], ss)
+
+
+def test_joint_symbols():
+    np.random.seed(0)
+    path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 2))
+    ss = np.linspace(0, 1, 21)
+    q = sympy.symbols('q0 q1')
+    qs = sympy.symbols('qs0 qs1')
+    qss = sympy.symbols('qss0 qss1')
+    # Acceleration of the second joint within [-2, 3]
+    expressions = [qs[1] * U + qss[1] * X <= 3,
+                   qs[1] * U + qss[1] * X >= -2,
+                   sympy.sin(q[0]) * X <= 1]
+    evaluate = compile_canonical_constraint(expressions, q=q, qs=qs, qss=qss)
+    a, b, c = evaluate(ss, path)
+    np.testing.assert_allclose(a[:, 0], path.evald(ss)[:, 1])
+    np.testing.assert_allclose(b[:, 1], - path.evaldd(ss)[:, 1])
+    np.testing.assert_allclose(c[:, :2], [[-3, -2]] * 21)
+    np.testing.assert_allclose(b[:, 2], np.sin(path.eval(ss)[:, 0]))
+
+
+def test_not_affine():
+    with pytest.raises(ValueError):
+        compile_canonical_constraint([U * X <= 1])
+
+
+def test_strict_inequalities():
+    """ Strict inequalities are not silently relaxed.
+    """
+    for expression in [U < 1, X > 0, sympy.Eq(U, 1)]:
+        with pytest.raises(ValueError):
+            compile_canonical_constraint([expression])
@@ -0,0 +1,145 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from toppra import (PolynomialInterpolator, SplineInterpolator,
+                    Trajectory, compute_trajectory_gridpoints,
+                    compute_trajectory_points,
+                    compute_trajectory_chunks, compute_time_grid,
+                    compute_duration, compute_trajectory_ppoly)
+
+
+@pytest.fixture(params=[1, 3], name='traj_data')
+def create_trajectory_fixtures(request):
+    """ A path with a profile satisfying x[i+1] = x[i] + 2 ds u[i].
+    """
+    np.random.seed(1)
+    N = 50
+    if request.param == 1:
+        path = PolynomialInterpolator([0, 1, -0.5, 0.2])
+    else:
+        path = SplineInterpolator(np.linspace(0, 1, 5), np.random.randn(5, 3))
+    ss = np.linspace(0, 1, N + 1)
+    us = np.random.randn(N)
+    xs = np.zeros(N + 1)
+    xs[0] = 1.
+    for i in range(N):
+        xs[i + 1] = xs[i] + 2 * (ss[i + 1] - ss[i]) * us[i]
+    return path, ss, us, xs
+
+
+class Test_Trajectory(object):
+    """ Test suite for Trajectory.
+    """
+
+    def test_gridpoints(self, traj_data):
+        """ Evaluating at the gridpoint times agrees with
+        `compute_trajectory_gridpoints`.
+        """
+        path, ss, us, xs = traj_data
+        traj = Trajectory(path, ss, us, xs)
+        tgrid, q, qd, qdd = compute_trajectory_gridpoints(path, ss, us, xs)
+        npt.assert_allclose(traj.tgrid, tgrid)
+        npt.assert_allclose(traj.duration, tgrid[-1])
+        q_, qd_, qdd_ = traj.eval_all(tgrid)
+        npt.assert_allclose(q_, q, atol=1e-8)
+        npt.assert_allclose(qd_, qd, atol=1e-8)
+        # The path acceleration at a gridpoint is the one of the
+        # interval starting there.
+        npt.assert_allclose(qdd_, qdd, atol=1e-8)
+
+    def test_shapes(self, traj_data):
+        path, ss, us, xs = traj_data
+        traj = Trajectory(path, ss, us, xs)
+        ts = np.linspace(0, traj.duration, 17)
+        for res in [traj.eval(ts), traj.evald(ts), traj.evaldd(ts)]:
+            if path.dof == 1:
+                assert res.shape == (17, )
+            else:
+                assert res.shape == (17, path.dof)
+        npt.assert_allclose(traj.eval(ts[5]), traj.eval(ts)[5])
+        npt.assert_allclose(traj.evaldd(ts[5]), traj.evaldd(ts)[5])
+
+    def test_finite_difference(self, traj_data):
+        """ Velocities are the time derivatives of positions.
+        """
+        path, ss, us, xs = traj_data
+        traj = Trajectory(path, ss, us, xs)
+        ts = np.linspace(0.01, traj.duration - 0.01, 23)
+        eps = 1e-6
+        qd_fd = (traj.eval(ts + eps) - traj.eval(ts - eps)) / 2 / eps
+        npt.assert_allclose(traj.evald(ts), qd_fd, atol=1e-5)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 10000])
+def test_compute_trajectory_chunks(traj_data, chunk_size):
+    """ Chunks concatenate to the uniformly sampled trajectory.
+    """
+    path, ss, us, xs = traj_data
+    dt = 1e-2
+    traj = Trajectory(path, ss, us, xs)
+    chunks = list(compute_trajectory_chunks(
+        path, ss, us, xs, dt=dt, chunk_size=chunk_size))
+    assert all(chunk[0].shape[0] <= chunk_size for chunk in chunks)
+    ts = np.hstack([chunk[0] for chunk in chunks])
+    npt.assert_allclose(ts, np.arange(0, traj.duration, dt))
+    expected = compute_trajectory_points(path, ss, us, xs, dt=dt)
+    npt.assert_allclose(ts, expected[0])
+    for k in range(1, 4):
+        res = np.concatenate([chunk[k] for chunk in chunks])
+        npt.assert_allclose(res, traj.eval_all(ts)[k - 1], atol=1e-10)
+        npt.assert_allclose(res, expected[k], atol=1e-8)
+
+
+def test_compute_time_grid_batch(traj_data):
+    """ Profiles given as a batch are processed independently.
+    """
+    path, ss, us, xs = traj_data
+    xs_batch = np.vstack((xs, xs * 4, xs + 1))
+    tgrid = compute_time_grid(ss, xs_batch)
+    assert tgrid.shape == xs_batch.shape
+    npt.assert_allclose(tgrid[0], compute_trajectory_gridpoints(
+        path, ss, us, xs)[0])
+    npt.assert_allclose(tgrid[1], tgrid[0] / 2)
+    npt.assert_allclose(compute_time_grid(ss, xs_batch[2]), tgrid[2])
+    durations = compute_duration(ss, xs_batch)
+    npt.assert_allclose(durations, tgrid[:, -1])
+    npt.assert_allclose(compute_duration(ss, xs), tgrid[0, -1])
+
+
+def test_compute_trajectory_ppoly(traj_data):
+    """ The piecewise polynomial in time is exact.
+    """
+    path, ss, us, xs = traj_data
+    traj = Trajectory(path, ss, us, xs)
+    q_t = compute_trajectory_ppoly(path, ss, us, xs)
+    npt.assert_allclose(q_t.x[[0, -1]], [0, traj.duration])
+    ts = np.linspace(0, traj.duration, 1001)
+    q, qd, qdd = traj.eval_all(ts)
+    npt.assert_allclose(q_t(ts), q, atol=1e-8)
+    npt.assert_allclose(q_t.derivative()(ts), qd, atol=1e-8)
+    # Accelerations jump at the gridpoints: compare inside intervals only
+    ts_mid = (traj.tgrid[1:] + traj.tgrid[:-1]) / 2
+    npt.assert_allclose(q_t.derivative(2)(ts_mid), traj.evaldd(ts_mid),
+                        atol=1e-8)
+
+
+def test_outputs_own_memory(traj_data):
+    """ The outputs are writable and do not alias the memoized path
+    evaluations, also when smoothed in place.
+    """
+    path, ss, us, xs = traj_data
+    traj = Trajectory(path, ss, us, xs)
+    ts = np.linspace(0, traj.duration, 17)
+    outputs = [compute_trajectory_gridpoints(path, ss, us, xs)[1],
+               traj.eval_all(ts)[0], traj.eval(ts),
+               compute_trajectory_points(path, ss, us, xs)[1]]
+    if path.dof > 1:
+        pytest.importorskip("quadprog")
+        _, q_smooth, _, _ = compute_trajectory_points(path, ss, us, xs,
+                                                      smooth=True)
+        outputs.append(q_smooth)
+    for q in outputs:
+        q[...] = np.nan
+    npt.assert_allclose(path.eval_all(ss)[0], path.eval(ss))
+    npt.assert_allclose(traj.eval(ts), path.eval(traj.eval_path_states(ts)[0]))
@@ -7,6 +7,8 @@ from qpoases import (PyOptions as Options, PyPrintLevel as PrintLevel,
                      PyReturnValue as ReturnValue, PySQProblem as SQProblem)
 import logging
 import quadprog
+from trajectory import compute_time_grid, compute_duration
+from utils import LRUCache
 
 logger = logging.getLogger(__name__)
 SUCCESSFUL_RETURN = ReturnValue.SUCCESSFUL_RETURN
@@ -56,16 +58,14 @@ def compute_trajectory_gridpoints(path, sgrid, ugrid, xgrid):
     qdd : array
         Shape (N+1, dof). Joint accelerations at each gridpoints.
     """
-    tgrid = np.zeros_like(sgrid)
+    tgrid = compute_time_grid(sgrid, xgrid)
     N = sgrid.shape[0] - 1
     sdgrid = np.sqrt(xgrid)
-    for i in range(N):
-        tgrid[i + 1] = ((sgrid[i + 1] - sgrid[i]) / (sdgrid[i] + sdgrid[i + 1]) * 2
-                        + tgrid[i])
     sddgrid = np.hstack((ugrid, ugrid[-1]))
-    q = path.eval(sgrid)
-    qs = path.evald(sgrid)  # derivative w.r.t [path position] s
-    qss = path.evaldd(sgrid)
+    # Derivatives w.r.t [path position] s. The evaluation may be memoized
+    # and read-only: the returned positions are a copy.
+    q, qs, qss = path.eval_all(sgrid)
+    q = np.array(q)
     array_mul = lambda v_arr, s_arr: np.array(
         [v_arr[i] * s_arr[i] for i in range(N + 1)])
     qd = array_mul(qs, sdgrid)
@@ -133,12 +133,9 @@ def compute_trajectory_points(path, sgrid, ugrid, xgrid, dt=1e-2, smooth=False,
         Shape (M, dof). Joint accelerations at each gridpoints.
 
     """
-    tgrid = np.zeros_like(sgrid)  # Array of time at each gridpoint
+    tgrid = compute_time_grid(sgrid, xgrid)  # Array of time at each gridpoint
     N = sgrid.shape[0] - 1
     sdgrid = np.sqrt(xgrid)
-    for i in range(N):
-        tgrid[i + 1] = ((sgrid[i + 1] - sgrid[i]) / (sdgrid[i] + sdgrid[i + 1]) * 2
-                        + tgrid[i])
     # shape (M+1,) array of sampled time
     tsample = np.arange(tgrid[0], tgrid[-1], dt)
     ssample = np.zeros_like(tsample)  # sampled position
@@ -155,9 +152,10 @@ def compute_trajectory_points(path, sgrid, ugrid, xgrid, dt=1e-2, smooth=False,
         ssample[i] = (sgrid[igrid] +
                       (xsample[i] - xgrid[igrid]) / 2 / usample[i])
 
-    q = path.eval(ssample)
-    qs = path.evald(ssample)  # derivative w.r.t [path position] s
-    qss = path.evaldd(ssample)
+    # Derivatives w.r.t [path position] s. The evaluation may be memoized
+    # and read-only: the positions are copied, and smoothed in place.
+    q, qs, qss = path.eval_all(ssample)
+    q = np.array(q)
 
     def array_mul(vectors, scalars):
         # given array of vectors and array of scalars
@@ -247,16 +245,22 @@ class qpOASESPPSolver(object):
         Dimension of the optimization variable.
     nC : int
         (``qpOASES``) Number of constraints .
+    lazy : bool
+        True if a constraint is a :class:`.LazyPathConstraint`, or has
+        stage-invariant coefficients. The matrices of each stage are
+        then only available from :func:`stage_matrices`, and `A`, `lA`,
+        `hA`, `l` and `h` only hold the operational rows.
     A : array
-        (``qpOASES``) Shape (N+1, nC, nV).
+        (``qpOASES``) Shape (N+1, nC, nV). Shape (N+1, nop, nV) if
+        `lazy`.
     lA : array
-        (``qpOASES``) Shape (N+1, nC).
+        (``qpOASES``) Shape (N+1, nC). Shape (N+1, nop) if `lazy`.
     hA : array
-        (``qpOASES``) Shape (N+1, nC).
+        (``qpOASES``) Shape (N+1, nC). Shape (N+1, nop) if `lazy`.
     l : array
-        (``qpOASES``) Shape (N+1, nV).
+        (``qpOASES``) Shape (N+1, nV). None if `lazy`.
     h : array
-        (``qpOASES``) Shape (N+1, nV).
+        (``qpOASES``) Shape (N+1, nV). None if `lazy`.
     H : array
         (``qpOASES``) Shape (nV, nV).
     g : array
@@ -297,6 +301,12 @@ class qpOASESPPSolver(object):
     The vectors :math:`l[i], h[i]` contain hard-bounds on :math:`u, x,
     \mathbf{v}` respectively.
 
+    If one of the constraints is lazy, or has coefficients which are
+    the same at all stages, the matrices are not assembled for all
+    stages. Only the operational rows are stored in `A`, `lA` and
+    `hA`, and the matrices of a stage are assembled when the stage is
+    visited, see :func:`qpOASESPPSolver.stage_matrices`.
+
     """
     def __init__(self, constraint_set, verbose=False):
         self.I0 = np.r_[0, 1e-4]  # Start and end velocity interval
@@ -313,6 +323,10 @@ class qpOASESPPSolver(object):
         self.nop = 3  # Operational row, used for special constraints
 
         self.constraint_set = constraint_set
+        # Stage-invariant coefficients are not expanded to all stages
+        self.lazy = any(c.lazy or any(coeff.size > 0 for coeff in
+                                      c.invariants.values())
+                        for c in constraint_set)
 
         # Pre-processing: Compute shape and init zero coeff matrices
         self._init_matrices(constraint_set)
@@ -414,7 +428,7 @@ Initialize Path Parameterization instance
         # input to the algorithm. After solving finished, the variable
         # become the number of Working Set Recalculation carried out.
         self.nWSR_cnst = 1000
-        _, nC, nV = self.A.shape
+        nC, nV = self.nC, self.nV
         # Setup solver
         options = Options()
         if verbose:
@@ -448,13 +462,30 @@ Initialize Path Parameterization instance
 
         self.H = np.zeros((self.nV, self.nV))
         self.g = np.zeros(self.nV)
-        # fixed bounds
-        self.l = np.zeros((self.N + 1, self.nV))
-        self.h = np.zeros((self.N + 1, self.nV))
-        # lA, A, hA constraints
-        self.lA = np.zeros((self.N + 1, self.nC))
-        self.hA = np.zeros((self.N + 1, self.nC))
-        self.A = np.zeros((self.N + 1, self.nC, self.nV))
+        if self.lazy:
+            # Only the operational rows, see `stage_matrices`
+            self.l = None
+            self.h = None
+            self.lA = np.zeros((self.N + 1, self.nop))
+            self.hA = np.zeros((self.N + 1, self.nop))
+            self.A = np.zeros((self.N + 1, self.nop, self.nV))
+            self._stages = LRUCache(2)
+            # Matrices shared by all stages, and the coefficients which
+            # differ between stages, see `stage_matrices`
+            self._template = (np.zeros((self.nC, self.nV)),
+                              np.zeros(self.nV), np.zeros(self.nV),
+                              np.zeros(self.nC), np.zeros(self.nC))
+            self._varying = [
+                set(c.stage(0)._fields) - set(c.invariants)
+                for c in constraint_set]
+        else:
+            # fixed bounds
+            self.l = np.zeros((self.N + 1, self.nV))
+            self.h = np.zeros((self.N + 1, self.nV))
+            # lA, A, hA constraints
+            self.lA = np.zeros((self.N + 1, self.nC))
+            self.hA = np.zeros((self.N + 1, self.nC))
+            self.A = np.zeros((self.N + 1, self.nC, self.nV))
         self._xfull = np.zeros(self.nV)  # interval vector, store primal
         self._yfull = np.zeros(self.nC)  # interval vector, store dual
 
@@ -471,48 +502,145 @@ Initialize Path Parameterization instance
         self.A[:, :self.nop, :] = 0.  # operational rows
         self.lA[:, :self.nop] = 0.
         self.hA[:, :self.nop] = 0.
+        if self.lazy:
+            self._stages.clear()
+            # Stage-invariant rows are filled once, in the template
+            A, l, h, lA, hA = self._template
+            A.fill(0)
+            lA.fill(0)
+            hA.fill(0)
+            self._fill_constraint_rows(
+                A, lA, hA, l, h, [c.stage(0) for c in self.constraint_set])
+        else:
+            self._fill_constraint_rows(self.A, self.lA, self.hA, self.l,
+                                       self.h, self.constraint_set)
+
+    def _fill_constraint_rows(self, A, lA, hA, l, h, coefficients,
+                              fields=None):
+        """Fill the constraint rows and the bounds on variables.
+
+        Parameters
+        ----------
+        A, lA, hA, l, h : array
+            Matrices for all stages, or for a single stage.
+        coefficients : list
+            Coefficients of the constraints. Either the
+            :class:`.PathConstraint` themselves, or their
+            :class:`.PathConstraintStage` at a single stage.
+        fields : list of set, optional
+            Names of the coefficients to write, for each constraint.
+            By default, all the coefficients and the constant entries
+            are written.
+        """
+        if fields is None:
+            fields = [None] * len(self.constraint_set)
+        constraints = list(zip(self.constraint_set, coefficients, fields))
+
+        def writes(field, written):
+            return written is None or field in written
+
         # canonical
         row = self.nop
-        for c in filter(lambda c: c.nm != 0, self.constraint_set):
-            self.A[:, row: row + c.nm, 0] = c.a
-            self.A[:, row: row + c.nm, 1] = c.b
-            self.lA[:, row: row + c.nm] = - INFTY
-            self.hA[:, row: row + c.nm] = - c.c
+        for c, coeffs, written in filter(lambda cc: cc[0].nm != 0,
+                                         constraints):
+            if writes('a', written):
+                A[..., row: row + c.nm, 0] = coeffs.a
+            if writes('b', written):
+                A[..., row: row + c.nm, 1] = coeffs.b
+            if written is None:
+                lA[..., row: row + c.nm] = - INFTY
+            if writes('c', written):
+                hA[..., row: row + c.nm] = - coeffs.c
             row += c.nm
 
         # equalities
         row = self.nop + self.nm
         col = 2
-        for c in filter(lambda c: c.neq != 0, self.constraint_set):
-            self.A[:, row: row + c.neq, 0] = c.abar
-            self.A[:, row: row + c.neq, 1] = c.bbar
-            self.A[:, row: row + c.neq, col: col + c.nv] = - c.D
-            self.lA[:, row: row + c.neq] = - c.cbar
-            self.hA[:, row: row + c.neq] = - c.cbar
+        for c, coeffs, written in filter(lambda cc: cc[0].neq != 0,
+                                         constraints):
+            if writes('abar', written):
+                A[..., row: row + c.neq, 0] = coeffs.abar
+            if writes('bbar', written):
+                A[..., row: row + c.neq, 1] = coeffs.bbar
+            if writes('D', written):
+                A[..., row: row + c.neq, col: col + c.nv] = - coeffs.D
+            if writes('cbar', written):
+                lA[..., row: row + c.neq] = - coeffs.cbar
+                hA[..., row: row + c.neq] = - coeffs.cbar
             row += c.neq
             col += c.nv
 
         # inequalities
         row = self.nop + self.nm + self.neq
         col = 2
-        for c in filter(lambda c: c.niq != 0, self.constraint_set):
-            self.A[:, row: row + c.niq, col: col + c.nv] = c.G
-            self.lA[:, row: row + c.niq] = c.lG
-            self.hA[:, row: row + c.niq] = c.hG
+        for c, coeffs, written in filter(lambda cc: cc[0].niq != 0,
+                                         constraints):
+            if writes('G', written):
+                A[..., row: row + c.niq, col: col + c.nv] = coeffs.G
+            if writes('lG', written):
+                lA[..., row: row + c.niq] = coeffs.lG
+            if writes('hG', written):
+                hA[..., row: row + c.niq] = coeffs.hG
             row += c.niq
             col += c.nv
 
         # bounds on var
-        self.l[:, 0] = - INFTY  # - infty <= u <= infty
-        self.h[:, 0] = INFTY
-        self.l[:, 1] = 0  # 0 <= x <= infty
-        self.h[:, 1] = INFTY
+        if None in fields:
+            l[..., 0] = - INFTY  # - infty <= u <= infty
+            h[..., 0] = INFTY
+            l[..., 1] = 0  # 0 <= x <= infty
+            h[..., 1] = INFTY
         row = 2
-        for c in filter(lambda c: c.nv != 0, self.constraint_set):
-            self.l[:, row: row + c.nv] = c.l
-            self.h[:, row: row + c.nv] = c.h
+        for c, coeffs, written in filter(lambda cc: cc[0].nv != 0,
+                                         constraints):
+            if writes('l', written):
+                l[..., row: row + c.nv] = coeffs.l
+            if writes('h', written):
+                h[..., row: row + c.nv] = coeffs.h
             row += c.nv
 
+    def stage_matrices(self, i):
+        """Matrices of the QP at the i-th stage.
+
+        If the solver is lazy, the matrices are copied from a template
+        holding the stage-invariant coefficients, the other
+        coefficients of the stage are written in, and the matrices are
+        kept until two other stages have been visited. The current operational rows are copied in
+        on each call.
+
+        Parameters
+        ----------
+        i : int
+
+        Returns
+        -------
+        A : array
+            Shape (nC, nV).
+        l : array
+            Shape (nV, ).
+        h : array
+            Shape (nV, ).
+        lA : array
+            Shape (nC, ).
+        hA : array
+            Shape (nC, ).
+        """
+        if not self.lazy:
+            return self.A[i], self.l[i], self.h[i], self.lA[i], self.hA[i]
+        matrices = self._stages.get(i)
+        if matrices is None:
+            matrices = tuple(m.copy() for m in self._template)
+            A, l, h, lA, hA = matrices
+            self._fill_constraint_rows(
+                A, lA, hA, l, h, [c.stage(i) for c in self.constraint_set],
+                self._varying)
+            self._stages[i] = matrices
+        A, l, h, lA, hA = matrices
+        A[:self.nop] = self.A[i]
+        lA[:self.nop] = self.lA[i]
+        hA[:self.nop] = self.hA[i]
+        return matrices
+
     def solve_controllable_sets(self, eps=1e-14):
         """Solve for controllable sets :math:`\mathcal{K}_i(I_{\mathrm{goal}})`.
 
@@ -664,6 +792,29 @@ Unable to parameterizes this path:
                 # self._yfulls[i] = self._yfull.copy()
         return us, xs
 
+    def compute_duration_lower_bound(self):
+        """Lower bound on the time needed to traverse the path.
+
+        Only the backward pass is performed. The duration is computed
+        with the highest squared velocities of the controllable sets,
+        which no admissible profile can exceed.
+
+        Returns
+        -------
+        out : float
+            Lower bound on the duration of the time-optimal profile.
+
+        Raises
+        ------
+        ValueError
+            If the controllable sets can not be computed.
+        """
+        if not self.solve_controllable_sets():
+            raise ValueError("Unable to compute the controllable sets.")
+        xs_max = self._K[:, 1].copy()
+        xs_max[0] = min(xs_max[0], self.I0[1])
+        return compute_duration(self.ss, xs_max)
+
     @property
     def slack_vars(self):
         """ Recent stored slack variable.
@@ -730,31 +881,28 @@ Unable to parameterizes this path:
         self.A[i, 0, 0] = 2 * (self.ss[i + 1] - self.ss[i])
         self.lA[i, 0] = xmin
         self.hA[i, 0] = xmax
+        A, l, h, lA, hA = self.stage_matrices(i)
 
         if init:
             # upper solver solves for max x
             self.g[1] = -1.
             res_up = self.solver_up.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], self.nWSR_up[i])
+                self.H, self.g, A, l, h, lA, hA, self.nWSR_up[i])
 
             # lower solver solves for min x
             self.g[1] = 1.
             res_down = self.solver_down.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], self.nWSR_down[i])
+                self.H, self.g, A, l, h, lA, hA, self.nWSR_down[i])
         else:
             # upper solver solves for max x
             self.g[1] = -1.
             res_up = self.solver_up.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], self.nWSR_up[i])
+                self.H, self.g, A, l, h, lA, hA, self.nWSR_up[i])
 
             # lower bound
             self.g[1] = 1.
             res_down = self.solver_down.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i],
-                self.lA[i], self.hA[i], self.nWSR_down[i])
+                self.H, self.g, A, l, h, lA, hA, self.nWSR_down[i])
 
         # Check result
         if (res_up != SUCCESSFUL_RETURN) or (res_down != SUCCESSFUL_RETURN):
@@ -804,6 +952,7 @@ Computing one-step failed.
         self.A[i, 0, 0] = 0.
         self.lA[i, 0] = xmin
         self.hA[i, 0] = xmax
+        A, l, h, lA, hA = self.stage_matrices(i)
 
         # upper bound
         nWSR_up = np.array([self.nWSR_cnst])
@@ -811,24 +960,20 @@ Computing one-step failed.
         self.g[1] = -1.
         if init:
             res_up = self.solver_up.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_up)
+                self.H, self.g, A, l, h, lA, hA, nWSR_up)
         else:
             res_up = self.solver_up.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_up)
+                self.H, self.g, A, l, h, lA, hA, nWSR_up)
 
         nWSR_down = np.array([self.nWSR_cnst])
         self.g[0] = 2. * (self.ss[i + 1] - self.ss[i])
         self.g[1] = 1.
         if init:
             res_down = self.solver_down.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_down)
+                self.H, self.g, A, l, h, lA, hA, nWSR_down)
         else:
             res_down = self.solver_down.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_down)
+                self.H, self.g, A, l, h, lA, hA, nWSR_down)
 
         if (res_up != SUCCESSFUL_RETURN) or (res_down != SUCCESSFUL_RETURN):
             logger.warn("""
@@ -887,6 +1032,7 @@ Computing reach set failed.
         self.A[i, 0, 0] = 0.
         self.lA[i, 0] = xmin
         self.hA[i, 0] = xmax
+        A, l, h, lA, hA = self.stage_matrices(i)
 
         # upper bound
         nWSR_up = np.array([self.nWSR_cnst])
@@ -894,24 +1040,20 @@ Computing reach set failed.
         self.g[1] = -1.
         if init:
             res_up = self.solver_up.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_up)
+                self.H, self.g, A, l, h, lA, hA, nWSR_up)
         else:
             res_up = self.solver_up.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_up)
+                self.H, self.g, A, l, h, lA, hA, nWSR_up)
 
         nWSR_down = np.array([self.nWSR_cnst])
         self.g[0] = 0.
         self.g[1] = 1.
         if init:
             res_down = self.solver_down.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_down)
+                self.H, self.g, A, l, h, lA, hA, nWSR_down)
         else:
             res_down = self.solver_down.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_down)
+                self.H, self.g, A, l, h, lA, hA, nWSR_down)
 
         if (res_up != SUCCESSFUL_RETURN) or (res_down != SUCCESSFUL_RETURN):
             logger.warn("""
@@ -985,15 +1127,14 @@ Computing projection failed.
         self.g[0] = -1.
         if self.nv != 0:
             self.H[2:, 2:] += np.eye(self.nv) * reg
+        A, l, h, lA, hA = self.stage_matrices(i)
 
         if init:
             res_up = self.solver_up.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], self.nWSR_topp[i])
+                self.H, self.g, A, l, h, lA, hA, self.nWSR_topp[i])
         else:
             res_up = self.solver_up.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], self.nWSR_topp[i])
+                self.H, self.g, A, l, h, lA, hA, self.nWSR_topp[i])
 
         if (res_up != SUCCESSFUL_RETURN):
             logger.warn("Non-optimal solution at i=%d. Returning default.", i)
@@ -1052,15 +1193,14 @@ Computing projection failed.
         self.g[0] = 1.
         if self.nv != 0:
             self.H[2:, 2:] += np.eye(self.nv) * reg
+        A, l, h, lA, hA = self.stage_matrices(i)
 
         if init:
             res_up = self.solver_up.init(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_max)
+                self.H, self.g, A, l, h, lA, hA, nWSR_max)
         else:
             res_up = self.solver_up.hotstart(
-                self.H, self.g, self.A[i], self.l[i], self.h[i], self.lA[i],
-                self.hA[i], nWSR_max)
+                self.H, self.g, A, l, h, lA, hA, nWSR_max)
 
         if (res_up != SUCCESSFUL_RETURN):
             logger.warn("Non-optimal solution at i=%d. Returning (None, None).", i)
@@ -10,7 +10,7 @@ cdef inline np.float64_t float64_min(
 cdef inline np.float64_t float64_abs(
     FLOAT_t a): return a if a > 0 else - a
 
-cdef float INFTY = 1e8
+cdef double INFTY = 1e8
 
 cpdef _create_velocity_constraint(np.ndarray[double, ndim=2] qs,
                                   np.ndarray[double, ndim=2] vlim):
@@ -33,7 +33,7 @@ cpdef _create_velocity_constraint(np.ndarray[double, ndim=2] qs,
     cdef int N = qs.shape[0] - 1
     cdef int dof = qs.shape[1]
     cdef int i, k
-    cdef float sdmin, sdmax
+    cdef double sdmin, sdmax
     # Evaluate sdmin, sdmax at each steps and fill the matrices.
     cdef np.ndarray[np.float64_t, ndim=2] a = np.zeros((N + 1, 2), dtype=float)
     cdef np.ndarray[np.float64_t, ndim=2] b = np.ones((N + 1, 2), dtype=float)
@@ -9,5 +9,11 @@ using the algorithm `TOPP-RA`.
 from TOPP import *
 from interpolator import *
 from constraints import *
+from trajectory import *
+from dynamics import SerialChain
 from utils import smooth_singularities
 import postprocess
+import ringbuffer
+import archive
+import parallel
+import cache
@@ -0,0 +1,279 @@
+"""
+This module contains a binary archive format for solved path
+parametrizations, which can be read through memory maps.
+
+An archive holds any number of entries. Each entry stores the arrays
+of one parametrization: grid points, controls, squared velocities
+and, optionally, controllable sets, the path and sampled trajectories.
+
+Layout
+------
+
+All integers are little-endian.
+
+1. Header, `HEADER_SIZE` bytes:
+
+   ======  =====  ===================================================
+   Offset  Type   Content
+   ======  =====  ===================================================
+   0       8s     Magic string `MAGIC`.
+   8       u4     Format version `VERSION`.
+   12      u4     Reserved, zero.
+   16      u8     Offset of the index.
+   24      u8     Size of the index in bytes.
+   ======  =====  ===================================================
+
+2. Data blocks. Each field is stored as a C-contiguous array starting
+   at an offset aligned to `ALIGNMENT` bytes.
+
+3. Index, a UTF-8 encoded JSON document::
+
+       {"entries": [{"name": <str>,
+                     "fields": {<field>: {"dtype": <numpy dtype str>,
+                                          "shape": [<int>, ...],
+                                          "offset": <int>}}}]}
+
+Fields written by :class:`ArchiveWriter` are listed in `FIELDS`.
+Opening an archive only reads its header and index. Arrays are
+mapped, never read, until they are sliced.
+"""
+import json
+import os
+import struct
+import numpy as np
+from scipy.interpolate import PPoly
+from interpolator import path_to_ppoly
+
+MAGIC = b"TOPPRAAR"
+VERSION = 1
+HEADER_SIZE = 64
+ALIGNMENT = 64
+_HEADER_FORMAT = "<8sIIQQ"
+
+FIELDS = {
+    "ss": "Shape (N+1,). Grid points.",
+    "us": "Shape (N,). Controls.",
+    "xs": "Shape (N+1,). Squared velocities.",
+    "K": "Shape (N+1, 2). Controllable sets.",
+    "path_breakpoints": "Breakpoints of the path, see :func:`.path_to_ppoly`.",
+    "path_coefficients": "Coefficients of the path, see :func:`.path_to_ppoly`.",
+    "t": "Shape (M,). Sampled times.",
+    "q": "Shape (M, dof). Sampled joint positions.",
+    "qd": "Shape (M, dof). Sampled joint velocities.",
+    "qdd": "Shape (M, dof). Sampled joint accelerations.",
+}
+
+
+def _read_header(f):
+    f.seek(0)
+    magic, version, _, index_offset, index_size = struct.unpack(
+        _HEADER_FORMAT, f.read(struct.calcsize(_HEADER_FORMAT)))
+    if magic != MAGIC:
+        raise ValueError("Not a toppra archive.")
+    if version != VERSION:
+        raise ValueError(
+            "Unsupported archive version {:d}, expected {:d}.".format(
+                version, VERSION))
+    return index_offset, index_size
+
+
+class ArchiveWriter(object):
+    """Write path parametrizations to an archive.
+
+    The index is written when the writer is closed, including when an
+    exception is raised in a `with` block: entries added before it are
+    kept.
+
+    Parameters
+    ----------
+    filename : str
+    append : bool, optional
+        If True, add entries to an existing archive. Otherwise the
+        file is overwritten.
+
+    Example
+    -------
+
+    >>> with ArchiveWriter("trajectories.tpa", append=True) as writer:
+    ...     writer.add("pick_0", ss, us, xs, K=solver.K, path=path)
+    """
+
+    def __init__(self, filename, append=False):
+        self.filename = filename
+        if append and os.path.exists(filename):
+            self._file = open(filename, 'r+b')
+            index_offset, index_size = _read_header(self._file)
+            self._file.seek(index_offset)
+            # New data is written after the old index, which stays valid
+            # until the header is rewritten
+            self._entries = json.loads(
+                self._file.read(index_size).decode('utf-8'))['entries']
+        else:
+            self._file = open(filename, 'w+b')
+            self._entries = []
+            self._file.write(b'\x00' * HEADER_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write_array(self, array):
+        array = np.ascontiguousarray(array)
+        offset = self._file.tell()
+        padding = -offset % ALIGNMENT
+        self._file.write(b'\x00' * padding)
+        offset += padding
+        self._file.write(array.tobytes())
+        return {"dtype": array.dtype.str, "shape": list(array.shape),
+                "offset": offset}
+
+    def add(self, name, ss, us, xs, K=None, path=None, samples=None):
+        """ Add a path parametrization.
+
+        Parameters
+        ----------
+        name : str
+            Name of the entry.
+        ss : array
+            Shape (N+1,). Grid points.
+        us : array
+            Shape (N,). Controls.
+        xs : array
+            Shape (N+1,). Squared velocities.
+        K : array, optional
+            Shape (N+1, 2). Controllable sets.
+        path : :class:`.SplineInterpolator`, optional
+            Can also be :class:`.PolynomialInterpolator` or
+            :class:`.UnivariateSplineInterpolator`.
+        samples : tuple, optional
+            Sampled trajectory `(t, q, qd, qdd)`, for instance from
+            :func:`.compute_trajectory_points`.
+        """
+        self._file.seek(0, os.SEEK_END)
+        arrays = [("ss", ss), ("us", us), ("xs", xs)]
+        if K is not None:
+            arrays.append(("K", K))
+        if path is not None:
+            path_pp = path_to_ppoly(path, ss)
+            arrays.append(("path_breakpoints", path_pp.x))
+            arrays.append(("path_coefficients", path_pp.c))
+        if samples is not None:
+            arrays.extend(zip(["t", "q", "qd", "qdd"], samples))
+        fields = {}
+        for field, array in arrays:
+            fields[field] = self._write_array(np.asarray(array))
+        self._entries.append({"name": name, "fields": fields})
+
+    def close(self):
+        """ Write the index, then the header, and close the file.
+
+        The header is written last so that an archive which is appended
+        to stays readable, with its former entries, until the new index
+        is complete.
+        """
+        if self._file.closed:
+            return
+        self._file.seek(0, os.SEEK_END)
+        index_offset = self._file.tell()
+        index = json.dumps({"entries": self._entries}).encode('utf-8')
+        self._file.write(index)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.seek(0)
+        self._file.write(struct.pack(_HEADER_FORMAT, MAGIC, VERSION, 0,
+                                     index_offset, len(index)))
+        self._file.close()
+
+
+class ArchiveEntry(object):
+    """A path parametrization stored in an archive.
+
+    Fields are accessed by name and returned as copy-on-write memory
+    maps: modifications are never written back to the archive.
+
+    >>> entry = archive["pick_0"]
+    >>> xs = entry["xs"]
+    >>> q_first_second = entry["q"][:1000]
+    """
+
+    def __init__(self, filename, name, fields):
+        self.filename = filename
+        self.name = name
+        self._fields = fields
+
+    def __repr__(self):
+        return "ArchiveEntry({}, fields: {})".format(
+            self.name, ", ".join(sorted(self._fields)))
+
+    def __contains__(self, field):
+        return field in self._fields
+
+    @property
+    def fields(self):
+        """ Names of the stored fields.
+        """
+        return sorted(self._fields)
+
+    def __getitem__(self, field):
+        desc = self._fields[field]
+        shape = tuple(desc["shape"])
+        if np.prod(shape) == 0:  # Empty arrays can not be mapped
+            return np.empty(shape, dtype=desc["dtype"])
+        return np.memmap(self.filename, dtype=desc["dtype"], mode='c',
+                         offset=desc["offset"], shape=shape)
+
+    def path(self):
+        """ The path, as a :class:`scipy.interpolate.PPoly` in the
+        path position.
+        """
+        return PPoly(self["path_coefficients"], self["path_breakpoints"])
+
+
+class Archive(object):
+    """Read an archive written by :class:`ArchiveWriter`.
+
+    Only the header and the index are read when opening.
+
+    Parameters
+    ----------
+    filename : str
+
+    Example
+    -------
+
+    >>> archive = Archive("trajectories.tpa")
+    >>> archive.names
+    ['pick_0', 'pick_1']
+    >>> ts = archive[-1]["t"]
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            index_offset, index_size = _read_header(f)
+            f.seek(index_offset)
+            self._entries = json.loads(f.read(index_size).decode('utf-8'))[
+                'entries']
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def names(self):
+        """ Names of the entries, in the order they were added.
+        """
+        return [entry["name"] for entry in self._entries]
+
+    def __getitem__(self, key):
+        """ Return an entry from its name, or its position.
+        """
+        if isinstance(key, (int, np.integer)):
+            entry = self._entries[key]
+        else:
+            matches = [e for e in self._entries if e["name"] == key]
+            if len(matches) == 0:
+                raise KeyError(key)
+            entry = matches[-1]  # The most recent entry with this name
+        return ArchiveEntry(self.filename, entry["name"], entry["fields"])
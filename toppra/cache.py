@@ -0,0 +1,311 @@
+"""
+This module contains an on-disk cache of path constraints, addressed by
+the content of the inputs of their builders.
+
+A key is the hash of the name of the builder, the coefficients of the
+path, the grid points, the other numerical arguments, e.g. the limits,
+and the content of the other arguments where it is accessible, e.g. a
+:class:`.SerialChain` or the contacts of a stance. Other objects, such
+as OpenRAVE robots and callables, can not be hashed: a fingerprint of
+them must then be given by the user, and must change whenever they
+change.
+
+Each entry is a directory named after its key, holding one `.npy` file
+per coefficient of the :class:`.PathConstraint` and a JSON document
+`meta.json`. Coefficients which are the same at all stages are stored
+once. Cached constraints are loaded as read-only memory maps. The
+modification time of `meta.json` records the last use of an entry, and
+the least recently used entries are removed when the cache exceeds its
+size limit.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from constraints import PathConstraint, PathConstraintStage
+from interpolator import path_to_ppoly
+
+logger = logging.getLogger(__name__)
+
+_META = "meta.json"
+_MAX_DEPTH = 8
+
+
+def _contacts_content(value):
+    """ Pose, wrench face and link of each contact of a pymanoid
+    `Stance` or `ContactSet`.
+    """
+    return [[getattr(contact, 'pose', None),
+             getattr(contact, 'wrench_face', None),
+             getattr(getattr(contact, 'link', None), 'name', None)]
+            for contact in value.contacts]
+
+
+def _hash_value(h, value, depth=0):
+    """ Update the hash `h` with the content of `value`.
+
+    Numbers, strings, arrays, lists and dicts are hashed by content,
+    as well as objects whose attributes are all of these, such as a
+    :class:`.SerialChain`, and the contacts of pymanoid stances and
+    contact sets. Other objects, e.g. OpenRAVE robots or callables,
+    are opaque: only their type is hashed.
+
+    Returns
+    -------
+    out : bool
+        False if `value` holds an opaque object.
+    """
+    if value is None:
+        h.update(b'None')
+        return True
+    if depth > _MAX_DEPTH:
+        h.update(type(value).__name__.encode('utf-8'))
+        return False
+    if isinstance(value, dict):
+        h.update(b'dict')
+        complete = True
+        for k in sorted(value):
+            h.update(repr(k).encode('utf-8'))
+            complete &= _hash_value(h, value[k], depth + 1)
+        return complete
+    try:
+        array = np.asarray(value)
+    except Exception:
+        array = None
+    if array is not None and array.dtype.kind in 'biufc':
+        array = np.ascontiguousarray(array)
+        h.update(repr((array.dtype.str, array.shape)).encode('utf-8'))
+        h.update(array.tobytes())
+        return True
+    if array is not None and array.dtype.kind in 'SU':
+        h.update(repr(array.tolist()).encode('utf-8'))
+        return True
+    if isinstance(value, (list, tuple)):
+        h.update(b'list')
+        complete = True
+        for v in value:
+            complete &= _hash_value(h, v, depth + 1)
+        return complete
+    h.update(type(value).__name__.encode('utf-8'))
+    if callable(value):
+        return False
+    if hasattr(value, 'contacts'):
+        return _hash_value(h, _contacts_content(value), depth + 1)
+    attributes = getattr(value, '__dict__', None)
+    if attributes:
+        return _hash_value(h, attributes, depth + 1)
+    return False
+
+
+def _hash_path(h, path, ss):
+    """ Update the hash `h` with the coefficients of the path, or with
+    its samples at `ss` if it has no piecewise polynomial form.
+    """
+    try:
+        path_pp = path_to_ppoly(path, ss)
+        _hash_value(h, [path_pp.x, path_pp.c])
+    except ValueError:
+        _hash_value(h, [path.eval(ss), path.evald(ss), path.evaldd(ss)])
+
+
+class ConstraintCache(object):
+    """A content-addressed cache of path constraints on local disk.
+
+    Parameters
+    ----------
+    directory : str
+        Created if it does not exist.
+    max_size : int, optional
+        Size limit in bytes. Least recently used entries are removed
+        when it is exceeded.
+
+    Example
+    -------
+
+    >>> cache = ConstraintCache("/var/cache/toppra")
+    >>> create_torque = cache.wrap(create_rave_torque_path_constraint,
+    ...                            fingerprint="puma-v3")
+    >>> pc = create_torque(path, ss, robot)
+    """
+
+    def __init__(self, directory, max_size=2 ** 30):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def key(self, builder, path, ss, args=(), kwargs=None, fingerprint=None):
+        """ Key of a constraint.
+
+        Parameters
+        ----------
+        builder : str
+            Name of the builder.
+        path : Interpolator
+        ss : array
+            Shape (N+1,). Grid points.
+        args : tuple, optional
+            Other positional arguments of the builder.
+        kwargs : dict, optional
+            Keyword arguments of the builder.
+        fingerprint : str, optional
+            Identifies the arguments which can not be hashed, e.g. the
+            robot model. Required if there are any.
+
+        Returns
+        -------
+        out : str
+            Hexadecimal digest.
+
+        Raises
+        ------
+        ValueError
+            If an argument can not be hashed and `fingerprint` is None.
+        """
+        h = hashlib.sha1()
+        _hash_value(h, [builder, fingerprint])
+        _hash_path(h, path, ss)
+        if not _hash_value(h, [ss, list(args), kwargs or {}]) and \
+                fingerprint is None:
+            raise ValueError(
+                "Arguments of {} can not be hashed, a fingerprint is "
+                "required.".format(builder))
+        return h.hexdigest()
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self._entry(key), _META))
+
+    def load(self, key):
+        """ Load a constraint and mark it as recently used.
+
+        Returns
+        -------
+        out : :class:`.PathConstraint`
+            None if the key is not in the cache. Incomplete or corrupt
+            entries are removed, and also give None.
+        """
+        meta_file = os.path.join(self._entry(key), _META)
+        try:
+            with open(meta_file) as f:
+                meta = f.read()
+            os.utime(meta_file, None)
+        except (IOError, OSError):
+            return None
+        coeffs = {}
+        try:
+            name = json.loads(meta)["name"]
+            for field in PathConstraintStage._fields + ('ss', ):
+                filename = os.path.join(self._entry(key), field + ".npy")
+                coeffs[field] = np.load(filename, mmap_mode='r')
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            logger.warn("Removing corrupt entry %s from the cache.", key)
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            return None
+        logger.debug("Loaded constraint %s from the cache.", key)
+        return PathConstraint(name=name, **coeffs)
+
+    def store(self, key, pc):
+        """ Store a constraint, then enforce the size limit.
+
+        Parameters
+        ----------
+        key : str
+        pc : :class:`.PathConstraint`
+        """
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        invariants = pc.invariants
+        for field in PathConstraintStage._fields:
+            coeff = invariants.get(field, getattr(pc, field))
+            np.save(os.path.join(tmp, field + ".npy"),
+                    np.ascontiguousarray(coeff))
+        np.save(os.path.join(tmp, "ss.npy"), np.asarray(pc.ss))
+        with open(os.path.join(tmp, _META), 'w') as f:
+            json.dump({"name": pc.name, "invariants": sorted(invariants)}, f)
+        try:
+            os.rename(tmp, self._entry(key))
+        except OSError:  # Stored concurrently
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._evict(keep=key)
+
+    def _entries(self):
+        """ Keys, last uses and sizes of the entries.
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            entry = self._entry(key)
+            if key.startswith(".") or not os.path.isdir(entry):
+                continue
+            try:
+                last_use = os.path.getmtime(os.path.join(entry, _META))
+                size = sum(os.path.getsize(os.path.join(entry, filename))
+                           for filename in os.listdir(entry))
+            except OSError:  # Removed concurrently
+                continue
+            entries.append((last_use, key, size))
+        return entries
+
+    @property
+    def size(self):
+        """ Total size of the entries, in bytes.
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self, keep=None):
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, key, size in entries:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            logger.debug("Evicted constraint %s from the cache.", key)
+
+    def clear(self):
+        """ Remove all entries.
+        """
+        for _, key, _ in self._entries():
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+
+    def wrap(self, builder, fingerprint=None):
+        """ Cache the constraints created by a builder.
+
+        Parameters
+        ----------
+        builder : callable
+            A `create_*_path_constraint` function, called as
+            `builder(path, ss, *args, **kwargs)`.
+        fingerprint : str, optional
+            Identifies the arguments of the builder which can not be
+            hashed, e.g. the robot model, see :func:`key`.
+
+        Returns
+        -------
+        out : callable
+            Same signature as `builder`. Only calls it on a cache miss.
+            Results which are not a :class:`.PathConstraint`, e.g. of
+            :func:`create_payload_torque_path_constraint`, are returned
+            without being cached.
+        """
+        def cached_builder(path, ss, *args, **kwargs):
+            key = self.key(builder.__name__, path, ss, args, kwargs,
+                           fingerprint)
+            pc = self.load(key)
+            if pc is None:
+                pc = builder(path, ss, *args, **kwargs)
+                if not isinstance(pc, PathConstraint):
+                    logger.warn("%s returned a %s, which is not cached.",
+                                builder.__name__, type(pc).__name__)
+                    return pc
+                self.store(key, pc)
+            return pc
+        cached_builder.__name__ = builder.__name__
+        cached_builder.__doc__ = builder.__doc__
+        return cached_builder
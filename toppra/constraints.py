@@ -4,21 +4,115 @@ the `PathConstraint`.
 
 """
 import numpy as np
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import partial
 from enum import Enum
-from utils import inv_dyn, compute_jacobian_wrench
+from utils import (compute_rave_torque_coefficients, compute_jacobian_wrench,
+                   interpolate_gridpoints, LRUCache, PymanoidCOMEvaluator)
 from _CythonUtils import _create_velocity_constraint
+from parallel import WorkerPool
+from dynamics import payload_parameters
 from scipy.linalg import block_diag
 from TOPP import INFTY
 import logging
 logger = logging.getLogger(__name__)
 
 
+def _evaluate_gridpoints(evaluate, ss, coarse_rtol):
+    """ Evaluate `evaluate` at all gridpoints, or on a coarse subset if
+    `coarse_rtol` is given, see :func:`.interpolate_gridpoints`. Indices
+    of all the gridpoints are given as None.
+    """
+    if coarse_rtol is None:
+        return evaluate(None)
+    outputs, error = interpolate_gridpoints(evaluate, ss, rtol=coarse_rtol)
+    logger.debug("Coarse evaluation, estimated error %g.", error.max())
+    return outputs
+
+
+@contextmanager
+def _robot_evaluators(robot, functions, inputs, robot_factory=None,
+                      n_workers=None):
+    """ Evaluate functions of a robot and of the gridpoints.
+
+    `functions` maps names to pairs `(function, output_shapes)`. Yields
+    `evaluate(name, idx)`, which calls `function(robot, *[x[idx] for x
+    in inputs])`, with all gridpoints if `idx` is None. If
+    `robot_factory` is given, the gridpoints are split between
+    `n_workers` processes, each owning a robot returned by the factory,
+    which write into shared outputs and serve all the evaluations until
+    the context is left.
+    """
+    if robot_factory is None:
+        def evaluate(name, idx):
+            idx = slice(None) if idx is None else idx
+            return functions[name][0](robot, *[x[idx] for x in inputs])
+        yield evaluate
+        return
+
+    def evaluator_factory():
+        clone = robot_factory()
+        return dict((name, partial(function, clone))
+                    for name, (function, _) in functions.items())
+    output_shapes = dict((name, shapes)
+                         for name, (_, shapes) in functions.items())
+    with WorkerPool(evaluator_factory, inputs, output_shapes,
+                    n_workers) as pool:
+        yield lambda name, idx: pool.evaluate(idx, evaluator=name)
+
+
+def _rave_torque_coefficients(robot, ss, q, qs, qss, robot_factory, n_workers,
+                              coarse_rtol):
+    """ Coefficients of the Path-Torque formulae, see
+    :func:`.compute_rave_torque_coefficients`.
+
+    If `robot_factory` is given, the evaluation is split between
+    `n_workers` processes, each owning a robot returned by the factory.
+    If `coarse_rtol` is given, the coefficients are evaluated on a
+    coarse subset of the gridpoints and interpolated.
+    """
+    dof = robot.GetDOF()
+    functions = {'torque': (compute_rave_torque_coefficients, [(dof, )] * 3)}
+    with _robot_evaluators(robot, functions, [q, qs, qss], robot_factory,
+                           n_workers) as evaluate:
+        return _evaluate_gridpoints(lambda idx: evaluate('torque', idx),
+                                    ss, coarse_rtol)
+
+
 class PathConstraintKind(Enum):
     Canonical = 0
     TypeI = 1
     TypeII = 2
 
 
+class PathConstraintStage(namedtuple('PathConstraintStage', [
+        'a', 'b', 'c', 'abar', 'bbar', 'cbar', 'D', 'l', 'h', 'G', 'lG', 'hG'])):
+    """Coefficients of a :class:`PathConstraint` at a single stage,
+    e.g. `a` has shape (nm, ) and `D` has shape (neq, nv).
+    """
+    __slots__ = ()
+
+
+def _as_stages(coeff, ndim, N):
+    """ Broadcast a stage-invariant coefficient, given without the
+    stage axis, to the N+1 stages as a read-only view.
+    """
+    coeff = np.asarray(coeff)
+    if coeff.ndim == ndim - 1:
+        return np.broadcast_to(coeff, (N + 1, ) + coeff.shape)
+    return coeff
+
+
+def _constraint_kind(nm, niq):
+    if nm != 0:
+        return PathConstraintKind.Canonical
+    elif niq == 0:
+        return PathConstraintKind.TypeI
+    else:
+        return PathConstraintKind.TypeII
+
+
 class PathConstraint(object):
     """Discretized path constraint.
 
@@ -51,6 +145,10 @@ class PathConstraint(object):
     hG : array, optional
         Shape (N+1, niq). Bounds; Type II.
 
+    A coefficient which is the same at all stages can be given without
+    the first axis, e.g. `l` with shape (nv, ). It is then stored once
+    and broadcast to all stages as a read-only view.
+
     Attributes
     ----------
     nm : int
@@ -131,9 +229,9 @@ class PathConstraint(object):
             self.b = np.empty((self.N + 1, 0))
             self.c = np.empty((self.N + 1, 0))
         else:
-            self.a = a
-            self.b = b
-            self.c = c
+            self.a = _as_stages(a, 2, self.N)
+            self.b = _as_stages(b, 2, self.N)
+            self.c = _as_stages(c, 2, self.N)
         self._nm = self.a.shape[1]
 
         # Type I
@@ -143,10 +241,10 @@ class PathConstraint(object):
             self.cbar = np.empty((self.N + 1, 0))
             self.D = np.empty((self.N + 1, 0, 0))
         else:
-            self.abar = abar
-            self.bbar = bbar
-            self.cbar = cbar
-            self.D = D
+            self.abar = _as_stages(abar, 2, self.N)
+            self.bbar = _as_stages(bbar, 2, self.N)
+            self.cbar = _as_stages(cbar, 2, self.N)
+            self.D = _as_stages(D, 3, self.N)
         self._neq = self.abar.shape[1]
         self._nv = self.D[0].shape[1]
 
@@ -154,8 +252,8 @@ class PathConstraint(object):
             self.l = np.empty((self.N + 1, 0))
             self.h = np.empty((self.N + 1, 0))
         else:
-            self.l = l
-            self.h = h
+            self.l = _as_stages(l, 2, self.N)
+            self.h = _as_stages(h, 2, self.N)
 
         # Type II
         if lG is None:
@@ -163,21 +261,16 @@ class PathConstraint(object):
             self.G = np.empty((self.N + 1, 0, self.nv))
             self.hG = np.empty((self.N + 1, 0))
         else:
-            self.lG = lG
-            self.G = G
-            self.hG = hG
+            self.lG = _as_stages(lG, 2, self.N)
+            self.G = _as_stages(G, 3, self.N)
+            self.hG = _as_stages(hG, 2, self.N)
         self._niq = self.lG.shape[1]
 
         self.name = name
         self._ss = ss
 
         # Store constraint cat
-        if self.nm != 0:
-            self._kind = PathConstraintKind.Canonical
-        elif self.niq == 0:
-            self._kind = PathConstraintKind.TypeI
-        else:
-            self._kind = PathConstraintKind.TypeII
+        self._kind = _constraint_kind(self.nm, self.niq)
 
     @property
     def kind(self):
@@ -218,6 +311,220 @@ class PathConstraint(object):
         """
         return self._nv
 
+    @property
+    def invariants(self):
+        """ Coefficients which are stored once for all stages, by name.
+
+        Returns
+        -------
+        out : dict
+            Maps a field of :class:`PathConstraintStage` to its value
+            at any stage.
+        """
+        invariants = {}
+        for field in PathConstraintStage._fields:
+            coeff = getattr(self, field)
+            if coeff.strides[0] == 0:
+                invariants[field] = coeff[0]
+        return invariants
+
+    lazy = False
+
+    def stage(self, i):
+        """ Coefficients at the i-th stage.
+
+        Parameters
+        ----------
+        i : int
+
+        Returns
+        -------
+        out : :class:`PathConstraintStage`
+        """
+        return PathConstraintStage(
+            *[getattr(self, field)[i] for field in PathConstraintStage._fields])
+
+
+def _stacked_field(field):
+    def stack(self):
+        if field in self._invariants:
+            return _as_stages(self._invariants[field],
+                              self._invariants[field].ndim + 1, self.N)
+        if field not in self._stacked:
+            self._stacked[field] = np.array([getattr(self.stage(i), field)
+                                             for i in range(self.N + 1)])
+        return self._stacked[field]
+    stack.__doc__ = """ `{}` at all stages, evaluated on first access.
+        """.format(field)
+    return property(stack)
+
+
+class LazyPathConstraint(PathConstraint):
+    """Discretized path constraint evaluated one stage at a time.
+
+    The coefficients of a stage are computed when the stage is
+    requested, and only the most recently used stages are kept. This
+    allows grids whose constraints do not fit in memory when
+    assembled. :class:`.qpOASESPPSolver` reads lazy constraints stage
+    by stage.
+
+    The coefficient arrays, e.g. `a` or `D`, are still available as
+    attributes. They are evaluated, visiting all the stages, and kept
+    on first access.
+
+    Parameters
+    ----------
+    evaluate_stage : callable
+        Maps a stage index `i` to a dict of coefficients at `ss[i]`,
+        with the same keys as the keyword arguments of
+        :class:`PathConstraint`, e.g. `{'a': a_i, 'b': b_i, 'c': c_i}`
+        where `a_i` has shape (nm, ). Parts left out are empty.
+    ss : array
+        Shape (N+1,). Grid points.
+    name : str, optional
+        Name of the constraint.
+    cache_size : int, optional
+        Number of stages kept in memory.
+    invariants : dict, optional
+        Coefficients which are the same at all stages, with the same
+        keys as the dicts returned by `evaluate_stage`. They are
+        shared by all stages instead of being evaluated.
+
+    Example
+    -------
+
+    >>> def evaluate_stage(i):
+    ...     qs = path.evald(ss[i])
+    ...     return {'a': np.r_[qs, -qs], 'b': np.zeros(2 * dof),
+    ...             'c': np.r_[-alim[:, 1], alim[:, 0]]}
+    >>> pc = LazyPathConstraint(evaluate_stage, ss)
+    """
+
+    lazy = True
+
+    def __init__(self, evaluate_stage, ss, name=None, cache_size=4,
+                 invariants=None):
+        self.N = ss.shape[0] - 1
+        self.sparse = False
+        self.name = name
+        self._ss = ss
+        self._evaluate_stage = evaluate_stage
+        self._invariants = {}
+        if invariants is not None:
+            self._invariants = dict((field, np.asarray(coeff))
+                                    for field, coeff in invariants.items())
+        self._cache = LRUCache(cache_size)
+        self._stacked = {}
+        stage = self.stage(0)
+        self._nm = stage.a.shape[0]
+        self._neq = stage.abar.shape[0]
+        self._nv = stage.D.shape[1]
+        self._niq = stage.lG.shape[0]
+        self._kind = _constraint_kind(self.nm, self.niq)
+
+    def stage(self, i):
+        """ Coefficients at the i-th stage, see :meth:`PathConstraint.stage`.
+        """
+        stage = self._cache.get(i)
+        if stage is None:
+            coeffs = dict(self._evaluate_stage(i))
+            coeffs.update(self._invariants)
+            D = np.asarray(coeffs.get('D', np.empty((0, 0))))
+            nv = D.shape[1]
+            default_shapes = {'D': (0, nv), 'G': (0, nv)}
+            stage = PathConstraintStage(*[
+                np.asarray(coeffs[field]) if field in coeffs
+                else np.empty(default_shapes.get(field, (0, )))
+                for field in PathConstraintStage._fields])
+            self._cache[i] = stage
+        return stage
+
+    @property
+    def invariants(self):
+        """ Coefficients shared by all stages, see
+        :attr:`PathConstraint.invariants`.
+        """
+        return dict(self._invariants)
+
+    a = _stacked_field('a')
+    b = _stacked_field('b')
+    c = _stacked_field('c')
+    abar = _stacked_field('abar')
+    bbar = _stacked_field('bbar')
+    cbar = _stacked_field('cbar')
+    D = _stacked_field('D')
+    l = _stacked_field('l')
+    h = _stacked_field('h')
+    G = _stacked_field('G')
+    lG = _stacked_field('lG')
+    hG = _stacked_field('hG')
+
+
+def _block_diag2(A, B):
+    out = np.zeros((A.shape[0] + B.shape[0], A.shape[1] + B.shape[1]))
+    out[:A.shape[0], :A.shape[1]] = A
+    out[A.shape[0]:, A.shape[1]:] = B
+    return out
+
+
+def _interpolate_field(field, cur, nxt, ds):
+    """ Coefficient `field` of the first-order interpolation of the
+    stages `cur` and `nxt`, separated by `ds`.
+    """
+    if field == 'a':
+        return np.r_[cur.a, nxt.a + 2 * ds * nxt.b]
+    elif field == 'abar':
+        return np.r_[cur.abar, nxt.abar + 2 * ds * nxt.bbar]
+    elif field in ('D', 'G'):
+        return _block_diag2(getattr(cur, field), getattr(nxt, field))
+    else:
+        return np.r_[getattr(cur, field), getattr(nxt, field)]
+
+
+class InterpolatedPathConstraint(LazyPathConstraint):
+    """First-order interpolation of a :class:`PathConstraint`.
+
+    The interpolated constraint is a view over the original one: the
+    coefficients at stage i are assembled from the stages i and i+1
+    of `original` when requested, and nothing is copied up front. At
+    the last stage, the stage N is used twice. Coefficients which are
+    stage-invariant in `original` are interpolated once.
+
+    Parameters
+    ----------
+    original : :class:`PathConstraint`
+        The collocated constraint. Can be lazy.
+    cache_size : int, optional
+        Number of assembled stages kept in memory.
+    """
+
+    def __init__(self, original, cache_size=4):
+        self.original = original
+        self._Ds = original.ss[1:] - original.ss[:-1]
+        # Coefficients made of invariant coefficients only are invariant
+        invariants = original.invariants
+        stage = PathConstraintStage(**dict(
+            (field, invariants.get(field))
+            for field in PathConstraintStage._fields))
+        interpolated_invariants = dict(
+            (field, _interpolate_field(field, stage, stage, None))
+            for field in PathConstraintStage._fields
+            if field in invariants and field not in ('a', 'abar'))
+        super(InterpolatedPathConstraint, self).__init__(
+            self._interpolate_stage, original.ss, name=original.name,
+            cache_size=cache_size, invariants=interpolated_invariants)
+
+    def _interpolate_stage(self, i):
+        cur = self.original.stage(i)
+        if i < self.N:
+            nxt = self.original.stage(i + 1)
+            ds = self._Ds[i]
+        else:
+            nxt, ds = cur, 0.
+        return dict((field, _interpolate_field(field, cur, nxt, ds))
+                    for field in PathConstraintStage._fields
+                    if field not in self._invariants)
+
 
 def interpolate_constraint(pc):
     """Produce a discretized :class:`PathConstraint` by first-order
@@ -230,89 +537,16 @@ def interpolate_constraint(pc):
 
     Returns
     -------
-    out : :class:`PathConstraint`
-        The interpolated constraint.
+    out : :class:`InterpolatedPathConstraint`
+        The interpolated constraint, a view over `pc`.
 
     """
-    N = pc.N
-    Ds = pc.ss[1:] - pc.ss[:N]
-    # Canonical part
-    a_intp = np.empty((pc.N+1, 2 * pc._nm))
-    a_intp[:, 0:pc._nm] = pc.a
-    a_intp[N] = np.hstack((pc.a[N], pc.a[N]))
-    # Multiply rows of pc.b with entries of Ds
-    _ = pc.a[1:] + 2 * (pc.b[1:].T * Ds).T
-    a_intp[:N, pc._nm:] = _
-
-    b_intp = np.empty((pc.N+1, 2 * pc._nm))
-    b_intp[:, 0:pc._nm] = pc.b
-    b_intp[:N, pc._nm:] = pc.b[1:]
-    b_intp[N] = np.hstack((pc.b[N], pc.b[N]))
-
-    c_intp = np.empty((pc.N+1, 2 * pc._nm))
-    c_intp[:, 0:pc._nm] = pc.c
-    c_intp[:N, pc._nm:] = pc.c[1:]
-    c_intp[N] = np.hstack((pc.c[N], pc.c[N]))
-
-    # Equality part
-    abar_intp = np.empty((pc.N+1, 2 * pc._neq))
-    abar_intp[:, 0:pc._neq] = pc.abar
-    abar_intp[N] = np.hstack((pc.abar[N], pc.abar[N]))
-
-    bbar_intp = np.empty((pc.N+1, 2 * pc._neq))
-    bbar_intp[:, 0:pc._neq] = pc.bbar
-    bbar_intp[:N, pc._neq:] = pc.bbar[1:]
-    bbar_intp[N] = np.hstack((pc.bbar[N], pc.bbar[N]))
-
-    cbar_intp = np.empty((pc.N+1, 2 * pc._neq))
-    cbar_intp[:, 0:pc._neq] = pc.cbar
-    cbar_intp[:N, pc._neq:] = pc.cbar[1:]
-    cbar_intp[N] = np.hstack((pc.cbar[N], pc.cbar[N]))
-
-    D_intp = np.zeros((pc.N+1, 2 * pc._neq, 2 * pc._nv))
-    D_intp[:, 0:pc._neq, 0:pc._nv] = pc.D
-    D_intp[:N, pc._neq: 2 * pc._neq, pc._nv: 2 * pc._nv] = pc.D[1:]
-    D_intp[N, 0:pc._neq, 0:pc._nv] = pc.D[N]
-    D_intp[N, pc._neq: 2 * pc._neq, pc._nv: 2 * pc._nv] = pc.D[N]
-
-    l_intp = np.empty((pc.N+1, 2 * pc._nv))
-    l_intp[:, 0:pc._nv] = pc.l
-    l_intp[:N, pc._nv:] = pc.l[1:]
-    l_intp[N] = np.hstack((pc.l[N], pc.l[N]))
-
-    h_intp = np.empty((pc.N+1, 2 * pc._nv))
-    h_intp[:, 0:pc._nv] = pc.h
-    h_intp[:N, pc._nv:] = pc.h[1:]
-    h_intp[N] = np.hstack((pc.h[N], pc.h[N]))
-
-    _ = pc.abar[1:] + 2 * (pc.bbar[1:].T * Ds).T
-    abar_intp[:N, pc._neq:] = _
-
-    # Inequality
-    G_intp = np.empty((pc.N+1, 2 * pc.niq, 2 * pc._nv))
-    G_intp[:, 0:pc.niq, 0:pc._nv] = pc.G
-    G_intp[:N, pc.niq: 2 * pc.niq, pc._nv: 2 * pc._nv] = pc.G[1:]
-
-    lG_intp = np.empty((pc.N+1, 2 * pc.niq))
-    lG_intp[:, :pc.niq] = pc.lG
-    lG_intp[:N, pc.niq:] = pc.lG[1:]
-    hG_intp = np.empty((pc.N+1, 2 * pc.niq))
-    hG_intp[:, :pc.niq] = pc.hG
-    hG_intp[:N, pc.niq:] = pc.hG[1:]
-
-    G_intp[N, 0:pc.niq, 0:pc._nv] = pc.G[N]
-    G_intp[N, pc.niq: 2 * pc.niq, pc._nv: 2 * pc._nv] = pc.G[N]
-    lG_intp[N] = np.hstack((pc.lG[N], pc.lG[N]))
-    hG_intp[N] = np.hstack((pc.hG[N], pc.hG[N]))
-
-    return PathConstraint(a=a_intp, b=b_intp, c=c_intp,
-                          abar=abar_intp, bbar=bbar_intp, cbar=cbar_intp,
-                          D=D_intp, l=l_intp, h=h_intp,
-                          G=G_intp, lG=lG_intp, hG=hG_intp,
-                          name=pc.name, ss=pc.ss)
-
-
-def create_full_contact_path_constraint(path, ss, robot, stance):
+    return InterpolatedPathConstraint(pc)
+
+
+def create_full_contact_path_constraint(path, ss, robot, stance,
+                                        robot_factory=None, n_workers=None,
+                                        coarse_rtol=None):
     """Contact stability constraint (Colomb frictional model).
 
     Parameters
@@ -325,11 +559,22 @@ def create_full_contact_path_constraint(path, ss, robot, stance):
         Torque bounds are taken from the internal OpenRAVE robot.
     stance : :class:`Pymanoid.Stance`
         Used for wrench constraint.
+    robot_factory : callable, optional
+        Return a clone of `robot.rave`. If given, the dynamics and the
+        wrench Jacobians are evaluated in `n_workers` processes, each
+        owning a clone. See :class:`.WorkerPool`.
+    n_workers : int, optional
+        Number of processes. Defaults to the number of CPUs.
+    coarse_rtol : float, optional
+        If given, the dynamics are evaluated on a coarse subset of `ss`
+        and interpolated, with this relative tolerance. See
+        :func:`.interpolate_gridpoints`.
 
     Returns
     -------
     res : :class:`.PathConstraint`
-        Contact stability constraint.
+        Contact stability constraint. `l`, `h`, `G`, `lG` and `hG` are
+        read-only views of a single stage.
 
     Note
     ----
@@ -354,55 +599,55 @@ def create_full_contact_path_constraint(path, ss, robot, stance):
 
     """
     N = len(ss) - 1
-    q = path.eval(ss)
-    qs = path.evald(ss)
-    qss = path.evaldd(ss)
+    q, qs, qss = path.eval_all(ss)
     torque_bnd = robot.rave.GetDOFTorqueLimits()
     dof = path.dof
 
     neq = dof
     nv = dof + 6 * len(stance.contacts)
     niq = sum(co.wrench_face.shape[0] for co in stance.contacts)
-
-    abar = np.zeros((N + 1, neq))
-    bbar = np.zeros((N + 1, neq))
-    cbar = np.zeros((N + 1, neq))
-    D = np.zeros((N + 1, neq, nv))
-    l = np.zeros((N + 1, nv))
-    h = np.zeros((N + 1, nv))
-    G = np.zeros((N + 1, niq, nv))
-    lG = np.zeros((N + 1, niq))
-    hG = np.zeros((N + 1, niq))
-
-    for i in range(N + 1):
-        # t1,t2,t3,t4 are coefficients of the Path-Torque formulae
-        t1, t3, t4 = inv_dyn(robot.rave, q[i], qs[i], qs[i])
-        t2, _, _ = inv_dyn(robot.rave, q[i], qs[i], qss[i])
-        abar[i] = t1
-        bbar[i] = t2 + t3
-        cbar[i] = t4
-        D[i, :, :dof] = np.eye(dof)
-        r = 0
-        for con in stance.contacts:
-            J_wrench = compute_jacobian_wrench(robot.rave, con.link, con.p)
-            D[i, :, dof + r: dof + r + 6] = J_wrench.T
-            r += 6
-        l[i, :dof] = - torque_bnd
-        h[i, :dof] = + torque_bnd
-        l[i, dof:] = - INFTY  # Safety bounds.
-        h[i, dof:] = INFTY
-
-        _G_block = block_diag(*[co.wrench_face for co in stance.contacts])
-        G[i] = np.hstack((np.zeros((niq, dof)), _G_block))
-        lG[i, :] = - INFTY
-        hG[i, :] = 0
+    contacts = [(co.link.GetIndex(), co.p) for co in stance.contacts]
+
+    def wrench_jacobians(rave_robot, q_, qs_, qss_):
+        links = rave_robot.GetLinks()
+        J = np.zeros((len(q_), neq, nv - dof))
+        with rave_robot:
+            for i, qi in enumerate(q_):
+                rave_robot.SetDOFValues(qi)
+                J[i] = np.hstack([
+                    compute_jacobian_wrench(rave_robot, links[index], p).T
+                    for index, p in contacts])
+        return [J]
+
+    functions = {
+        'torque': (compute_rave_torque_coefficients, [(dof, )] * 3),
+        'jacobians': (wrench_jacobians, [(neq, nv - dof)])}
+    with _robot_evaluators(robot.rave, functions, [q, qs, qss],
+                           robot_factory, n_workers) as evaluate:
+        # Coefficients of the Path-Torque formulae
+        abar, bbar, cbar = _evaluate_gridpoints(
+            lambda idx: evaluate('torque', idx), ss, coarse_rtol)
+
+        # Only the wrench Jacobians depend on the stage
+        D = np.zeros((N + 1, neq, nv))
+        D[:, :, :dof] = np.eye(dof)
+        D[:, :, dof:], = evaluate('jacobians', None)
+
+    # The bounds and the wrench cones are the same at all stages
+    l = np.r_[- torque_bnd, - INFTY * np.ones(nv - dof)]  # Safety bounds
+    h = np.r_[torque_bnd, INFTY * np.ones(nv - dof)]
+    G = np.hstack((np.zeros((niq, dof)),
+                   block_diag(*[co.wrench_face for co in stance.contacts])))
+    lG = - INFTY * np.ones(niq)
+    hG = np.zeros(niq)
     return PathConstraint(abar=abar, bbar=bbar, cbar=cbar, D=D,
                           l=l, h=h, lG=lG, G=G,
                           hG=hG, ss=ss, name='FullContactStability')
 
 
 def create_pymanoid_contact_stability_path_constraint(
-        path, ss, robot, contact_set, g):
+        path, ss, robot, contact_set, g, robot_factory=None, n_workers=None,
+        coarse_rtol=None):
     """Contact stability constraint in canonical form.
 
     This is the reduced form of the full contact stability constraint
@@ -414,54 +659,67 @@ def create_pymanoid_contact_stability_path_constraint(
     ss : array
         Shape (N+1, ). Grid points.
     robot : :class:`Pymanoid.Humanoid`
-        Used for dynamics computation.
-        Torque bounds are taken from the internal OpenRAVE robot.
+        Used for dynamics computation. Can also be any object with a
+        `mass` and the method `compute_com_derivatives` of
+        :class:`.SerialChain`, which evaluates all gridpoints at once.
     contact_set : :class:`Pymanoid.ContactSet`
         Used for wrench computation.
+    g : array
+        Shape (3, ). Gravity acceleration.
+    robot_factory : callable, optional
+        Return a clone of `robot`. If given, the dynamics are evaluated
+        in `n_workers` processes, each owning a clone. See
+        :class:`.WorkerPool`.
+    n_workers : int, optional
+        Number of processes. Defaults to the number of CPUs.
+    coarse_rtol : float, optional
+        If given, the dynamics are evaluated on a coarse subset of `ss`
+        and interpolated, with this relative tolerance. See
+        :func:`.interpolate_gridpoints`.
 
     Returns
     -------
     res : :class:`PathConstraint`
         The resulting path constraint.
     """
-    N = len(ss) - 1
-    q = path.eval(ss)
-    qs = path.evald(ss)
-    qss = path.evaldd(ss)
+    q, qs, qss = path.eval_all(ss)
     pO = np.zeros(3)  # fixed point
-
     F = contact_set.compute_wrench_face(pO)
-    niq = F.shape[0]  # Number of inequalities
-    m = robot.mass
-    a = np.zeros((N + 1, niq))
-    b = np.zeros((N + 1, niq))
-    c = np.zeros((N + 1, niq))
 
     # Let O be a chosen pO, EL equation yields
     #     w^gi + w^c = 0,
     # where w^gi is the gravito-inertial wrench taken at O, w^c is the
     # contact wrench taken at O.
-    for i in range(N + 1):
-        robot.set_dof_values(q[i])
-        J_COM = robot.compute_com_jacobian()
-        H_COM = robot.compute_com_hessian()
-        J_L = robot.compute_angular_momentum_jacobian(pO)
-        H_L = robot.compute_angular_momentum_hessian(pO)
-        a_P = m * np.dot(J_COM, qs[i])
-        b_P = m * (np.dot(J_COM, qss[i]) +
-                   np.dot(qs[i], np.dot(H_COM, qs[i])))
-        a_L = np.dot(J_L, qs[i])
-        b_L = np.dot(J_L, qss[i]) + np.dot(qs[i], np.dot(H_L, qs[i]))
-        pG = robot.com
-        a[i] = np.dot(F, np.r_[a_P, a_L])
-        b[i] = np.dot(F, np.r_[b_P, b_L])
-        c[i] = - np.dot(F, np.r_[m * g, m * np.cross(pG, g)])
-
+    def wrench_coefficients(robot, q_, qs_, qss_):
+        if not hasattr(robot, 'compute_com_derivatives'):
+            robot = PymanoidCOMEvaluator(robot)
+        m = robot.mass
+        pG, J_COM, H_COM, J_L, H_L = robot.compute_com_derivatives(q_, pO)
+        a_P = m * np.einsum('nij,nj->ni', J_COM, qs_)
+        b_P = m * (np.einsum('nij,nj->ni', J_COM, qss_) +
+                   np.einsum('nj,njik,nk->ni', qs_, H_COM, qs_))
+        a_L = np.einsum('nij,nj->ni', J_L, qs_)
+        b_L = (np.einsum('nij,nj->ni', J_L, qss_) +
+               np.einsum('nj,njik,nk->ni', qs_, H_L, qs_))
+        w_g = np.hstack((np.tile(m * g, (len(q_), 1)),
+                         m * np.cross(pG, g)))
+        # Wrench face projections at all gridpoints at once
+        a, b, c = np.einsum('kj,tnj->tnk', F, np.array([
+            np.hstack((a_P, a_L)), np.hstack((b_P, b_L)), - w_g]))
+        return a, b, c
+
+    functions = {'wrench': (wrench_coefficients, [F.shape[:1]] * 3)}
+    with _robot_evaluators(robot, functions, [q, qs, qss], robot_factory,
+                           n_workers) as evaluate:
+        a, b, c = _evaluate_gridpoints(lambda idx: evaluate('wrench', idx),
+                                       ss, coarse_rtol)
     return PathConstraint(a, b, c, name="ContactStability", ss=ss)
 
 
 def create_rave_re_torque_path_constraint(path, ss, robot, J_lc,
-                                          torque_bnd=None):
+                                          torque_bnd=None, robot_factory=None,
+                                          n_workers=None, coarse_rtol=None,
+                                          vectorized=False):
     """Torque bounds for robots under loop closure constraints.
 
     Roughly speadking, under loop closure constraints, only virtual
@@ -480,7 +738,21 @@ def create_rave_re_torque_path_constraint(path, ss, robot, J_lc,
     robot : :class:`openravepy.Robot`
         Used for dynamics computation.
     J_lc : func
-        A mapping q -> an (d, dof) ndarray.
+        A mapping q -> an (d, dof) ndarray. If `vectorized`, a mapping
+        from joint positions shaped (N+1, dof) to an (N+1, d, dof)
+        ndarray.
+    robot_factory : callable, optional
+        Return a clone of `robot`. If given, the dynamics are evaluated
+        in `n_workers` processes, each owning a clone. See
+        :class:`.WorkerPool`.
+    n_workers : int, optional
+        Number of processes. Defaults to the number of CPUs.
+    coarse_rtol : float, optional
+        If given, the dynamics are evaluated on a coarse subset of `ss`
+        and interpolated, with this relative tolerance. See
+        :func:`.interpolate_gridpoints`.
+    vectorized : bool, optional
+        If True, `J_lc` is evaluated at all gridpoints in one call.
 
     Returns
     -------
@@ -489,47 +761,41 @@ def create_rave_re_torque_path_constraint(path, ss, robot, J_lc,
 
     """
     N = len(ss) - 1
-    q = path.eval(ss)
-    qs = path.evald(ss)
-    qss = path.evaldd(ss)
+    q, qs, qss = path.eval_all(ss)
     dof = path.dof
 
     if torque_bnd is None:
         torque_bnd = robot.GetDOFTorqueLimits()
-    a = np.zeros((N + 1, dof))
-    b = np.zeros((N + 1, dof))
-    c = np.zeros((N + 1, dof))
-    D = np.zeros((N + 1, dof, dof))
-    l = -torque_bnd * np.ones((N + 1, dof))
-    h = torque_bnd * np.ones((N + 1, dof))
-
-    for i in range(N + 1):
-        qi = q[i]
-        qsi = qs[i]
-        qssi = qss[i]
-        # Column of N span the null space of J_lc(q)
-        J_lp = J_lc(qi)
-        u, s, v = np.linalg.svd(J_lp)
-        # Collect column index
-        s_full = np.zeros(dof)
-        s_full[:s.shape[0]] = s
-        # Form null matrix
-        N = v[s_full < 1e-5].T
-        D[i][:N.shape[1]] = N.T
-
-        # t1,t2,t3,t4 are coefficients of the Path-Torque formulae
-        t1, t3, t4 = inv_dyn(robot, qi, qsi, qsi)
-        t2, _, _ = inv_dyn(robot, qi, qsi, qssi)
-
-        a[i] = np.dot(D[i], t1)
-        b[i] = np.dot(D[i], t2 + t3)
-        c[i] = np.dot(D[i], t4)
+    l = - np.asarray(torque_bnd, dtype=float)
+    h = np.asarray(torque_bnd, dtype=float)
+
+    # t1,t2,t3,t4 are coefficients of the Path-Torque formulae
+    t1, t23, t4 = _rave_torque_coefficients(
+        robot, ss, q, qs, qss, robot_factory, n_workers, coarse_rtol)
 
+    # Rows of D span the null space of J_lc(q), at all gridpoints
+    if vectorized:
+        J_lp = np.asarray(J_lc(q))
+    else:
+        J_lp = np.array([J_lc(qi) for qi in q])
+    _, s, v = np.linalg.svd(J_lp)
+    s_full = np.zeros((N + 1, dof))
+    s_full[:, :s.shape[1]] = s
+    null = s_full < 1e-5
+    # Null space rows first, the others are zeroed
+    order = np.argsort(~null, axis=1, kind='mergesort')
+    rows = np.arange(N + 1)[:, None]
+    D = v[rows, order] * null[rows, order][:, :, None]
+
+    a = np.einsum('nij,nj->ni', D, t1)
+    b = np.einsum('nij,nj->ni', D, t23)
+    c = np.einsum('nij,nj->ni', D, t4)
     return PathConstraint(abar=a, bbar=b, cbar=c, D=D, l=l, h=h,
                           name="RedundantTorqueBounds", ss=ss)
 
 
-def create_rave_torque_path_constraint(path, ss, robot):
+def create_rave_torque_path_constraint(path, ss, robot, robot_factory=None,
+                                       n_workers=None, coarse_rtol=None):
     """Torque bounds for an OpenRAVE robot.
 
     Path-Torque constraint has the form
@@ -551,6 +817,16 @@ def create_rave_torque_path_constraint(path, ss, robot):
         Discretization gridpoints.
     robot : OpenRAVE.Robot
         Robot model to provide dynamics matrices
+    robot_factory : callable, optional
+        Return a clone of `robot`. If given, the dynamics are evaluated
+        in `n_workers` processes, each owning a clone. See
+        :class:`.WorkerPool`.
+    n_workers : int, optional
+        Number of processes. Defaults to the number of CPUs.
+    coarse_rtol : float, optional
+        If given, the dynamics are evaluated on a coarse subset of `ss`
+        and interpolated, with this relative tolerance. See
+        :func:`.interpolate_gridpoints`.
 
     Returns
     -------
@@ -558,35 +834,238 @@ def create_rave_torque_path_constraint(path, ss, robot):
         The equivalent path constraint.
     """
     N = len(ss) - 1
-    q = path.eval(ss)
-    qs = path.evald(ss)
-    qss = path.evaldd(ss)
+    q, qs, qss = path.eval_all(ss)
     dof = path.dof
 
     tau_bnd = robot.GetDOFTorqueLimits()
     a = np.zeros((N + 1, 2 * dof))
     b = np.zeros((N + 1, 2 * dof))
     c = np.zeros((N + 1, 2 * dof))
-    for i in range(N + 1):
-        qi = q[i]
-        qsi = qs[i]
-        qssi = qss[i]
-
-        # t1,t2,t3,t4 are coefficients of the Path-Torque formulae
-        t1, t3, t4 = inv_dyn(robot, qi, qsi, qsi)
-        t2, _, _ = inv_dyn(robot, qi, qsi, qssi)
-
-        a[i, :dof] = t1
-        a[i, dof:] = -t1
-        b[i, :dof] = t2 + t3
-        b[i, dof:] = -t2 - t3
-        c[i, :dof] = t4 - tau_bnd
-        c[i, dof:] = -t4 - tau_bnd
+
+    # t1,t2,t3,t4 are coefficients of the Path-Torque formulae
+    t1, t23, t4 = _rave_torque_coefficients(
+        robot, ss, q, qs, qss, robot_factory, n_workers, coarse_rtol)
+    a[:, :dof] = t1
+    a[:, dof:] = -t1
+    b[:, :dof] = t23
+    b[:, dof:] = -t23
+    c[:, :dof] = t4 - tau_bnd
+    c[:, dof:] = -t4 - tau_bnd
 
     logger.info("Torque bounds for OpenRAVE robot generated.")
     return PathConstraint(a, b, c, name="TorqueBounds", ss=ss)
 
 
+def create_torque_path_constraint(path, ss, chain, torque_bnd=None):
+    """Torque bounds for a :class:`.SerialChain`.
+
+    Same as :func:`create_rave_torque_path_constraint`, with the
+    dynamics computed by :class:`.SerialChain` for all gridpoints at
+    once instead of by OpenRAVE.
+
+    Parameters
+    ----------
+    path : Interpolator
+        Represents the underlying geometric path.
+    ss : ndarray
+        Discretization gridpoints.
+    chain : :class:`.SerialChain`
+        Robot model to provide dynamics matrices
+    torque_bnd : ndarray, optional
+        Shape (dof, ). Torque bounds. Default to
+        `chain.torque_limits`.
+
+    Returns
+    -------
+    out : PathConstraint
+        The equivalent path constraint.
+    """
+    N = len(ss) - 1
+    q, qs, qss = path.eval_all(ss)
+    dof = path.dof
+
+    if torque_bnd is None:
+        torque_bnd = chain.torque_limits
+    a = np.zeros((N + 1, 2 * dof))
+    b = np.zeros((N + 1, 2 * dof))
+    c = np.zeros((N + 1, 2 * dof))
+
+    t1, t23, t4 = chain.compute_path_torque_coefficients(q, qs, qss)
+    a[:, :dof] = t1
+    a[:, dof:] = -t1
+    b[:, :dof] = t23
+    b[:, dof:] = -t23
+    c[:, :dof] = t4 - torque_bnd
+    c[:, dof:] = -t4 - torque_bnd
+    return PathConstraint(a, b, c, name="TorqueBounds", ss=ss)
+
+
+class PayloadTorquePathConstraint(object):
+    """Torque bounds of a :class:`.SerialChain` carrying a payload.
+
+    The joint torques are affine in the inertial parameters of the
+    payload. The payload-independent coefficients and the regressors
+    of the ten inertial parameters are computed once, by
+    :func:`create_payload_torque_path_constraint`, and the constraint
+    for any payload is obtained with a single matrix product.
+
+    Attributes
+    ----------
+    ss : array
+        Shape (N+1, ). Grid points.
+    abc : array
+        Shape (3, N+1, 2 dof). Coefficients `a`, `b` and `c` without
+        payload.
+    Y : array
+        Shape (3, N+1, 2 dof, 10). Regressors of `a`, `b` and `c`.
+
+    Example
+    -------
+
+    >>> payload_pc = create_payload_torque_path_constraint(path, ss, chain)
+    >>> pc = payload_pc.with_payload(2.5, [0, 0, 0.1], np.eye(3) * 1e-3)
+    """
+
+    def __init__(self, ss, abc, Y, name="TorqueBounds"):
+        self.ss = ss
+        self.abc = abc
+        self.Y = Y
+        self.name = name
+
+    def coefficients(self, mass, com, inertia):
+        """ Coefficients `(a, b, c)` of the constraint with a payload.
+
+        Parameters
+        ----------
+        mass : float
+        com : array
+            Shape (3, ). Center of mass, in the frame of the last link.
+        inertia : array
+            Shape (3, 3). Inertia matrix about the center of mass, in
+            the frame of the last link.
+
+        Returns
+        -------
+        a, b, c : array
+            Shape (N+1, 2 dof).
+        """
+        return self.abc + np.dot(self.Y, payload_parameters(mass, com,
+                                                            inertia))
+
+    def with_payload(self, mass, com, inertia):
+        """ The constraint with a payload, see :func:`coefficients`.
+
+        Returns
+        -------
+        out : PathConstraint
+        """
+        a, b, c = self.coefficients(mass, com, inertia)
+        return PathConstraint(a, b, c, name=self.name, ss=self.ss)
+
+
+def create_payload_torque_path_constraint(path, ss, chain, torque_bnd=None):
+    """Torque bounds for a :class:`.SerialChain` with a variable payload.
+
+    Same as :func:`create_torque_path_constraint`, for a payload
+    rigidly attached to the last link and given later.
+
+    Parameters
+    ----------
+    path : Interpolator
+        Represents the underlying geometric path.
+    ss : ndarray
+        Discretization gridpoints.
+    chain : :class:`.SerialChain`
+        Robot model to provide dynamics matrices, without payload.
+    torque_bnd : ndarray, optional
+        Shape (dof, ). Torque bounds. Default to
+        `chain.torque_limits`.
+
+    Returns
+    -------
+    out : :class:`PayloadTorquePathConstraint`
+    """
+    q, qs, qss = path.eval_all(ss)
+
+    if torque_bnd is None:
+        torque_bnd = chain.torque_limits
+    t1, t23, t4 = chain.compute_path_torque_coefficients(q, qs, qss)
+    abc = np.array([np.hstack((t1, -t1)),
+                    np.hstack((t23, -t23)),
+                    np.hstack((t4 - torque_bnd, -t4 - torque_bnd))])
+    Y = np.array([np.concatenate((Yi, -Yi), axis=1)
+                  for Yi in chain.compute_path_payload_regressors(q, qs, qss)])
+    return PayloadTorquePathConstraint(ss, abc, Y)
+
+
+def compute_velocity_coefficients(qs, vlim):
+    """Coefficients of joint velocity bounds for many paths at once.
+
+    Same as :func:`create_velocity_path_constraint`, vectorized over
+    any number of leading axes. These follow the broadcasting rules of
+    NumPy, e.g. `qs` shaped (P, N+1, dof) with `vlim` shaped (P, dof,
+    2) gives one constraint per path, and `qs[:, None]` with `vlim`
+    shaped (L, dof, 2) gives one constraint per path and limit.
+
+    Parameters
+    ----------
+    qs : array
+        Shape (..., N+1, dof). First derivatives of the paths.
+    vlim : array
+        Shape (..., dof, 2). Joint velocity limits.
+
+    Returns
+    -------
+    a, b, c : array
+        Shape (..., N+1, 2). `a` and `b` are read-only views.
+    """
+    qs = np.asarray(qs, dtype=float)
+    vlim = np.asarray(vlim, dtype=float)
+    vmin = vlim[..., None, :, 0]
+    vmax = vlim[..., None, :, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sdmax = np.where(qs > 0, vmax / qs,
+                         np.where(qs < 0, vmin / qs, INFTY))
+        sdmin = np.where(qs > 0, vmin / qs,
+                         np.where(qs < 0, vmax / qs, - INFTY))
+    sdmax = np.minimum(sdmax.min(axis=-1), INFTY)
+    sdmin = np.maximum(sdmin.max(axis=-1), 0.)
+    c = np.stack((- sdmax ** 2, sdmin ** 2), axis=-1)
+    a = np.broadcast_to(0., c.shape)
+    b = np.broadcast_to([1., -1.], c.shape)
+    return a, b, c
+
+
+def compute_acceleration_coefficients(qs, qss, alim):
+    """Coefficients of joint acceleration bounds for many paths at once.
+
+    Same as :func:`create_acceleration_path_constraint`, vectorized
+    over any number of leading axes, see
+    :func:`compute_velocity_coefficients`.
+
+    Parameters
+    ----------
+    qs : array
+        Shape (..., N+1, dof). First derivatives of the paths.
+    qss : array
+        Shape (..., N+1, dof). Second derivatives of the paths.
+    alim : array
+        Shape (..., dof, 2). Joint acceleration limits.
+
+    Returns
+    -------
+    a, b, c : array
+        Shape (..., N+1, 2 dof). Read-only views.
+    """
+    qs = np.asarray(qs, dtype=float)
+    qss = np.asarray(qss, dtype=float)
+    alim = np.asarray(alim, dtype=float)
+    a = np.concatenate((qs, -qs), axis=-1)
+    b = np.concatenate((qss, -qss), axis=-1)
+    c = np.concatenate((-alim[..., 1], alim[..., 0]), axis=-1)[..., None, :]
+    return tuple(np.broadcast_arrays(a, b, c))
+
+
 def create_velocity_path_constraint(path, ss, vlim):
     """ Return joint velocities bound.
 
@@ -606,10 +1085,12 @@ def create_velocity_path_constraint(path, ss, vlim):
     -------
     pc : PathConstraint
     """
-    qs = path.evald(ss)
-    # Return resulti from cython version
-    a, b, c = _create_velocity_constraint(qs, vlim)
-    return PathConstraint(a, b, c, name="Velocity", ss=ss)
+    # The Cython routine needs a writable buffer
+    qs = np.array(path.eval_all(ss)[1])
+    _, _, c = _create_velocity_constraint(qs, vlim)
+    # Only c depends on the stage
+    return PathConstraint(np.zeros(2), np.array([1., -1.]), c,
+                          name="Velocity", ss=ss)
 
 
 def create_acceleration_path_constraint(path, ss, alim):
@@ -634,26 +1115,159 @@ def create_acceleration_path_constraint(path, ss, alim):
         
 
     """
-    N = len(ss) - 1
-    qs = path.evald(ss)
-    qss = path.evaldd(ss)
+    _, qs, qss = path.eval_all(ss)
 
-    alim = np.array(alim)
+    alim = np.array(alim, dtype=float)
     dof = path.dof  # dof
 
     if dof != 1:  # Non-scalar
         a = np.hstack((qs, -qs))
         b = np.hstack((qss, -qss))
-        c = np.zeros((N + 1, 2 * dof))
-        c[:, :dof] = -alim[:, 1]
-        c[:, dof:] = alim[:, 0]
     else:
         a = np.vstack((qs, -qs)).T
         b = np.vstack((qss, -qss)).T
-        c = np.zeros((N + 1, 2))
-        c[:, 0] = -alim[:, 1]
-        c[:, 1] = alim[:, 0]
+    c = np.r_[-alim[:, 1], alim[:, 0]]  # Same at all stages
 
     return PathConstraint(a, b, c, name="Acceleration", ss=ss)
 
 
+def _compute_path_point_derivatives(kinematics, q, qs, qss):
+    """ First and second path derivatives of a point, shaped (N+1, k).
+
+    `kinematics` is either a callable `(q, qs, qss) -> (ps, pss)`, or a
+    pair `(jacobian, hessian)` of callables mapping joint positions,
+    shaped (N+1, dof), to Jacobians, shaped (N+1, k, dof), and
+    Hessians, shaped (N+1, k, dof, dof).
+    """
+    q = np.reshape(q, (len(q), -1))
+    qs = np.reshape(qs, q.shape)
+    qss = np.reshape(qss, q.shape)
+    if callable(kinematics):
+        return kinematics(q, qs, qss)
+    jacobian, hessian = kinematics
+    J = jacobian(q)
+    ps = np.einsum('mkj,mj->mk', J, qs)
+    pss = (np.einsum('mkj,mj->mk', J, qss) +
+           np.einsum('mj,mkjl,ml->mk', qs, hessian(q), qs))
+    return ps, pss
+
+
+def _polyhedron(lim, F, g):
+    """ Return `(F, g)` of the polyhedron `F y <= g`, from box limits
+    `lim`, shaped (k, 2), or from `F` and `g` directly.
+    """
+    if lim is not None:
+        lim = np.array(lim, dtype=float)
+        if lim.ndim != 2 or lim.shape[1] != 2:
+            raise ValueError("Limits must be shaped (k, 2), got {}.".format(
+                lim.shape))
+        if np.any(lim[:, 0] > lim[:, 1]):
+            raise ValueError("Lower limits must not exceed upper limits.")
+        k = lim.shape[0]
+        F = np.vstack((np.eye(k), - np.eye(k)))
+        return F, np.r_[lim[:, 1], - lim[:, 0]]
+    if F is None or g is None:
+        raise ValueError("Either limits or both `F` and `g` are needed.")
+    F = np.array(F, dtype=float)
+    g = np.array(g, dtype=float)
+    if F.ndim != 2 or g.shape != (F.shape[0], ):
+        raise ValueError("`F` and `g` must be shaped (l, k) and (l, ), "
+                         "got {} and {}.".format(F.shape, g.shape))
+    return F, g
+
+
+def create_cartesian_velocity_path_constraint(path, ss, kinematics, vlim=None,
+                                              F=None, g=None):
+    """ Bounds on the Cartesian velocity of a point of the robot.
+
+    The velocity of the point is `ps(s) sd`, and is constrained to the
+    box `vlim` or to the polyhedron `F v <= g`. As `sd` is positive,
+    the constraint is equivalent to an upper bound on the squared path
+    velocity:
+
+                0 * ui + 1 * xi - sdmax(si)^2 <= 0
+
+    Parameters
+    ----------
+    path : Interpolator
+    ss : ndarray, shaped (N+1,)
+        Discretization gridpoints.
+    kinematics : callable or tuple
+        Either a callable `(q, qs, qss) -> (ps, pss)` returning the
+        path derivatives of the point for all gridpoints, such as
+        :meth:`.SerialChain.compute_path_point_derivatives`, or a pair
+        `(jacobian, hessian)` of callables mapping joint positions,
+        shaped (N+1, dof), to the Jacobians of the point, shaped (N+1,
+        k, dof), and to their derivatives, shaped (N+1, k, dof, dof).
+    vlim : ndarray, shaped (k, 2), optional
+        Velocity limits. Lower limits must be non-positive and upper
+        limits non-negative.
+    F : ndarray, shaped (l, k), optional
+        Polyhedral limits, used if `vlim` is not given.
+    g : ndarray, shaped (l,), optional
+        Polyhedral limits, must be non-negative.
+
+    Returns
+    -------
+    pc : PathConstraint
+
+    Raises
+    ------
+    ValueError
+        If the limits are ill-formed, or exclude the zero velocity.
+    """
+    F, g = _polyhedron(vlim, F, g)
+    if np.any(g < 0):
+        raise ValueError("The limits must allow the zero velocity: lower "
+                         "limits must be non-positive, upper limits and `g` "
+                         "non-negative.")
+    q, qs, qss = path.eval_all(ss)
+
+    ps, _ = _compute_path_point_derivatives(kinematics, q, qs, qss)
+    Fps = np.dot(ps, F.T)
+    # Rows with Fps <= 0 hold for any sd >= 0 since g >= 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sdmax = np.where(Fps > 0, g / Fps, INFTY).min(axis=1)
+    c = - np.minimum(sdmax, INFTY) ** 2
+    return PathConstraint(np.zeros(1), np.ones(1), c[:, np.newaxis],
+                          name="CartesianVelocity", ss=ss)
+
+
+def create_cartesian_acceleration_path_constraint(path, ss, kinematics,
+                                                  alim=None, F=None, g=None):
+    """ Bounds on the Cartesian acceleration of a point of the robot.
+
+    The acceleration of the point is `ps(s) sdd + pss(s) sd^2`, and is
+    constrained to the box `alim` or to the polyhedron `F a <= g`:
+
+                F ps(si) ui + F pss(si) xi - g <= 0
+
+    Parameters
+    ----------
+    path : Interpolator
+    ss : ndarray, shaped (N+1,)
+        Discretization gridpoints.
+    kinematics : callable or tuple
+        See :func:`create_cartesian_velocity_path_constraint`.
+    alim : ndarray, shaped (k, 2), optional
+        Acceleration limits. Lower limits must not exceed upper limits.
+    F : ndarray, shaped (l, k), optional
+        Polyhedral limits, used if `alim` is not given.
+    g : ndarray, shaped (l,), optional
+        Polyhedral limits.
+
+    Returns
+    -------
+    pc : PathConstraint
+
+    Raises
+    ------
+    ValueError
+        If the limits are ill-formed.
+    """
+    F, g = _polyhedron(alim, F, g)
+    q, qs, qss = path.eval_all(ss)
+
+    ps, pss = _compute_path_point_derivatives(kinematics, q, qs, qss)
+    return PathConstraint(np.dot(ps, F.T), np.dot(pss, F.T), - g,
+                          name="CartesianAcceleration", ss=ss)
@@ -0,0 +1,582 @@
+"""
+This module contains a dependency-free model of serial manipulators
+for computing the dynamics along a path.
+
+The inverse dynamics are computed with the recursive Newton-Euler
+algorithm, vectorized over any number of robot states at once.
+"""
+import numpy as np
+
+
+def _rotate_inv(R, v):
+    """ Compute R[k]^T v[k] for stacked rotations and vectors.
+    """
+    return np.einsum('mji,mj->mi', R, v)
+
+
+def _rotate(R, v):
+    """ Compute R[k] v[k] for stacked rotations and vectors.
+    """
+    return np.einsum('mij,mj->mi', R, v)
+
+
+# Entries of the upper triangle of an inertia matrix, in the order of
+# the inertial parameters
+_INERTIA_INDICES = [(0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2)]
+
+
+def payload_parameters(mass, com, inertia):
+    """Inertial parameters of a payload.
+
+    Parameters
+    ----------
+    mass : float
+    com : array
+        Shape (3, ). Center of mass, in the frame of the last link.
+    inertia : array
+        Shape (3, 3). Inertia matrix about the center of mass, in the
+        frame of the last link.
+
+    Returns
+    -------
+    pi : array
+        Shape (10, ). See :func:`SerialChain.payload_regressor`.
+    """
+    com = np.asarray(com, dtype=float)
+    # Parallel axis theorem
+    inertia = (np.asarray(inertia, dtype=float) +
+               mass * (np.dot(com, com) * np.eye(3) - np.outer(com, com)))
+    return np.r_[mass, mass * com,
+                 [inertia[k, l] for k, l in _INERTIA_INDICES]]
+
+
+class SerialChain(object):
+    """A serial kinematic chain described by standard DH parameters.
+
+    The transform from frame i-1 to frame i is
+
+        Rot_z(theta_i) Trans_z(d_i) Trans_x(a_i) Rot_x(alpha_i),
+
+    where `theta_i` is the joint position for a revolute joint and
+    `d_i` is the joint position for a prismatic joint. Frame i is
+    attached at the distal end of link i and joint i moves about, or
+    along, the z axis of frame i-1.
+
+    Parameters
+    ----------
+    dh : array
+        Shape (dof, 4). Rows `(a, alpha, d, theta)`. For each joint,
+        the joint position is added to `theta` (revolute) or `d`
+        (prismatic).
+    masses : array
+        Shape (dof, ). Link masses.
+    coms : array
+        Shape (dof, 3). Link centers of mass, in the link frames.
+    inertias : array
+        Shape (dof, 3, 3). Link inertia matrices about the centers of
+        mass, in the link frames.
+    gravity : array, optional
+        Shape (3, ). Gravity acceleration, in the base frame.
+    prismatic : array, optional
+        Shape (dof, ). True for prismatic joints. Defaults to an all
+        revolute chain.
+    torque_limits : array, optional
+        Shape (dof, ). Joint torque limits.
+
+    Example
+    -------
+
+    A planar arm with two links of length 1 and masses at their tips
+
+    >>> chain = SerialChain([[1, 0, 0, 0], [1, 0, 0, 0]],
+    ...                     masses=[1, 1], coms=np.zeros((2, 3)),
+    ...                     inertias=np.zeros((2, 3, 3)),
+    ...                     gravity=[0, -9.81, 0])
+    >>> tau = chain.inverse_dynamics(q, qd, qdd)
+    """
+
+    def __init__(self, dh, masses, coms, inertias, gravity=(0, 0, -9.81),
+                 prismatic=None, torque_limits=None):
+        self.dh = np.array(dh, dtype=float)
+        self.dof = self.dh.shape[0]
+        self.masses = np.array(masses, dtype=float)
+        self.coms = np.array(coms, dtype=float)
+        self.inertias = np.array(inertias, dtype=float)
+        self.gravity = np.array(gravity, dtype=float)
+        if prismatic is None:
+            prismatic = np.zeros(self.dof, dtype=bool)
+        self.prismatic = np.array(prismatic, dtype=bool)
+        if torque_limits is not None:
+            torque_limits = np.array(torque_limits, dtype=float)
+        self.torque_limits = torque_limits
+
+        a, alpha, d, _ = self.dh.T
+        # Origin of frame i seen from frame i-1, expressed in frame i
+        self._r = np.vstack((a, d * np.sin(alpha), d * np.cos(alpha))).T
+        # Axis of joint i expressed in frame i
+        self._z = np.vstack((np.zeros(self.dof), np.sin(alpha),
+                             np.cos(alpha))).T
+
+    @property
+    def mass(self):
+        """ Total mass of the links.
+        """
+        return self.masses.sum()
+
+    def _rotations(self, q):
+        """ Rotations from frame i-1 to frame i, shaped (m, dof, 3, 3).
+        """
+        a, alpha, d, theta = self.dh.T
+        theta = theta + np.where(self.prismatic, 0., q)
+        ct, st = np.cos(theta), np.sin(theta)
+        ca, sa = np.cos(alpha), np.sin(alpha)
+        R = np.zeros(q.shape + (3, 3))
+        R[..., 0, 0] = ct
+        R[..., 0, 1] = -st * ca
+        R[..., 0, 2] = st * sa
+        R[..., 1, 0] = st
+        R[..., 1, 1] = ct * ca
+        R[..., 1, 2] = -ct * sa
+        R[..., 2, 1] = sa
+        R[..., 2, 2] = ca
+        return R
+
+    def _offsets(self, q):
+        """ Origins of frame i seen from frame i-1, in frame i.
+        """
+        r = np.tile(self._r, q.shape[:1] + (1, 1))
+        if np.any(self.prismatic):
+            _, alpha, d, _ = self.dh.T
+            dq = np.where(self.prismatic, q, 0.)
+            r[..., 1] += dq * np.sin(alpha)
+            r[..., 2] += dq * np.cos(alpha)
+        return r
+
+    def _link_motion(self, q, qd, qdd, gravity):
+        """ Forward recursion of the Newton-Euler algorithm.
+
+        Returns the rotations and offsets of the frames, and the angular
+        velocities, angular accelerations and origin accelerations of
+        the links, each shaped (m, dof, 3), in the link frames. Gravity
+        is accounted for as an upward acceleration of the base.
+        """
+        q = np.atleast_2d(q)
+        qd = np.atleast_2d(qd)
+        qdd = np.atleast_2d(qdd)
+        m = q.shape[0]
+        R = self._rotations(q)
+        r = self._offsets(q)
+        z0 = np.array([0., 0., 1.])
+
+        W = np.zeros((m, self.dof, 3))
+        Wd = np.zeros((m, self.dof, 3))
+        Pdd = np.zeros((m, self.dof, 3))
+        w = np.zeros((m, 3))
+        wd = np.zeros((m, 3))
+        pdd = np.zeros((m, 3))
+        if gravity:
+            pdd[:] = - self.gravity
+        for i in range(self.dof):
+            Ri = R[:, i]
+            zi = z0 * qd[:, i:i + 1]
+            if self.prismatic[i]:
+                w_new = _rotate_inv(Ri, w)
+                wd_new = _rotate_inv(Ri, wd)
+                pdd = (_rotate_inv(Ri, pdd + z0 * qdd[:, i:i + 1]) +
+                       2 * np.cross(w_new, _rotate_inv(Ri, zi)))
+            else:
+                w_new = _rotate_inv(Ri, w + zi)
+                wd_new = _rotate_inv(
+                    Ri, wd + z0 * qdd[:, i:i + 1] + np.cross(w, zi))
+                pdd = _rotate_inv(Ri, pdd)
+            w, wd = w_new, wd_new
+            pdd = (pdd + np.cross(wd, r[:, i]) +
+                   np.cross(w, np.cross(w, r[:, i])))
+            W[:, i], Wd[:, i], Pdd[:, i] = w, wd, pdd
+        return R, r, W, Wd, Pdd
+
+    def _propagate_wrenches(self, R, r, f, n, F=None, Nc=None):
+        """ Backward recursion of the Newton-Euler algorithm.
+
+        `f` and `n` are the force and the moment, about the origin of
+        the last frame and in that frame, exerted on the last link by
+        its child, shaped (m, ..., 3). `F` and `Nc` are the net forces
+        and net moments about the centers of mass of the links, shaped
+        (m, dof, 3), or None for massless links. Returns the joint
+        torques, shaped (m, dof, ...).
+        """
+        tau = np.zeros(f.shape[:1] + (self.dof, ) + f.shape[1:-1])
+        for i in range(self.dof - 1, -1, -1):
+            if i < self.dof - 1:
+                # Express the wrench of link i+1 in frame i
+                Ri = R[:, i + 1].reshape(
+                    (-1, ) + (1, ) * (f.ndim - 2) + (3, 3))
+                f = np.einsum('...ij,...j->...i', Ri, f)
+                n = np.einsum('...ij,...j->...i', Ri, n)
+            ri = r[:, i].reshape((-1, ) + (1, ) * (f.ndim - 2) + (3, ))
+            n = n + np.cross(ri, f)
+            if F is not None:
+                n = n + Nc[:, i] + np.cross(ri + self.coms[i], F[:, i])
+                f = f + F[:, i]
+            if self.prismatic[i]:
+                tau[:, i] = np.dot(f, self._z[i])
+            else:
+                tau[:, i] = np.dot(n, self._z[i])
+        return tau
+
+    def inverse_dynamics(self, q, qd, qdd, gravity=True):
+        """ Compute joint torques with the recursive Newton-Euler algorithm.
+
+        Parameters
+        ----------
+        q : array
+            Shape (m, dof). Joint positions.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        gravity : bool, optional
+            If False, the gravity term is left out.
+
+        Returns
+        -------
+        tau : array
+            Shape (m, dof). Joint torques, or forces for prismatic
+            joints.
+        """
+        R, r, w, wd, pdd = self._link_motion(q, qd, qdd, gravity)
+        m = R.shape[0]
+        # Net forces and net moments about the COMs of the links
+        pdd_c = (pdd + np.cross(wd, self.coms) +
+                 np.cross(w, np.cross(w, self.coms)))
+        F = self.masses[:, None] * pdd_c
+        Iw = np.einsum('ijk,mik->mij', self.inertias, w)
+        Nc = (np.einsum('ijk,mik->mij', self.inertias, wd) +
+              np.cross(w, Iw))
+        zeros = np.zeros((m, 3))
+        return self._propagate_wrenches(R, r, zeros, zeros, F, Nc)
+
+    def payload_regressor(self, q, qd, qdd, gravity=True):
+        """ Joint torques due to a payload attached to the last link.
+
+        The torques are linear in the inertial parameters of the
+        payload
+
+            pi = (m, m cx, m cy, m cz, Ixx, Ixy, Ixz, Iyy, Iyz, Izz),
+
+        where `m` is its mass, `c` its center of mass and `I` its
+        inertia matrix about the origin of the frame of the last link,
+        all expressed in that frame. See :func:`payload_parameters`.
+
+        Parameters
+        ----------
+        q : array
+            Shape (m, dof). Joint positions.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        gravity : bool, optional
+            If False, the gravity term is left out.
+
+        Returns
+        -------
+        Y : array
+            Shape (m, dof, 10). The torques due to the payload are
+            `Y[k].dot(pi)`.
+        """
+        R, r, W, Wd, Pdd = self._link_motion(q, qd, qdd, gravity)
+        w, wd, pdd = W[:, -1], Wd[:, -1], Pdd[:, -1]
+        m = R.shape[0]
+        # Wrench exerted by the payload, one column per parameter
+        f = np.zeros((m, 10, 3))
+        n = np.zeros((m, 10, 3))
+        f[:, 0] = pdd
+        for j, e in enumerate(np.eye(3)):
+            f[:, 1 + j] = np.cross(wd, e) + np.cross(w, np.cross(w, e))
+            n[:, 1 + j] = np.cross(e, pdd)
+        for j, (k, l) in enumerate(_INERTIA_INDICES):
+            E = np.zeros((3, 3))
+            E[k, l] = E[l, k] = 1.
+            n[:, 4 + j] = np.dot(wd, E) + np.cross(w, np.dot(w, E))
+        return self._propagate_wrenches(R, r, f, n)
+
+    def compute_path_payload_regressors(self, q, qs, qss):
+        """Payload regressors of the path-torque equation.
+
+        The torques due to a payload with inertial parameters `pi`
+        add `Ya pi`, `Yb pi` and `Yc pi` to the coefficients returned
+        by :func:`compute_path_torque_coefficients`. See
+        :func:`payload_regressor`.
+
+        Parameters
+        ----------
+        q : array
+            Shape (N+1, dof). Joint positions.
+        qs : array
+            Shape (N+1, dof). First derivatives of the path.
+        qss : array
+            Shape (N+1, dof). Second derivatives of the path.
+
+        Returns
+        -------
+        Ya, Yb, Yc : array
+            Shape (N+1, dof, 10).
+        """
+        q = np.reshape(q, (len(q), self.dof))
+        qs = np.reshape(qs, q.shape)
+        qss = np.reshape(qss, q.shape)
+        zeros = np.zeros(q.shape)
+        Ya = self.payload_regressor(q, zeros, qs, gravity=False)
+        Yb = self.payload_regressor(q, qs, qss, gravity=False)
+        Yc = self.payload_regressor(q, zeros, zeros)
+        return Ya, Yb, Yc
+
+    def point_kinematics(self, q, qd, qdd, point=(0, 0, 0)):
+        """ Position, velocity and acceleration of a point of the last link.
+
+        Parameters
+        ----------
+        q : array
+            Shape (m, dof). Joint positions.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        point : array, optional
+            Shape (3, ). The point, in the frame of the last link.
+
+        Returns
+        -------
+        p : array
+            Shape (m, 3). Positions, in the base frame.
+        pd : array
+            Shape (m, 3). Velocities, in the base frame.
+        pdd : array
+            Shape (m, 3). Accelerations, in the base frame.
+        """
+        q = np.atleast_2d(q)
+        qd = np.atleast_2d(qd)
+        qdd = np.atleast_2d(qdd)
+        m = q.shape[0]
+        R = self._rotations(q)
+        r = self._offsets(q)
+
+        R0 = np.tile(np.eye(3), (m, 1, 1))  # Orientation of frame i-1
+        p = np.zeros((m, 3))
+        w = np.zeros((m, 3))
+        wd = np.zeros((m, 3))
+        pd = np.zeros((m, 3))
+        pdd = np.zeros((m, 3))
+        for i in range(self.dof):
+            z = R0[:, :, 2]  # Axis of joint i, in the base frame
+            zd = z * qd[:, i:i + 1]
+            zdd = z * qdd[:, i:i + 1]
+            R0 = np.einsum('mij,mjk->mik', R0, R[:, i])
+            d = _rotate(R0, r[:, i])  # From origin i-1 to origin i
+            if self.prismatic[i]:
+                pdd = pdd + zdd + 2 * np.cross(w, zd)
+                pd = pd + zd
+            else:
+                wd = wd + zdd + np.cross(w, zd)
+                w = w + zd
+            p = p + d
+            pd = pd + np.cross(w, d)
+            pdd = pdd + np.cross(wd, d) + np.cross(w, np.cross(w, d))
+
+        d = _rotate(R0, np.tile(np.asarray(point, dtype=float), (m, 1)))
+        p = p + d
+        pd = pd + np.cross(w, d)
+        pdd = pdd + np.cross(wd, d) + np.cross(w, np.cross(w, d))
+        return p, pd, pdd
+
+    def _link_frames(self, q):
+        """ Orientations and origins of the link frames in the base
+        frame, shaped (m, dof, 3, 3) and (m, dof, 3).
+        """
+        R = self._rotations(q)
+        r = self._offsets(q)
+        m = q.shape[0]
+        R0 = np.zeros((m, self.dof, 3, 3))
+        p = np.zeros((m, self.dof, 3))
+        R_prev = np.tile(np.eye(3), (m, 1, 1))
+        p_prev = np.zeros((m, 3))
+        for i in range(self.dof):
+            R0[:, i] = np.einsum('mij,mjk->mik', R_prev, R[:, i])
+            p[:, i] = p_prev + _rotate(R0[:, i], r[:, i])
+            R_prev, p_prev = R0[:, i], p[:, i]
+        return R0, p
+
+    def momentum_rates(self, q, qd, qdd, point=(0, 0, 0)):
+        """ Rates of change of the linear and angular momenta.
+
+        Parameters
+        ----------
+        q : array
+            Shape (m, dof). Joint positions.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        point : array, optional
+            Shape (3, ). Fixed point of the angular momentum, in the
+            base frame.
+
+        Returns
+        -------
+        Pd : array
+            Shape (m, 3). Rate of the linear momentum, in the base frame.
+        Ld : array
+            Shape (m, 3). Rate of the angular momentum about `point`, in
+            the base frame.
+        """
+        q = np.atleast_2d(q)
+        _, _, w, wd, pdd = self._link_motion(q, qd, qdd, gravity=False)
+        pdd_c = (pdd + np.cross(wd, self.coms) +
+                 np.cross(w, np.cross(w, self.coms)))
+        Iw = np.einsum('ijk,mik->mij', self.inertias, w)
+        Nc = (np.einsum('ijk,mik->mij', self.inertias, wd) +
+              np.cross(w, Iw))
+        R0, p = self._link_frames(q)
+        F = np.einsum('mijk,mik->mij', R0, self.masses[:, None] * pdd_c)
+        Nc = np.einsum('mijk,mik->mij', R0, Nc)
+        c = p + np.einsum('mijk,ik->mij', R0, self.coms)
+        Pd = F.sum(axis=1)
+        Ld = (np.cross(c - np.asarray(point, dtype=float), F) +
+              Nc).sum(axis=1)
+        return Pd, Ld
+
+    def compute_com_derivatives(self, q, point=(0, 0, 0)):
+        """Center of mass and momentum derivatives at many configurations.
+
+        Same quantities as the `compute_com_*` and
+        `compute_angular_momentum_*` methods of pymanoid, stacked over
+        all configurations. The COM acceleration and the rate of the
+        angular momentum read
+
+            J_COM qdd + qd^T H_COM qd,    J_L qdd + qd^T H_L qd.
+
+        See :func:`.create_pymanoid_contact_stability_path_constraint`.
+
+        Parameters
+        ----------
+        q : array
+            Shape (m, dof). Joint positions.
+        point : array, optional
+            Shape (3, ). Fixed point of the angular momentum, in the
+            base frame.
+
+        Returns
+        -------
+        com : array
+            Shape (m, 3). Centers of mass.
+        J_COM : array
+            Shape (m, 3, dof).
+        H_COM : array
+            Shape (m, dof, 3, dof).
+        J_L : array
+            Shape (m, 3, dof).
+        H_L : array
+            Shape (m, dof, 3, dof).
+        """
+        q = np.reshape(q, (len(q), self.dof))
+        m, dof = q.shape
+        R0, p = self._link_frames(q)
+        c = p + np.einsum('mijk,ik->mij', R0, self.coms)
+        com = np.dot(self.masses, c) / self.mass
+
+        # Columns of the Jacobians, from unit accelerations
+        eye = np.eye(dof)
+        qq = np.repeat(q, dof, axis=0)
+        zeros = np.zeros(qq.shape)
+        Pd, Ld = self.momentum_rates(qq, zeros, np.tile(eye, (m, 1)), point)
+        J_COM = Pd.reshape(m, dof, 3).transpose(0, 2, 1) / self.mass
+        J_L = Ld.reshape(m, dof, 3).transpose(0, 2, 1)
+
+        # Hessians, from the velocity products of pairs of joints
+        pairs = (eye[:, None] + eye[None, :]).reshape(-1, dof)
+        qq = np.repeat(q, dof * dof, axis=0)
+        Pd2, Ld2 = self.momentum_rates(qq, np.tile(pairs, (m, 1)),
+                                       np.zeros(qq.shape), point)
+        Pd1, Ld1 = self.momentum_rates(np.repeat(q, dof, axis=0),
+                                       np.tile(eye, (m, 1)), zeros, point)
+
+        def hessian(Q2, Q1):
+            Q2 = Q2.reshape(m, dof, dof, 3)
+            Q1 = Q1.reshape(m, dof, 3)
+            H = (Q2 - Q1[:, :, None] - Q1[:, None, :]) / 2
+            return H.transpose(0, 1, 3, 2)
+        H_COM = hessian(Pd2, Pd1) / self.mass
+        H_L = hessian(Ld2, Ld1)
+        return com, J_COM, H_COM, J_L, H_L
+
+    def compute_path_point_derivatives(self, q, qs, qss, point=(0, 0, 0)):
+        """Path derivatives of a point of the last link.
+
+        The velocity and the acceleration of the point along the path
+        read `ps sd` and `ps sdd + pss sd^2`, with
+
+            ps = J(q) qs,    pss = J(q) qss + qs^T H(q) qs.
+
+        See :func:`.create_cartesian_velocity_path_constraint`.
+
+        Parameters
+        ----------
+        q : array
+            Shape (N+1, dof). Joint positions.
+        qs : array
+            Shape (N+1, dof). First derivatives of the path.
+        qss : array
+            Shape (N+1, dof). Second derivatives of the path.
+        point : array, optional
+            Shape (3, ). The point, in the frame of the last link.
+
+        Returns
+        -------
+        ps : array
+            Shape (N+1, 3). First derivatives, in the base frame.
+        pss : array
+            Shape (N+1, 3). Second derivatives, in the base frame.
+        """
+        q = np.reshape(q, (len(q), self.dof))
+        _, ps, pss = self.point_kinematics(
+            q, np.reshape(qs, q.shape), np.reshape(qss, q.shape), point)
+        return ps, pss
+
+    def compute_path_torque_coefficients(self, q, qs, qss):
+        """Coefficients of the path-torque equation at many gridpoints.
+
+        Along a path, the inverse dynamics equation reads
+
+              M(q) qs sdd + [M(q) qss + qs^T C(q) qs] sd^2 + g(q)
+            = a sdd + b sd^2 + c
+
+        See :func:`.compute_rave_torque_coefficients` for the OpenRAVE
+        counterpart.
+
+        Parameters
+        ----------
+        q : array
+            Shape (N+1, dof). Joint positions.
+        qs : array
+            Shape (N+1, dof). First derivatives of the path.
+        qss : array
+            Shape (N+1, dof). Second derivatives of the path.
+
+        Returns
+        -------
+        a : array
+            Shape (N+1, dof). M(q) qs.
+        b : array
+            Shape (N+1, dof). M(q) qss + qs^T C(q) qs.
+        c : array
+            Shape (N+1, dof). g(q).
+        """
+        q = np.reshape(q, (len(q), self.dof))
+        qs = np.reshape(qs, q.shape)
+        qss = np.reshape(qss, q.shape)
+        zeros = np.zeros(q.shape)
+        a = self.inverse_dynamics(q, zeros, qs, gravity=False)
+        b = self.inverse_dynamics(q, qs, qss, gravity=False)
+        c = self.inverse_dynamics(q, zeros, zeros)
+        return a, b, c
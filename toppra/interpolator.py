@@ -2,50 +2,248 @@
 This module contains several interfaces for interpolated path.
 Most are simple wrappers over scipy.interpolators.
 """
+import hashlib
+import math
+from contextlib import contextmanager
 import numpy as np
-from scipy.interpolate import UnivariateSpline, CubicSpline
+from scipy.interpolate import BSpline, CubicSpline, PPoly, make_lsq_spline
+from utils import LRUCache
 
 
-class PolynomialInterpolator(object):
+def _horner(c, t, order):
+    """ Evaluate polynomials and their derivatives by Horner's scheme.
+
+    Parameters
+    ----------
+    c : array
+        Shape (k, m, ...). Coefficients, highest degree first.
+    t : array
+        Shape (m, ). Local positions.
+    order : int
+        Highest derivative.
+
+    Returns
+    -------
+    out : array
+        Shape (order+1, m, ...). Values and derivatives.
     """
+    t = np.reshape(t, t.shape + (1, ) * (c.ndim - 2))
+    out = np.zeros((order + 1, ) + np.broadcast(c[0], t).shape)
+    for ck in c:
+        for j in range(order, 0, -1):
+            out[j] = out[j] * t + out[j - 1]
+        out[0] = out[0] * t + ck
+    for j in range(2, order + 1):
+        out[j] *= math.factorial(j)
+    return out
+
+
+def _eval_ppoly_all(x, c, ss, order):
+    """ Values and derivatives of a piecewise polynomial, with a single
+    interval search. Same convention as :class:`scipy.interpolate.PPoly`.
     """
+    ss = np.asarray(ss, dtype=float)
+    ss_flat = ss.reshape(-1)
+    idx = np.clip(np.searchsorted(x, ss_flat, side='right') - 1,
+                  0, len(x) - 2)
+    out = _horner(c[:, idx], ss_flat - x[idx], order)
+    return out.reshape((order + 1, ) + ss.shape + c.shape[2:])
 
-    def __init__(self, coeff):
-        self.coeff = np.array(coeff)
-        if np.isscalar(self.coeff[0]):
-            self.dof = 1
-            self.poly = [np.polynomial.Polynomial(self.coeff)]
-            self.coeff = self.coeff.reshape(1, -1)
-        else:
-            self.dof = self.coeff.shape[0]
-            self.poly = [
-                np.polynomial.Polynomial(self.coeff[i])
-                for i in range(self.dof)
-            ]
 
-        self.polyd = [poly.deriv() for poly in self.poly]
-        self.polydd = [poly.deriv() for poly in self.polyd]
+class _MemoizedPath(object):
+    """Memoize the evaluations of a path at arrays of positions.
 
-    def eval(self, ss_sam):
-        res = [poly(np.array(ss_sam)) for poly in self.poly]
-        if self.dof == 1:
-            return np.array(res).flatten()
-        else:
-            return np.array(res).T
+    Evaluations by :func:`eval_all` are kept in a small LRU cache,
+    keyed on the contents of the positions, so that constraint
+    builders working on the same grid evaluate the path only once.
+    The cached arrays are read-only and shared: functions returning
+    or modifying them must copy them first.
 
-    def evald(self, ss_sam):
-        res = [poly(np.array(ss_sam)) for poly in self.polyd]
+    Attributes
+    ----------
+    cache_size : int
+        Number of evaluations kept. 0 disables the cache.
+    cache_bytes : int
+        Bound on the total size of the evaluations kept, in bytes.
+        None for no bound.
+    """
+    cache_size = 4
+    cache_bytes = 2 ** 26
+
+    def _memos(self):
+        """ The LRU cache and the evaluations pinned by
+        :func:`shared_evaluation`, created on first use and resized
+        when `cache_size` or `cache_bytes` change.
+        """
+        memo = getattr(self, '_memo', None)
+        if memo is None:
+            self._memo = LRUCache(self.cache_size, self.cache_bytes)
+            self._pinned = {}
+        elif (memo.maxsize, memo.maxbytes) != (self.cache_size,
+                                               self.cache_bytes):
+            memo.resize(self.cache_size, self.cache_bytes)
+        return self._memo, self._pinned
+
+    @staticmethod
+    def _key(ss):
+        ss = np.ascontiguousarray(ss, dtype=float)
+        return ss.shape, hashlib.sha1(ss.tobytes()).hexdigest()
+
+    def eval_all(self, ss, order=2):
+        """ Evaluate positions and derivatives together.
+
+        Parameters
+        ----------
+        ss : array
+            Shape (m, ). Positions to sample at.
+        order : int, optional
+            Highest derivative.
+
+        Returns
+        -------
+        out : array
+            Shape (order+1, m, dof). Stacked outputs of `eval`, `evald`
+            and `evaldd`. Read-only if `ss` is an array.
+        """
+        if np.ndim(ss) == 0:
+            return self._eval_all(ss, order)
+        cache, pinned = self._memos()
+        key = self._key(ss)
+        out = pinned.get(key, [None])[0]
+        if out is None or out.shape[0] <= order:
+            out = cache.get(key)
+        if out is None or out.shape[0] <= order:
+            out = self._eval_all(ss, order)
+            out.setflags(write=False)
+            if self.cache_size > 0:
+                cache[key] = out
+        return out[:order + 1]
+
+    @contextmanager
+    def shared_evaluation(self, ss, order=2):
+        """ Keep the evaluation at `ss` within a context.
+
+        The evaluation is never evicted from the cache within the
+        context, even if the cache is disabled.
+
+        Example
+        -------
+
+        >>> with path.shared_evaluation(ss):
+        ...     pc_vel = create_velocity_path_constraint(path, ss, vlim)
+        ...     pc_acc = create_acceleration_path_constraint(path, ss, alim)
+        ...     pc_trq = create_torque_path_constraint(path, ss, chain)
+        """
+        out = self.eval_all(ss, order)
+        _, pinned = self._memos()
+        key = self._key(ss)
+        entry = pinned.setdefault(key, [out, 0])
+        if entry[0].shape[0] < out.shape[0]:
+            entry[0] = out
+        entry[1] += 1
+        try:
+            yield out
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del pinned[key]
+
+
+class PolynomialInterpolator(_MemoizedPath):
+    """Polynomial path, one polynomial per degree of freedom.
+
+    Parameters
+    ----------
+    coeff : array
+        Shape (dof, deg+1). Coefficients, lowest degree first. Rows
+        can have different lengths. Shape (deg+1, ) for a scalar path.
+
+    Attributes
+    ----------
+    dof : int
+        Output dimension of the function
+    coeff : array
+        Shape (dof, deg+1). Coefficients, padded with zeros.
+    coeffd : array
+        Shape (dof, deg). Coefficients of the 1st derivative.
+    coeffdd : array
+        Shape (dof, deg-1). Coefficients of the 2nd derivative.
+    """
+
+    def __init__(self, coeff):
+        if np.isscalar(coeff[0]):
+            coeff = [coeff]
+        self.dof = len(coeff)
+        deg = max(len(c) for c in coeff) - 1
+        self.coeff = np.zeros((self.dof, deg + 1))
+        for i, c in enumerate(coeff):
+            self.coeff[i, :len(c)] = c
+        self.coeffd = self._derivative(self.coeff)
+        self.coeffdd = self._derivative(self.coeffd)
+
+    @staticmethod
+    def _derivative(coeff):
+        if coeff.shape[1] == 1:
+            return np.zeros_like(coeff)
+        return coeff[:, 1:] * np.arange(1, coeff.shape[1])
+
+    def _evaluate(self, coeff, ss_sam, out):
+        """ Evaluate all polynomials at all positions by Horner's scheme.
+        """
+        ss_sam = np.asarray(ss_sam, dtype=float)
+        s = ss_sam.reshape(-1, 1)
+        if out is None:
+            out = np.empty((s.shape[0], self.dof))
+        elif np.ndim(out) == 1:
+            out = out[:, np.newaxis]  # View of a scalar path buffer
+        if out.shape != (s.shape[0], self.dof):
+            raise ValueError("Output buffer shaped {}, expected {}.".format(
+                out.shape, (s.shape[0], self.dof)))
+        out[:] = coeff[:, -1]
+        for k in range(coeff.shape[1] - 2, -1, -1):
+            out *= s
+            out += coeff[:, k]
         if self.dof == 1:
-            return np.array(res).flatten()
-        else:
-            return np.array(res).T
+            return out.reshape(-1)
+        return out.reshape(ss_sam.shape + (self.dof, ))
 
-    def evaldd(self, ss_sam):
-        res = [poly(np.array(ss_sam)) for poly in self.polydd]
+    def eval(self, ss_sam, out=None):
+        """ Evaluate positions.
+
+        Parameters
+        ----------
+        ss_sam : array, or float
+            Shape (m, ). Positions to sample at.
+        out : array, optional
+            Shape (m, dof), or (m, ) if `dof` is 1. Output buffer.
+
+        Returns
+        -------
+        out : array
+            Shape (m, dof). Evaluated values at position.
+            Shape (dof,) if `ss_sam` is a float, (m, ) if `dof` is 1.
+        """
+        return self._evaluate(self.coeff, ss_sam, out)
+
+    def evald(self, ss_sam, out=None):
+        """ Evaluate 1st derivative, see :func:`eval`.
+        """
+        return self._evaluate(self.coeffd, ss_sam, out)
+
+    def evaldd(self, ss_sam, out=None):
+        """ Evaluate 2nd derivative, see :func:`eval`.
+        """
+        return self._evaluate(self.coeffdd, ss_sam, out)
+
+    def _eval_all(self, ss_sam, order):
+        """ See :func:`eval_all`.
+        """
+        ss_sam = np.asarray(ss_sam, dtype=float)
+        out = _horner(self.coeff[:, ::-1].T[:, None], ss_sam.reshape(-1),
+                      order)
         if self.dof == 1:
-            return np.array(res).flatten()
-        else:
-            return np.array(res).T
+            return out.reshape((order + 1, ) + ss_sam.shape)
+        return out.reshape((order + 1, ) + ss_sam.shape + (self.dof, ))
 
 
 def normalize(ss):
@@ -54,7 +252,7 @@ def normalize(ss):
     return np.array(ss) / ss[-1]
 
 
-class SplineInterpolator(object):
+class SplineInterpolator(_MemoizedPath):
     """Interpolate the given waypoints by spline.
 
     This is a simple wrapper over scipy.CubicSpline class.
@@ -136,12 +334,120 @@ class SplineInterpolator(object):
         """
         return self.cspldd(ss_sam)
 
+    def _eval_all(self, ss_sam, order):
+        """ See :func:`eval_all`. The interval of each position is
+        located once, and the derivatives are evaluated along with the
+        positions.
+        """
+        return _eval_ppoly_all(self.cspl.x, self.cspl.c, ss_sam, order)
 
-class UnivariateSplineInterpolator(object):
-    """ Smooth given wayspoints by a cubic spline.
 
-    This is a simple wrapper over scipy.UnivariateSplineInterpolator
-    class.
+def _smooth_spline(x, y, s, t, k, rtol=1e-3):
+    """ Smoothing spline on the knots `t`, whose squared residual is
+    between `(1 - rtol) s` and `s`.
+
+    As in FITPACK, the discontinuities of the k-th derivative at the
+    interior knots are penalized, with the weight for which the
+    squared residual of the least-squares fit, at most `s`, rises to
+    `s`.
+    """
+    n = len(t) - k - 1
+    basis = BSpline(t, np.eye(n), k)
+    B = basis(x)
+    # Jumps of the k-th derivative, constant on each span
+    interior = t[k + 1: n]
+    mids = 0.5 * (t[k: n] + t[k + 1: n + 1])
+    derivative = basis.derivative(k)(mids)
+    J = derivative[1:] - derivative[:-1]
+    BtB, JtJ, Bty = np.dot(B.T, B), np.dot(J.T, J), np.dot(B.T, y)
+    scale = np.trace(BtB) / max(np.trace(JtJ), 1e-300)
+
+    def fit(log_weight):
+        c = np.linalg.solve(BtB + scale * 10 ** log_weight * JtJ, Bty)
+        return c, ((np.dot(B, c) - y) ** 2).sum()
+
+    lo, hi = -12., 12.
+    c, residual = fit(lo)
+    if len(interior) == 0 or residual > s:
+        return BSpline(t, c, k)
+    for _ in range(100):
+        mid = 0.5 * (lo + hi)
+        c_mid, residual_mid = fit(mid)
+        if residual_mid > s:
+            hi = mid
+        else:
+            lo, c, residual = mid, c_mid, residual_mid
+        if residual >= (1 - rtol) * s:
+            break
+    return BSpline(t, c, k)
+
+
+def _fit_smoothing_spline(x, y, s, k=3):
+    """ Fit a multi-output smoothing spline with shared knots.
+
+    Knots are inserted at data points, in the spans whose squared
+    residual, summed over all outputs, exceeds their share of `s`,
+    until the total squared residual of the least-squares spline is at
+    most `s`. If no span exceeds its share, the span with the largest
+    residual is split, and if no span can be split further, the spline
+    interpolates the data. The spline is then smoothed on these knots
+    until its squared residual is close to `s`, see `_smooth_spline`.
+
+    Parameters
+    ----------
+    x : array
+        Shape (m, ). Increasing positions.
+    y : array
+        Shape (m, dof). Data.
+    s : float
+        Smoothing factor.
+    k : int, optional
+        Degree.
+
+    Returns
+    -------
+    out : :class:`scipy.interpolate.BSpline`
+    """
+    interior = np.array([])
+    while True:
+        t = np.r_[[x[0]] * (k + 1), interior, [x[-1]] * (k + 1)]
+        spl = make_lsq_spline(x, y, t, k)
+        residual = ((spl(x) - y) ** 2).sum(axis=1)
+        if residual.sum() <= s:
+            break
+        # Span of each data point, and candidate knots in each span
+        spans = np.searchsorted(interior, x, side='right')
+        new_knots = []
+        worst = None
+        for span in range(len(interior) + 1):
+            idx = np.nonzero(spans == span)[0]
+            idx = idx[(x[idx] > t[k + span]) & (x[idx] < t[k + span + 1])]
+            span_residual = residual[spans == span].sum()
+            if (len(idx) >= 3 and
+                    span_residual > s / (len(interior) + 1)):
+                new_knots.append(x[idx[len(idx) // 2]])
+            if len(idx) >= 2 and (worst is None or span_residual > worst[0]):
+                worst = (span_residual, x[idx[len(idx) // 2]])
+        if len(new_knots) == 0 and worst is not None:
+            # The residual is spread over small spans: split the worst
+            new_knots.append(worst[1])
+        if len(new_knots) == 0:
+            # No span can be split further: interpolate the data
+            interior = x[(k + 1) // 2: -((k + 1) // 2)]
+            t = np.r_[[x[0]] * (k + 1), interior, [x[-1]] * (k + 1)]
+            break
+        interior = np.sort(np.r_[interior, new_knots])
+    if s <= 0:
+        return make_lsq_spline(x, y, t, k)
+    return _smooth_spline(x, y, s, t, k)
+
+
+class UnivariateSplineInterpolator(_MemoizedPath):
+    """ Smooth given waypoints by a cubic spline.
+
+    All DOFs are smoothed jointly by a single multi-output B-spline,
+    with a shared knot vector. The spline is stored in piecewise
+    polynomial form, which evaluates all DOFs at once.
 
     Parameters
     ----------
@@ -149,28 +455,39 @@ class UnivariateSplineInterpolator(object):
         Path positions of the waypoints.
     qs: ndarray, shaped (N+1, dof)
         The waypoints.
+    s : float, optional
+        Smoothing factor, the bound on the squared residual summed over
+        all DOFs. Defaults to `(N+1) dof`, the sum of the defaults of
+        :class:`scipy.interpolate.UnivariateSpline` for each DOF.
 
     Attributes
     ----------
     dof : int
         Output dimension of the function
-    cspl : scipy.CubicSpline
-        The CubicSpline representing the underlying path.
-    cspld : scipy.CubicSpline
-        The CubicSpline representing the underlying path's *derviative*.
-    cspldd : scipy.CubicSpline
-        the CubicSpline representing the underlying path's 2nd *derivative.
+    bspl : :class:`scipy.interpolate.BSpline`
+        The smoothing spline.
+    ppoly : :class:`scipy.interpolate.PPoly`
+        The path.
+    ppolyd : :class:`scipy.interpolate.PPoly`
+        The path 1st derivative.
+    ppolydd : :class:`scipy.interpolate.PPoly`
+        The path 2nd derivative.
     """
-    def __init__(self, ss, qs):
-        """ All arguments are simiar to SplineInterpolator.
-        """
-        qs = np.array(qs)
+    def __init__(self, ss, qs, s=None):
+        ss = np.asarray(ss, dtype=float)
+        qs = np.asarray(qs, dtype=float)
         self.dof = qs.shape[1]
-        self.uspl = []
-        for i in range(self.dof):
-            self.uspl.append(UnivariateSpline(ss, qs[:, i]))
-        self.uspld = [spl.derivative() for spl in self.uspl]
-        self.uspldd = [spl.derivative() for spl in self.uspld]
+        if s is None:
+            s = qs.size
+        self.bspl = _fit_smoothing_spline(ss, qs, s)
+        # Taylor coefficients at the left end of each interval
+        t, k = self.bspl.t, self.bspl.k
+        x = np.unique(t[k: -k])
+        c = np.array([self.bspl(x[:-1], nu) / math.factorial(nu)
+                      for nu in range(k, -1, -1)])
+        self.ppoly = PPoly(c, x)
+        self.ppolyd = self.ppoly.derivative()
+        self.ppolydd = self.ppolyd.derivative()
 
     def eval(self, ss):
         """ Evaluate positions.
@@ -186,10 +503,7 @@ class UnivariateSplineInterpolator(object):
             Shape (m, dof). Evaluated values at position.
             Shape (dof,) if `ss_sam` is a float.
         """
-        data = []
-        for spl in self.uspl:
-            data.append(spl(ss))
-        return np.array(data).T
+        return self.ppoly(ss)
 
     def evald(self, ss):
         """ Evaluate 1st derivative.
@@ -204,10 +518,7 @@ class UnivariateSplineInterpolator(object):
         out : array
             Shape (m, dof). Evaluated values at position.
         """
-        data = []
-        for spl in self.uspld:
-            data.append(spl(ss))
-        return np.array(data).T
+        return self.ppolyd(ss)
 
     def evaldd(self, ss):
         """ Evaluate 2nd derivative.
@@ -222,8 +533,46 @@ class UnivariateSplineInterpolator(object):
         out : array
             Shape (m, dof). Evaluated values at position.
         """
-        data = []
-        for spl in self.uspldd:
-            data.append(spl(ss))
-        return np.array(data).T
+        return self.ppolydd(ss)
+
+    def _eval_all(self, ss, order):
+        """ See :func:`eval_all`.
+        """
+        return _eval_ppoly_all(self.ppoly.x, self.ppoly.c, ss, order)
 
+
+def path_to_ppoly(path, ss):
+    """ Represent a path as a piecewise polynomial in the path position.
+
+    Parameters
+    ----------
+    path : :class:`.SplineInterpolator`
+        Can also be :class:`.PolynomialInterpolator` or
+        :class:`.UnivariateSplineInterpolator`.
+    ss : array
+        Shape (N+1,). Grid points. Only the end-points are used, as
+        the domain of a :class:`.PolynomialInterpolator`.
+
+    Returns
+    -------
+    out : :class:`scipy.interpolate.PPoly`
+        Values are shaped (dof, ), or scalar if `dof` is 1.
+
+    Raises
+    ------
+    ValueError
+        If `path` is of another kind of interpolator.
+    """
+    if isinstance(path, SplineInterpolator):
+        return path.cspl
+    if isinstance(path, UnivariateSplineInterpolator):
+        return path.ppoly
+    if isinstance(path, PolynomialInterpolator):
+        # Taylor expansions around the start of the domain
+        deg = path.coeff.shape[1] - 1
+        derivs = path.eval_all([ss[0]], order=deg)[:, 0]
+        c = np.array([derivs[k] / math.factorial(k)
+                      for k in range(deg, -1, -1)])[:, None]
+        return PPoly(c, [ss[0], ss[-1]])
+    raise ValueError("Unable to represent {} as a piecewise "
+                     "polynomial.".format(type(path).__name__))
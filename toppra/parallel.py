@@ -0,0 +1,278 @@
+"""
+This module contains routines to evaluate constraint coefficients over
+the gridpoints with several worker processes.
+
+Robot models can not be shared between processes. Instead, each worker
+builds its own evaluator, for instance by loading a clone of the robot
+in a new environment, from a factory function given by the user. A
+:class:`WorkerPool` keeps its workers, and their evaluators, alive
+between evaluations, which spares reloading the robot models when the
+gridpoints are evaluated in several rounds.
+
+The inputs at all gridpoints are inherited by the workers, and the
+outputs at all gridpoints are preallocated in shared memory. Tasks
+only carry the indices of a chunk of gridpoints: the worker which
+takes a task writes the outputs of its chunk in place.
+
+Workers are started with `fork`, which is the default on Linux, so the
+factory needs not be picklable.
+"""
+import logging
+import multiprocessing
+import traceback
+import numpy as np
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+logger = logging.getLogger(__name__)
+
+
+def _shared_zeros(shape):
+    """ A zero array of float in shared memory.
+    """
+    raw = multiprocessing.RawArray('d', int(np.prod(shape)))
+    return np.frombuffer(raw, dtype=float).reshape(shape)
+
+
+def _evaluate_chunk(evaluators, inputs, outputs, name, idx):
+    evaluator = evaluators if name is None else evaluators[name]
+    results = evaluator(*[x[idx] for x in inputs])
+    for out, res in zip(outputs[name], results):
+        out[idx] = res
+
+
+def _worker(evaluator_factory, inputs, outputs, tasks, messages):
+    try:
+        evaluators = evaluator_factory()
+    except Exception:
+        messages.put((None, traceback.format_exc()))
+        return
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, name, idx = task
+        try:
+            _evaluate_chunk(evaluators, inputs, outputs, name, idx)
+            messages.put((task_id, None))
+        except Exception:
+            messages.put((task_id, traceback.format_exc()))
+
+
+class WorkerPool(object):
+    """Processes evaluating functions of the gridpoints.
+
+    Each worker calls the factory once, when the pool is created, and
+    keeps the evaluator for all the following evaluations, which can
+    cover any subset of the gridpoints.
+
+    Parameters
+    ----------
+    evaluator_factory : callable
+        Called once in each worker, without arguments. Returns the
+        evaluator, a callable taking chunks of the input arrays and
+        returning a sequence of output arrays for the chunk, or a dict
+        of named evaluators.
+    inputs : list of array
+        Arrays of shape (N+1, ...), the inputs at all gridpoints.
+    output_shapes : list of tuple
+        Shape of each output at a single gridpoint. A dict of lists,
+        with the same keys, if the evaluators are named.
+    n_workers : int, optional
+        Number of processes. Defaults to the number of CPUs. If 1,
+        the evaluations happen in the calling process.
+
+    Attributes
+    ----------
+    outputs : list of array
+        Arrays of shape (N+1, ) + `output_shapes[k]`, in shared memory.
+        A dict of lists if the evaluators are named.
+
+    Example
+    -------
+
+    >>> with WorkerPool(factory, [q, qs, qss], [(dof, )] * 3) as pool:
+    ...     a, b, c = pool.evaluate(idx_coarse)
+    ...     a, b, c = pool.evaluate()  # All gridpoints
+    """
+
+    def __init__(self, evaluator_factory, inputs, output_shapes,
+                 n_workers=None):
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        self.n_workers = n_workers
+        self._inputs = [np.asarray(x) for x in inputs]
+        self._n = self._inputs[0].shape[0]
+        self._named = isinstance(output_shapes, dict)
+        shapes = output_shapes if self._named else {None: output_shapes}
+        zeros = np.zeros if n_workers == 1 else _shared_zeros
+        self._outputs = dict(
+            (name, [zeros((self._n, ) + tuple(shape)) for shape in s])
+            for name, s in shapes.items())
+        self._evaluator_factory = evaluator_factory
+        self._evaluators = None
+        self._workers = []
+        if n_workers == 1:
+            return
+        self._tasks = multiprocessing.Queue()
+        self._messages = multiprocessing.Queue()
+        self._workers = [multiprocessing.Process(
+            target=_worker,
+            args=(evaluator_factory, self._inputs, self._outputs,
+                  self._tasks, self._messages))
+            for _ in range(n_workers)]
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+
+    @property
+    def outputs(self):
+        return self._outputs if self._named else self._outputs[None]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self, terminate=False):
+        """ Stop the workers.
+
+        Parameters
+        ----------
+        terminate : bool, optional
+            If True, do not wait for the pending tasks.
+        """
+        if not terminate:
+            for _ in self._workers:
+                self._tasks.put(None)
+        for worker in self._workers:
+            if terminate:
+                worker.terminate()
+            worker.join()
+        self._workers = []
+
+    def _get_message(self):
+        while True:
+            try:
+                return self._messages.get(timeout=1.)
+            except Empty:
+                if any(worker.is_alive() for worker in self._workers):
+                    continue
+                # All workers exited, wait for messages still in transit
+                try:
+                    return self._messages.get(timeout=1.)
+                except Empty:
+                    return None, "Worker processes exited unexpectedly."
+
+    def evaluate(self, idx=None, chunk_size=None, evaluator=None):
+        """Evaluate gridpoints in the workers.
+
+        Parameters
+        ----------
+        idx : array, optional
+            Shape (m, ). Indices of the gridpoints. Defaults to all.
+        chunk_size : int, optional
+            Number of gridpoints evaluated per task. Defaults to a
+            quarter of an even share.
+        evaluator : str, optional
+            Name of the evaluator, if they are named.
+
+        Returns
+        -------
+        outputs : list of array
+            Arrays of shape (m, ) + `output_shapes[k]`. The shared
+            outputs themselves if all gridpoints are evaluated.
+
+        Raises
+        ------
+        RuntimeError
+            If the evaluation fails in a worker. The pool is then
+            closed.
+        """
+        full = idx is None
+        idx = np.arange(self._n) if full else np.asarray(idx, dtype=int)
+        m = len(idx)
+        if chunk_size is None:
+            chunk_size = max(1, int(np.ceil(m / (4. * self.n_workers))))
+        chunks = [idx[start: start + chunk_size]
+                  for start in range(0, m, chunk_size)]
+
+        if self.n_workers == 1:
+            if self._evaluators is None:
+                self._evaluators = self._evaluator_factory()
+            for chunk in chunks:
+                _evaluate_chunk(self._evaluators, self._inputs,
+                                self._outputs, evaluator, chunk)
+        else:
+            if not self._workers:
+                raise RuntimeError("The worker pool is closed.")
+            for task_id, chunk in enumerate(chunks):
+                self._tasks.put((task_id, evaluator, chunk))
+            for _ in chunks:
+                _, error = self._get_message()
+                if error is not None:
+                    self.close(terminate=True)
+                    raise RuntimeError(
+                        "Evaluation failed in a worker process:\n" + error)
+            logger.debug("Evaluated %d gridpoints with %d workers.",
+                         m, self.n_workers)
+        outputs = self._outputs[evaluator]
+        if full:
+            return outputs
+        return [out[idx] for out in outputs]
+
+
+def evaluate_gridpoints(evaluator_factory, inputs, output_shapes,
+                        n_workers=None, chunk_size=None):
+    """Evaluate a function of the gridpoints with several processes.
+
+    The workers only live for this evaluation. Use a
+    :class:`WorkerPool` to evaluate several times with the same
+    workers.
+
+    Parameters
+    ----------
+    evaluator_factory : callable
+        Called once in each worker, without arguments. Returns the
+        evaluator, a callable taking chunks of the input arrays and
+        returning a sequence of output arrays for the chunk.
+    inputs : list of array
+        Arrays of shape (N+1, ...) to split between the workers.
+    output_shapes : list of tuple
+        Shape of each output at a single gridpoint.
+    n_workers : int, optional
+        Number of processes. Defaults to the number of CPUs. If 1,
+        the evaluation happens in the calling process.
+    chunk_size : int, optional
+        Number of gridpoints evaluated per task. Defaults to a quarter
+        of an even share.
+
+    Returns
+    -------
+    outputs : list of array
+        Arrays of shape (N+1, ) + `output_shapes[k]`, in shared memory.
+
+    Raises
+    ------
+    RuntimeError
+        If the evaluation fails in a worker.
+
+    Example
+    -------
+
+    Compute torque coefficients with one OpenRAVE environment per worker
+
+    >>> def factory():
+    ...     env = orpy.Environment()
+    ...     env.Load('robots/pumaarm.zae')
+    ...     robot = env.GetRobots()[0]
+    ...     return lambda q, qs, qss: compute_rave_torque_coefficients(
+    ...         robot, q, qs, qss)
+    >>> a, b, c = evaluate_gridpoints(factory, [q, qs, qss], [(dof, )] * 3)
+    """
+    with WorkerPool(evaluator_factory, inputs, output_shapes,
+                    n_workers) as pool:
+        return pool.evaluate(chunk_size=chunk_size)
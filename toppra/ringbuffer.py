@@ -0,0 +1,267 @@
+"""
+This module contains a single-producer single-consumer ring buffer
+for passing sampled trajectories to another process without copying.
+
+The buffer lives in a file, preferably on a memory-backed file system
+such as `/dev/shm`, which both processes map with :class:`numpy.memmap`.
+
+Layout
+------
+
+The file starts with a header of `HEADER_SIZE` bytes made of eight
+little-endian int64 slots:
+
+=====  ==========================================================
+Slot   Content
+=====  ==========================================================
+0      Magic number `MAGIC`.
+1      Layout version `VERSION`.
+2      Degrees of freedom `dof`.
+3      Capacity, in number of records.
+4      Number of records written so far (only the producer writes).
+5      Number of records read so far (only the consumer writes).
+6      1 if the producer has closed the stream, 0 otherwise.
+7      Reserved.
+=====  ==========================================================
+
+The header is followed by `capacity` records of dtype
+:func:`record_dtype`, i.e. `(t, q[dof], qd[dof], qdd[dof])` as
+little-endian float64. Record `k` of the stream is stored in slot
+`k % capacity`.
+
+Records are always written before the write counter is increased, and
+read before the read counter is increased.
+"""
+import time
+import numpy as np
+from trajectory import compute_trajectory_chunks
+
+MAGIC = 0x52505054  # "TPPR"
+VERSION = 1
+HEADER_SIZE = 64
+
+_MAGIC, _VERSION, _DOF, _CAPACITY, _WRITTEN, _READ, _CLOSED = range(7)
+
+
+def record_dtype(dof):
+    """ Return the dtype of one record for a `dof` degrees of freedom robot.
+    """
+    return np.dtype([('t', '<f8'), ('q', '<f8', (dof, )),
+                     ('qd', '<f8', (dof, )), ('qdd', '<f8', (dof, ))])
+
+
+class _RingBuffer(object):
+    """ Common mapping of the header and the records.
+    """
+
+    def _map(self, filename, mode):
+        self.filename = filename
+        self._header = np.memmap(filename, dtype='<i8', mode=mode,
+                                 shape=(HEADER_SIZE // 8, ))
+
+    def _map_records(self, mode):
+        self.dof = int(self._header[_DOF])
+        self.capacity = int(self._header[_CAPACITY])
+        self.records = np.memmap(
+            self.filename, dtype=record_dtype(self.dof), mode=mode,
+            offset=HEADER_SIZE, shape=(self.capacity, ))
+
+    @property
+    def nb_written(self):
+        """ Number of records written since the stream started.
+        """
+        return int(self._header[_WRITTEN])
+
+    @property
+    def nb_read(self):
+        """ Number of records read since the stream started.
+        """
+        return int(self._header[_READ])
+
+    @property
+    def closed(self):
+        """ True if the producer will not write any more records.
+        """
+        return bool(self._header[_CLOSED])
+
+
+class RingBufferWriter(_RingBuffer):
+    """Producer end of a trajectory ring buffer.
+
+    Creates, or overwrites, the file `filename`.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the shared file, for instance `/dev/shm/toppra_traj`.
+    dof : int
+        Degrees of freedom of the trajectory.
+    capacity : int, optional
+        Number of records the buffer holds.
+
+    Example
+    -------
+
+    >>> writer = RingBufferWriter("/dev/shm/traj", path.dof)
+    >>> writer.push_trajectory(path, ss, us, xs, dt=1e-3)
+    >>> writer.close()
+    """
+
+    def __init__(self, filename, dof, capacity=10000):
+        size = HEADER_SIZE + capacity * record_dtype(dof).itemsize
+        with open(filename, 'wb') as f:
+            f.truncate(size)
+        self._map(filename, 'r+')
+        self._header[_DOF] = dof
+        self._header[_CAPACITY] = capacity
+        self._header[_WRITTEN] = 0
+        self._header[_READ] = 0
+        self._header[_CLOSED] = 0
+        self._header[_VERSION] = VERSION
+        self._header[_MAGIC] = MAGIC  # Written last: the buffer is ready.
+        self._map_records('r+')
+
+    def push(self, ts, q, qd, qdd, block=True, poll=1e-4):
+        """ Append samples to the buffer.
+
+        Parameters
+        ----------
+        ts : array
+            Shape (m, ). Times.
+        q : array
+            Shape (m, dof). Joint positions.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        block : bool, optional
+            If True, wait for the consumer to free space until all
+            samples are written. If False, write only what fits.
+        poll : float, optional
+            Waiting time in seconds between two checks for free space.
+
+        Returns
+        -------
+        out : int
+            Number of samples written.
+        """
+        m = len(ts)
+        done = 0
+        while done < m:
+            written = self.nb_written
+            free = self.capacity - (written - self.nb_read)
+            if free == 0:
+                if not block:
+                    break
+                time.sleep(poll)
+                continue
+            # Contiguous free slots, up to the end of the records
+            start = written % self.capacity
+            count = min(m - done, free, self.capacity - start)
+            chunk = self.records[start: start + count]
+            chunk['t'] = ts[done: done + count]
+            chunk['q'] = np.reshape(q[done: done + count], (count, self.dof))
+            chunk['qd'] = np.reshape(qd[done: done + count], (count, self.dof))
+            chunk['qdd'] = np.reshape(qdd[done: done + count],
+                                      (count, self.dof))
+            self._header[_WRITTEN] = written + count
+            done += count
+        return done
+
+    def push_trajectory(self, path, ss, us, xs, dt=1e-2, chunk_size=1000):
+        """ Sample a parametrized path and stream it into the buffer.
+
+        See :func:`.compute_trajectory_chunks` for the parameters.
+        Blocks until all samples are written.
+        """
+        for ts, q, qd, qdd in compute_trajectory_chunks(
+                path, ss, us, xs, dt=dt, chunk_size=chunk_size):
+            self.push(ts, q, qd, qdd)
+
+    def close(self):
+        """ Signal the consumer that no more records will be written.
+        """
+        self._header[_CLOSED] = 1
+
+
+class RingBufferReader(_RingBuffer):
+    """Consumer end of a trajectory ring buffer.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the file created by a :class:`RingBufferWriter`.
+
+    Example
+    -------
+
+    >>> reader = RingBufferReader("/dev/shm/traj")
+    >>> for records in reader.iter_records():
+    ...     controller.send(records['t'], records['q'])
+    """
+
+    def __init__(self, filename):
+        self._map(filename, 'r+')
+        if (self._header[_MAGIC] != MAGIC or
+                self._header[_VERSION] != VERSION):
+            raise ValueError(
+                "{} is not a toppra ring buffer (version {:d})".format(
+                    filename, VERSION))
+        self._map_records('r+')
+
+    def peek(self, max_count=None):
+        """ Return the oldest unread records, without copying.
+
+        Only contiguous records are returned, so fewer records than
+        available can be returned when the stream wraps around the end
+        of the buffer. The records stay valid until :func:`advance` is
+        called.
+
+        Parameters
+        ----------
+        max_count : int, optional
+            Maximum number of records to return.
+
+        Returns
+        -------
+        out : array
+            Shape (m, ). A view of the records, of dtype
+            :func:`record_dtype`. Fields are `t`, `q`, `qd` and `qdd`.
+        """
+        read = self.nb_read
+        available = self.nb_written - read
+        start = read % self.capacity
+        count = min(available, self.capacity - start)
+        if max_count is not None:
+            count = min(count, max_count)
+        return self.records[start: start + count]
+
+    def advance(self, count):
+        """ Release `count` records to the producer.
+        """
+        self._header[_READ] = self.nb_read + count
+
+    def iter_records(self, max_count=None, poll=1e-4):
+        """ Yield views of the records until the stream is closed.
+
+        Each yielded view is released when the next one is requested.
+
+        Parameters
+        ----------
+        max_count : int, optional
+            Maximum number of records per view.
+        poll : float, optional
+            Waiting time in seconds between two checks for new records.
+        """
+        while True:
+            # Check the closed flag before peeking so that records
+            # written right before closing are not missed.
+            closed = self.closed
+            records = self.peek(max_count)
+            if records.shape[0] > 0:
+                yield records
+                self.advance(records.shape[0])
+            elif closed:
+                return
+            else:
+                time.sleep(poll)
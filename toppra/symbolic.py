@@ -0,0 +1,135 @@
+"""
+This module compiles symbolic inequalities into path constraints. It
+requires `sympy`, and is not imported with the package:
+
+>>> from toppra.symbolic import create_symbolic_path_constraint
+
+Inequalities are written in the path acceleration `u`, the squared
+path velocity `x` and the path position `s`, and optionally in the
+joint positions and their derivatives along the path. They must be
+affine in `u` and `x`. The coefficients of the canonical form
+
+    a(s) u + b(s) x + c(s) <= 0
+
+are extracted symbolically once, and evaluated over a whole grid by a
+single vectorized NumPy function.
+"""
+import numpy as np
+import sympy
+from constraints import PathConstraint
+
+U, X, S = sympy.symbols('u x s')
+
+
+def _canonical_form(expression):
+    """ Return `f` such that the inequality reads `f <= 0`.
+
+    Strict inequalities are rejected: path constraints are closed.
+    """
+    rel_op = getattr(expression, 'rel_op', None)
+    if rel_op == "<=":
+        return expression.lhs - expression.rhs
+    elif rel_op == ">=":
+        return expression.rhs - expression.lhs
+    raise ValueError(
+        "Relation Operation need to be `<=` or `>=`, got {}.".format(
+            expression))
+
+
+def compile_canonical_constraint(expressions, u=U, x=X, s=S, q=(), qs=(),
+                                 qss=()):
+    """Compile inequalities into a function of the grid points.
+
+    Parameters
+    ----------
+    expressions : list
+        Inequalities, e.g. `[u * s + x <= 1, x >= 0]`.
+    u, x, s : :class:`sympy.Symbol`, optional
+        Symbols of the path acceleration, squared path velocity and
+        path position. Default to the symbols `U`, `X` and `S` of this
+        module.
+    q, qs, qss : list of :class:`sympy.Symbol`, optional
+        Symbols of the joint positions, and of their first and second
+        derivatives with respect to the path position. If given, one
+        symbol per degree of freedom.
+
+    Returns
+    -------
+    evaluate : callable
+        Maps grid points `ss`, shaped (N+1,), and optionally a path to
+        the coefficients `(a, b, c)`, each shaped (N+1, m). The path
+        is needed if `q`, `qs` or `qss` are given.
+
+    Raises
+    ------
+    ValueError
+        If an expression is not a non-strict inequality, i.e. `<=` or
+        `>=`, or is not affine in `u` and `x`.
+    """
+    q, qs, qss = list(q), list(qs), list(qss)
+    a, b, c = [], [], []
+    for expression in expressions:
+        f = sympy.expand(_canonical_form(expression))
+        a_f, b_f = sympy.diff(f, u), sympy.diff(f, x)
+        if a_f.has(u, x) or b_f.has(u, x):
+            raise ValueError(
+                "{} is not affine in {} and {}.".format(expression, u, x))
+        a.append(a_f)
+        b.append(b_f)
+        c.append(f.subs({u: 0, x: 0}))
+    coeffs = sympy.lambdify([s] + q + qs + qss, a + b + c, modules='numpy')
+    m = len(expressions)
+
+    def evaluate(ss, path=None):
+        ss = np.asarray(ss, dtype=float)
+        args = [ss]
+        # Positions and derivatives up to the highest one needed
+        needed = [len(symbols) > 0 for symbols in (q, qs, qss)]
+        if any(needed):
+            order = max(k for k, need in enumerate(needed) if need)
+            for need, values in zip(needed, path.eval_all(ss, order)):
+                if need:
+                    args.extend(np.reshape(values, (len(ss), -1)).T)
+        # Constant coefficients are returned as scalars
+        values = np.column_stack([
+            np.broadcast_to(np.asarray(value, dtype=float), ss.shape)
+            for value in coeffs(*args)])
+        return values[:, :m], values[:, m: 2 * m], values[:, 2 * m:]
+    return evaluate
+
+
+def create_symbolic_path_constraint(expressions, ss, path=None, name=None,
+                                    **symbols):
+    """Canonical path constraint from symbolic inequalities.
+
+    Parameters
+    ----------
+    expressions : list
+        Inequalities, see :func:`compile_canonical_constraint`.
+    ss : array
+        Shape (N+1,). Grid points.
+    path : Interpolator, optional
+        Needed if the inequalities involve the joint positions or
+        their derivatives.
+    name : str, optional
+        Name of the constraint.
+    **symbols
+        Passed to :func:`compile_canonical_constraint`.
+
+    Returns
+    -------
+    out : :class:`.PathConstraint`
+
+    Example
+    -------
+
+    >>> from toppra.symbolic import U as u, X as x, S as s
+    >>> qs0, qs1 = sympy.symbols('qs0 qs1')
+    >>> expressions = [- 0.2 * (0.5 - s) * u + 3 * x - 1 <= 0,
+    ...                (qs0 ** 2 + qs1 ** 2) * x <= 2, u <= 1, u >= -1]
+    >>> pc = create_symbolic_path_constraint(
+    ...     expressions, ss, path, qs=[qs0, qs1])
+    """
+    evaluate = compile_canonical_constraint(expressions, **symbols)
+    a, b, c = evaluate(ss, path)
+    return PathConstraint(a=a, b=b, c=c, name=name, ss=np.asarray(ss))
@@ -0,0 +1,426 @@
+"""
+This module contains routines for evaluating a parametrized path in
+the time domain.
+
+The output of TOPP-RA is a pair of arrays `(us, xs)` defined over the
+grid `ss`. Within each interval :math:`[s_i, s_{i+1}]` the path
+acceleration is constant and equals `us[i]`, hence
+
+.. math::
+
+    \dot s(t)  & = \dot s_i + u_i (t - t_i) \\\\
+    s(t)       & = s_i + \dot s_i (t - t_i) + u_i (t - t_i) ^ 2 / 2
+
+where :math:`t_i` is the time at which the i-th gridpoint is reached.
+"""
+import numpy as np
+from scipy.interpolate import PPoly
+from interpolator import path_to_ppoly
+
+
+def _scale_rows(vectors, scalars):
+    """Multiply the i-th row of `vectors` with the i-th entry of `scalars`.
+
+    `vectors` can be shaped (m, ) or (m, dof).
+    """
+    if vectors.ndim == 1:
+        return vectors * scalars
+    return vectors * scalars[:, np.newaxis]
+
+
+def compute_time_grid(ss, xs):
+    """Compute the time at each gridpoint.
+
+    The path is not evaluated. Several velocity profiles defined over
+    the same grid can be processed at once.
+
+    Parameters
+    ----------
+    ss : array
+        Shape (N+1,). Grid points.
+    xs : array
+        Shape (N+1,), or (P, N+1) for P profiles. Squared velocities.
+
+    Returns
+    -------
+    tgrid : array
+        Same shape as `xs`. Time at each gridpoint, starting from 0.
+    """
+    ss = np.asarray(ss, dtype=float)
+    sds = np.sqrt(np.asarray(xs, dtype=float))
+    tgrid = np.zeros(sds.shape)
+    np.cumsum(2 * (ss[1:] - ss[:-1]) / (sds[..., 1:] + sds[..., :-1]),
+              axis=-1, out=tgrid[..., 1:])
+    return tgrid
+
+
+def compute_duration(ss, xs):
+    """Compute the time needed to traverse the path.
+
+    Squared velocities are only used through the time they spend in
+    each interval, which decreases with the velocity. Hence, passing
+    the upper end-points of the controllable sets (see
+    :func:`.qpOASESPPSolver.compute_duration_lower_bound`) gives a
+    lower bound on the duration of any admissible profile.
+
+    Parameters
+    ----------
+    ss : array
+        Shape (N+1,). Grid points.
+    xs : array
+        Shape (N+1,), or (P, N+1) for P profiles. Squared velocities.
+
+    Returns
+    -------
+    out : float, or array
+        Duration. Shape (P, ) if `xs` is shaped (P, N+1).
+    """
+    ss = np.asarray(ss, dtype=float)
+    sds = np.sqrt(np.asarray(xs, dtype=float))
+    return np.sum(2 * (ss[1:] - ss[:-1]) / (sds[..., 1:] + sds[..., :-1]),
+                  axis=-1)
+
+
+class Trajectory(object):
+    """A time-parametrized trajectory evaluated on demand.
+
+    Only the time stamps of the gridpoints are stored. Joint
+    positions, velocities and accelerations are computed from the
+    underlying path whenever they are queried.
+
+    Parameters
+    ----------
+    path : :class:`.SplineInterpolator`
+        The geometric path. Can also be
+        :class:`.PolynomialInterpolator` or
+        :class:`.UnivariateSplineInterpolator`.
+    ss : array
+        Shape (N+1,). Grid points.
+    us : array
+        Shape (N,). Controls.
+    xs : array
+        Shape (N+1,). Squared velocities.
+
+    Attributes
+    ----------
+    dof : int
+        Output dimension of the path.
+    tgrid : array
+        Shape (N+1,). Time at each gridpoint.
+    duration : float
+        Time needed to traverse the path.
+
+    Example
+    -------
+
+    >>> traj = Trajectory(path, ss, us, xs)
+    >>> q, qd, qdd = traj.eval_all(np.linspace(0, traj.duration, 100))
+    """
+
+    def __init__(self, path, ss, us, xs):
+        self.path = path
+        self.dof = path.dof
+        self.ss = np.array(ss, dtype=float)
+        self.us = np.array(us, dtype=float)
+        self.sds = np.sqrt(np.array(xs, dtype=float))
+        self.N = self.ss.shape[0] - 1
+        self.tgrid = compute_time_grid(self.ss, xs)
+
+    @property
+    def duration(self):
+        """ Time needed to traverse the path.
+        """
+        return self.tgrid[-1] - self.tgrid[0]
+
+    def eval_path_states(self, ts):
+        """ Evaluate path position, velocity and acceleration.
+
+        Times outside of `[tgrid[0], tgrid[-1]]` are clipped to the
+        nearest end-point.
+
+        Parameters
+        ----------
+        ts : array, or float
+            Shape (m, ). Times to sample at.
+
+        Returns
+        -------
+        s : array
+            Shape (m, ). Path positions.
+        sd : array
+            Shape (m, ). Path velocities.
+        sdd : array
+            Shape (m, ). Path accelerations.
+        """
+        ts = np.clip(np.atleast_1d(np.asarray(ts, dtype=float)),
+                     self.tgrid[0], self.tgrid[-1])
+        idx = self._locate(ts)
+        return self._eval_path_states_at(ts, idx)
+
+    def _locate(self, ts, lo=0):
+        """ Index of the grid interval containing each time in `ts`.
+
+        Only intervals from `lo` onward are searched.
+        """
+        # The last interval includes its end-point
+        idx = np.searchsorted(self.tgrid[lo:], ts, side='right') - 1 + lo
+        return np.clip(idx, lo, self.N - 1)
+
+    def _eval_path_states_at(self, ts, idx):
+        tau = ts - self.tgrid[idx]
+        sdd = self.us[idx]
+        sd = self.sds[idx] + sdd * tau
+        s = self.ss[idx] + self.sds[idx] * tau + 0.5 * sdd * tau ** 2
+        return s, sd, sdd
+
+    def eval_all(self, ts):
+        """ Evaluate joint positions, velocities and accelerations.
+
+        Parameters
+        ----------
+        ts : array, or float
+            Shape (m, ). Times to sample at.
+
+        Returns
+        -------
+        q : array
+            Shape (m, dof). Joint positions.
+            Shape (dof, ) if `ts` is a float.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        """
+        q, qd, qdd = self._eval_joint_states(*self.eval_path_states(ts))
+        if np.isscalar(ts):
+            return q[0], qd[0], qdd[0]
+        return q, qd, qdd
+
+    def _eval_joint_states(self, s, sd, sdd):
+        q, qs, qss = self.path.eval_all(s)
+        qd = _scale_rows(qs, sd)
+        qdd = _scale_rows(qs, sdd) + _scale_rows(qss, sd ** 2)
+        return np.array(q), qd, qdd  # Not the memoized positions
+
+    def iter_points(self, dt=1e-2, chunk_size=1000):
+        """ Sample the trajectory uniformly, chunk by chunk.
+
+        The samples are the same as those returned by
+        :func:`.compute_trajectory_points` without smoothing, but at
+        most `chunk_size` of them are held in memory at any time.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Sampling time step.
+        chunk_size : int, optional
+            Number of samples per chunk. The last chunk can be shorter.
+
+        Yields
+        ------
+        ts : array
+            Shape (m, ). Sampled times.
+        q : array
+            Shape (m, dof). Joint positions.
+        qd : array
+            Shape (m, dof). Joint velocities.
+        qdd : array
+            Shape (m, dof). Joint accelerations.
+        """
+        nb_samples = int(np.ceil((self.tgrid[-1] - self.tgrid[0]) / dt))
+        igrid = 0  # The interval search resumes from here
+        for start in range(0, nb_samples, chunk_size):
+            ks = np.arange(start, min(start + chunk_size, nb_samples))
+            ts = self.tgrid[0] + ks * dt
+            idx = self._locate(ts, igrid)
+            igrid = idx[-1]
+            q, qd, qdd = self._eval_joint_states(
+                *self._eval_path_states_at(ts, idx))
+            yield ts, q, qd, qdd
+
+    def eval(self, ts):
+        """ Evaluate joint positions.
+
+        Parameters
+        ----------
+        ts : array, or float
+            Shape (m, ). Times to sample at.
+
+        Returns
+        -------
+        out : array
+            Shape (m, dof). Joint positions.
+            Shape (dof, ) if `ts` is a float.
+        """
+        s, _, _ = self.eval_path_states(ts)
+        q = self.path.eval(s)
+        if np.isscalar(ts):
+            return q[0]
+        return q
+
+    def evald(self, ts):
+        """ Evaluate joint velocities.
+
+        Parameters
+        ----------
+        ts : array, or float
+            Shape (m, ). Times to sample at.
+
+        Returns
+        -------
+        out : array
+            Shape (m, dof). Joint velocities.
+            Shape (dof, ) if `ts` is a float.
+        """
+        s, sd, _ = self.eval_path_states(ts)
+        qd = _scale_rows(self.path.evald(s), sd)
+        if np.isscalar(ts):
+            return qd[0]
+        return qd
+
+    def evaldd(self, ts):
+        """ Evaluate joint accelerations.
+
+        Parameters
+        ----------
+        ts : array, or float
+            Shape (m, ). Times to sample at.
+
+        Returns
+        -------
+        out : array
+            Shape (m, dof). Joint accelerations.
+            Shape (dof, ) if `ts` is a float.
+        """
+        s, sd, sdd = self.eval_path_states(ts)
+        _, qs, qss = self.path.eval_all(s)
+        qdd = _scale_rows(qs, sdd) + _scale_rows(qss, sd ** 2)
+        if np.isscalar(ts):
+            return qdd[0]
+        return qdd
+
+
+def compute_trajectory_chunks(path, sgrid, ugrid, xgrid, dt=1e-2,
+                              chunk_size=1000):
+    """Compute trajectory with uniform sampling time, chunk by chunk.
+
+    A generator counterpart of :func:`.compute_trajectory_points`
+    (without smoothing) with bounded memory usage. See
+    :func:`Trajectory.iter_points`.
+
+    Parameters
+    ----------
+    path : :class:`.SplineInterpolator`
+        The geometric path to parametrize. Can also be
+        :class:`.PolynomialInterpolator` or
+        :class:`.UnivariateSplineInterpolator`.
+    sgrid : array
+        Shape (N+1,). Grid points.
+    ugrid : array
+        Shape (N,). Controls.
+    xgrid : array
+        Shape (N+1,). Squared velocities.
+    dt : float, optional
+        Sampling time step.
+    chunk_size : int, optional
+        Number of samples per chunk.
+
+    Yields
+    ------
+    tgrid : array
+        Shape (m, ). Sampled times.
+    q : array
+        Shape (m, dof). Joint positions.
+    qd : array
+        Shape (m, dof). Joint velocities.
+    qdd : array
+        Shape (m, dof). Joint accelerations.
+
+    Example
+    -------
+
+    >>> for ts, q, qd, qdd in compute_trajectory_chunks(
+    ...         path, ss, us, xs, dt=1e-3, chunk_size=500):
+    ...     controller.send(ts, q, qd, qdd)
+    """
+    return Trajectory(path, sgrid, ugrid, xgrid).iter_points(dt, chunk_size)
+
+
+def compute_trajectory_ppoly(path, sgrid, ugrid, xgrid):
+    """Compute the trajectory as a piecewise polynomial in time.
+
+    Within each grid interval, the path position :math:`s(t)` is a
+    quadratic polynomial. Composing it with the polynomial pieces of
+    the path gives an exact representation of :math:`q(t)`. Its
+    breakpoints are the gridpoint times together with the times at
+    which the path crosses its own breakpoints.
+
+    Velocities and accelerations are obtained with
+    :func:`scipy.interpolate.PPoly.derivative`.
+
+    Parameters
+    ----------
+    path : :class:`.SplineInterpolator`
+        Can also be :class:`.PolynomialInterpolator`.
+    sgrid : array
+        Shape (N+1,). Grid points.
+    ugrid : array
+        Shape (N,). Controls.
+    xgrid : array
+        Shape (N+1,). Squared velocities.
+
+    Returns
+    -------
+    out : :class:`scipy.interpolate.PPoly`
+        Joint positions as a function of time. Values are shaped
+        (dof, ), or scalar if `dof` is 1. The polynomials have twice
+        the degree of those of the path.
+
+    Example
+    -------
+
+    >>> q_t = compute_trajectory_ppoly(path, ss, us, xs)
+    >>> qd_t, qdd_t = q_t.derivative(), q_t.derivative(2)
+    >>> ts = np.arange(0, q_t.x[-1], 1e-3)
+    >>> q, qd, qdd = q_t(ts), qd_t(ts), qdd_t(ts)
+    """
+    traj = Trajectory(path, sgrid, ugrid, xgrid)
+    path_pp = path_to_ppoly(path, traj.ss)
+    value_shape = path_pp.c.shape[2:]
+    c_path = path_pp.c.reshape(path_pp.c.shape[0], path_pp.c.shape[1], -1)
+    deg = c_path.shape[0] - 1
+
+    # Times at which the path breakpoints are crossed: solve
+    # s_i + sd_i tau + u_i tau^2 / 2 = s_k in a stable form.
+    s_knots = path_pp.x[(path_pp.x > traj.ss[0]) & (path_pp.x < traj.ss[-1])]
+    idx = np.searchsorted(traj.ss, s_knots, side='right') - 1
+    ds = s_knots - traj.ss[idx]
+    sd = traj.sds[idx]
+    tau = 2 * ds / (sd + np.sqrt(sd ** 2 + 2 * traj.us[idx] * ds))
+    tbreaks = np.unique(np.hstack((traj.tgrid, traj.tgrid[idx] + tau)))
+
+    # Path states at the start of each piece. Pieces are located by
+    # their midpoints, which are robust to round-off at the breakpoints.
+    tmid = (tbreaks[1:] + tbreaks[:-1]) / 2
+    igrid = traj._locate(tmid)
+    s0, sd0, sdd0 = traj._eval_path_states_at(tbreaks[:-1], igrid)
+    s_mid, _, _ = traj._eval_path_states_at(tmid, igrid)
+    ipath = np.clip(np.searchsorted(path_pp.x, s_mid, side='right') - 1,
+                    0, c_path.shape[1] - 1)
+
+    # r(tau) = s(tau) - x_p, ascending coefficients. Its powers are
+    # accumulated, r^k, with ascending coefficients too.
+    r = np.vstack((s0 - path_pp.x[ipath], sd0, sdd0 / 2)).T
+    m = tmid.shape[0]
+    rpow = np.zeros((m, 2 * deg + 1))
+    rpow[:, 0] = 1
+    coeffs = np.zeros((m, 2 * deg + 1, c_path.shape[2]))
+    for k in range(deg + 1):
+        # PPoly coefficients are stored by descending powers
+        coeffs += rpow[:, :, np.newaxis] * c_path[deg - k, ipath][:, np.newaxis]
+        rpow_next = rpow * r[:, 0:1]
+        rpow_next[:, 1:] += rpow[:, :-1] * r[:, 1:2]
+        rpow_next[:, 2:] += rpow[:, :-2] * r[:, 2:3]
+        rpow = rpow_next
+    c = coeffs[:, ::-1].transpose(1, 0, 2)
+    return PPoly(c.reshape(c.shape[:2] + value_shape), tbreaks)
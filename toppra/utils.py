@@ -3,11 +3,125 @@ Some utility functions need to generate PathConstraints. Most are
 specific to different scenarios.
 """
 import logging
+from collections import OrderedDict
 import numpy as np
+from scipy.interpolate import CubicSpline
 
 LOGGER = logging.getLogger(__name__)
 
 
+class LRUCache(object):
+    """A mapping holding at most `maxsize` items.
+
+    When full, inserting an item evicts the least recently used one.
+    Reading an item with `get` marks it as recently used.
+
+    Parameters
+    ----------
+    maxsize : int
+    maxbytes : int, optional
+        Bound on the total size of the items, as given by their
+        `nbytes` attribute, e.g. for arrays. Items larger than this
+        bound are not stored.
+    """
+
+    def __init__(self, maxsize, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._items = OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @property
+    def nbytes(self):
+        """ Total size of the items, in bytes.
+        """
+        return self._nbytes
+
+    def get(self, key, default=None):
+        """ Return the item for `key`, or `default` if absent.
+        """
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            return default
+        self._items[key] = value
+        return value
+
+    def _pop(self, key=None):
+        if key is None:
+            _, value = self._items.popitem(last=False)
+        else:
+            value = self._items.pop(key)
+        self._nbytes -= getattr(value, 'nbytes', 0)
+
+    def _evict(self, maxsize, maxbytes):
+        while len(self._items) > maxsize or (
+                maxbytes is not None and self._nbytes > maxbytes):
+            self._pop()
+
+    def __setitem__(self, key, value):
+        if key in self._items:
+            self._pop(key)
+        nbytes = getattr(value, 'nbytes', 0)
+        if self.maxbytes is not None:
+            if nbytes > self.maxbytes:
+                return
+            self._evict(max(self.maxsize, 1) - 1, self.maxbytes - nbytes)
+        else:
+            self._evict(max(self.maxsize, 1) - 1, None)
+        self._items[key] = value
+        self._nbytes += nbytes
+
+    def resize(self, maxsize, maxbytes=None):
+        """ Change the bounds, evicting the least recently used items
+        as needed.
+        """
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._evict(maxsize, maxbytes)
+
+    def clear(self):
+        self._items.clear()
+        self._nbytes = 0
+
+
+class PymanoidCOMEvaluator(object):
+    """Stacked center of mass derivatives of a pymanoid robot.
+
+    Same interface as :func:`.SerialChain.compute_com_derivatives`.
+    pymanoid evaluates one configuration at a time.
+
+    Parameters
+    ----------
+    robot : :class:`Pymanoid.Humanoid`
+    """
+
+    def __init__(self, robot):
+        self.robot = robot
+
+    @property
+    def mass(self):
+        return self.robot.mass
+
+    def compute_com_derivatives(self, q, point=(0, 0, 0)):
+        values = []
+        for qi in q:
+            self.robot.set_dof_values(qi)
+            values.append((
+                self.robot.com,
+                self.robot.compute_com_jacobian(),
+                self.robot.compute_com_hessian(),
+                self.robot.compute_angular_momentum_jacobian(point),
+                self.robot.compute_angular_momentum_hessian(point)))
+        return [np.array(value) for value in zip(*values)]
+
+
 def compute_jacobian_wrench(robot, link, point):
     """ Compute the wrench Jacobian for link at point point.
 
@@ -67,17 +181,164 @@ def inv_dyn(rave_robot, q, qd, qdd, forceslist=None, returncomponents=True):
     rave_robot.SetDOFVelocityLimits(100 * vlim)
     rave_robot.SetDOFAccelerationLimits(100 * alim)
     # Do computation
-    with rave_robot:
-        rave_robot.SetDOFValues(q_)
-        rave_robot.SetDOFVelocities(qd_)
-        res = rave_robot.ComputeInverseDynamics(
-            qdd_, forceslist, returncomponents=returncomponents)
-    # Restore kinematic limits
-    rave_robot.SetDOFVelocityLimits(vlim)
-    rave_robot.SetDOFAccelerationLimits(alim)
+    try:
+        with rave_robot:
+            rave_robot.SetDOFValues(q_)
+            rave_robot.SetDOFVelocities(qd_)
+            res = rave_robot.ComputeInverseDynamics(
+                qdd_, forceslist, returncomponents=returncomponents)
+    finally:
+        # Restore kinematic limits
+        rave_robot.SetDOFVelocityLimits(vlim)
+        rave_robot.SetDOFAccelerationLimits(alim)
     return res
 
 
+def compute_rave_torque_coefficients(rave_robot, q, qs, qss):
+    """Coefficients of the path-torque equation at many gridpoints.
+
+    Along a path, the inverse dynamics equation reads
+
+          M(q) qs sdd + [M(q) qss + qs^T C(q) qs] sd^2 + g(q)
+        = a sdd + b sd^2 + c
+
+    Kinematic limits are relaxed once, and each gridpoint costs one
+    state update and two calls to OpenRAVE's ComputeInverseDynamics.
+
+    Parameters
+    ----------
+    rave_robot : OpenRAVE.robot
+    q : (N+1, dof) ndarray
+        Joint positions.
+    qs : (N+1, dof) ndarray
+        First derivatives of the path.
+    qss : (N+1, dof) ndarray
+        Second derivatives of the path.
+
+    Returns
+    -------
+    a : (N+1, dof) ndarray
+        M(q) qs.
+    b : (N+1, dof) ndarray
+        M(q) qss + qs^T C(q) qs.
+    c : (N+1, dof) ndarray
+        g(q).
+    """
+    q = np.reshape(q, (len(q), -1))
+    qs = np.reshape(qs, q.shape)
+    qss = np.reshape(qss, q.shape)
+    a = np.zeros(q.shape)
+    b = np.zeros(q.shape)
+    c = np.zeros(q.shape)
+
+    # Temporary remove kinematic Limits
+    vlim = rave_robot.GetDOFVelocityLimits()
+    alim = rave_robot.GetDOFAccelerationLimits()
+    rave_robot.SetDOFVelocityLimits(100 * vlim)
+    rave_robot.SetDOFAccelerationLimits(100 * alim)
+    try:
+        with rave_robot:
+            for i in range(q.shape[0]):
+                rave_robot.SetDOFValues(q[i])
+                rave_robot.SetDOFVelocities(qs[i])
+                a[i] = rave_robot.ComputeInverseDynamics(
+                    qs[i], None, returncomponents=True)[0]
+                m_qss, coriolis, c[i] = rave_robot.ComputeInverseDynamics(
+                    qss[i], None, returncomponents=True)
+                b[i] = m_qss + coriolis
+    finally:
+        # Restore kinematic limits
+        rave_robot.SetDOFVelocityLimits(vlim)
+        rave_robot.SetDOFAccelerationLimits(alim)
+    return a, b, c
+
+
+def interpolate_gridpoints(evaluate, ss, rtol=1e-3, atol=1e-8,
+                           n_samples=None):
+    """Evaluate smooth functions of the gridpoints on a coarse subset.
+
+    The functions are evaluated on `n_samples` evenly spaced
+    gridpoints, then interpolated by cubic splines. The interpolation
+    error of each interval between samples is estimated by evaluating
+    the functions at its middle gridpoint and comparing with the spline
+    fitted without it. Intervals whose error is above the tolerance
+    are split, until all intervals pass or have no gridpoint left.
+
+    Parameters
+    ----------
+    evaluate : callable
+        Maps an array of gridpoint indices, shaped (m,), to a list of
+        arrays of shapes (m, ...).
+    ss : array
+        Shape (N+1,). Grid points.
+    rtol : float, optional
+        Relative tolerance, with respect to the largest magnitude of
+        each output component.
+    atol : float, optional
+        Absolute tolerance.
+    n_samples : int, optional
+        Number of initial samples. Defaults to a tenth of the
+        gridpoints, and at least 4.
+
+    Returns
+    -------
+    outputs : list of array
+        Arrays of shapes (N+1, ...). Exact at the sampled gridpoints.
+    error : array
+        Shape (N+1,). Estimated absolute error at each gridpoint, the
+        largest over all output components. Zero at the samples.
+    """
+    N = len(ss) - 1
+    if n_samples is None:
+        n_samples = max(4, (N + 1) // 10)
+    n_samples = min(n_samples, N + 1)
+    idx = np.unique(np.linspace(0, N, n_samples).round().astype(int))
+    values = [np.asarray(value) for value in evaluate(idx)]
+    shapes = [value.shape[1:] for value in values]
+    # Outputs are flattened into the columns of a single array
+    known = np.zeros((N + 1, sum(int(np.prod(shape)) for shape in shapes)))
+    known[idx] = np.hstack([value.reshape(len(idx), -1) for value in values])
+    is_sampled = np.zeros(N + 1, dtype=bool)
+    is_sampled[idx] = True
+    error = np.zeros(N + 1)
+
+    pending = [(i0, i1) for i0, i1 in zip(idx[:-1], idx[1:]) if i1 - i0 > 1]
+    while len(pending) > 0:
+        sampled = np.flatnonzero(is_sampled)
+        spline = CubicSpline(ss[sampled], known[sampled])
+        mids = np.array([(i0 + i1) // 2 for i0, i1 in pending])
+        values = evaluate(mids)
+        known[mids] = np.hstack([np.reshape(value, (len(mids), -1))
+                                 for value in values])
+        is_sampled[mids] = True
+        tol = atol + rtol * np.abs(known[sampled]).max(axis=0)
+        deviation = np.abs(spline(ss[mids]) - known[mids])
+        too_large = np.any(deviation > tol, axis=1)
+        new_pending = []
+        for (i0, i1), mid, err, split in zip(
+                pending, mids, deviation.max(axis=1), too_large):
+            if split:
+                new_pending.extend([(i0, mid), (mid, i1)])
+            else:
+                error[i0 + 1: i1] = err
+            error[mid] = 0
+        pending = [(i0, i1) for i0, i1 in new_pending if i1 - i0 > 1]
+
+    sampled = np.flatnonzero(is_sampled)
+    LOGGER.debug("Evaluated %d of %d gridpoints, estimated error %g.",
+                 len(sampled), N + 1, error.max())
+    if len(sampled) < N + 1:
+        others = np.flatnonzero(~is_sampled)
+        known[others] = CubicSpline(ss[sampled], known[sampled])(ss[others])
+    outputs = []
+    col = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        outputs.append(known[:, col: col + size].reshape((N + 1, ) + shape))
+        col += size
+    return outputs, error
+
+
 def smooth_singularities(pp, us, xs, vs=None):
     """Smooth jitters due to singularities.
 